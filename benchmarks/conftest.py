@@ -0,0 +1,42 @@
+"""Fixtures for the offline benchmark suite."""
+
+import json
+from pathlib import Path
+from typing import Any, Callable, Generator
+
+import pytest
+
+RESULTS: list[dict[str, Any]] = []
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    parser.addoption(
+        "--benchmark-json",
+        default="benchmarks/results.json",
+        help="Path of the machine readable benchmark results.",
+    )
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    # The benchmarks drive Home Assistant's async fixtures.
+    config.option.asyncio_mode = "auto"
+
+
+def pytest_sessionfinish(session: pytest.Session) -> None:
+    if RESULTS:
+        path = Path(session.config.getoption("--benchmark-json"))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(RESULTS, indent=2))
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations: None) -> None:
+    """Load the integration from custom_components."""
+
+
+@pytest.fixture
+def record_benchmark(request: pytest.FixtureRequest) -> Generator[Callable[..., None], None, None]:
+    def record(**metrics: Any) -> None:
+        RESULTS.append({"benchmark": request.node.name, **metrics})
+
+    yield record
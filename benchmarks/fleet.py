@@ -0,0 +1,36 @@
+"""Synthetic fleets in the format of the M API vehicle search endpoint."""
+
+import math
+import random
+from typing import Any
+
+from custom_components.ha_m_car_api.const import VALID_CAR_TYPES
+from tests.payloads import vehicle_payload
+
+CENTER_LATITUDE = 52.52
+CENTER_LONGITUDE = 13.405
+METERS_PER_DEGREE = 111_000
+
+
+def synthetic_fleet(
+    size: int,
+    latitude: float = CENTER_LATITUDE,
+    longitude: float = CENTER_LONGITUDE,
+    spread_meters: float = 5000,
+    electric_share: float = 0.3,
+    seed: int = 0,
+) -> list[dict[str, Any]]:
+    """Return vehicle payloads scattered uniformly in a square of spread_meters around the center."""
+    rnd = random.Random(seed)
+    lat_spread = spread_meters / METERS_PER_DEGREE
+    lon_spread = lat_spread / math.cos(math.radians(latitude))
+    return [
+        vehicle_payload(
+            vehicle_id,
+            latitude=latitude + rnd.uniform(-lat_spread, lat_spread),
+            longitude=longitude + rnd.uniform(-lon_spread, lon_spread),
+            size=rnd.choice(VALID_CAR_TYPES),
+            electric=rnd.random() < electric_share,
+        )
+        for vehicle_id in range(size)
+    ]
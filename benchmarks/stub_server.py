@@ -0,0 +1,61 @@
+"""Local stand-in for the M API which serves a synthetic fleet."""
+
+from typing import Any
+
+from aiohttp import web
+from m_car_api.const import U_HEL_URL_PATH, V_URL_PATH
+
+from tests.payloads import search_payload
+
+
+class StubVehicleApi:
+    """Answers hello and vehicle search requests like the upstream API and counts them."""
+
+    def __init__(self, fleet: list[dict[str, Any]]) -> None:
+        self.fleet = fleet
+        self.hello_requests = 0
+        self.search_requests = 0
+        self.response_bytes = 0
+        self._runner: web.AppRunner | None = None
+        self.url = ""
+
+    @property
+    def requests(self) -> int:
+        return self.hello_requests + self.search_requests
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_get(U_HEL_URL_PATH, self._hello)
+        app.router.add_get(V_URL_PATH, self._vehicles)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        self.url = f"http://{host}:{port}/"
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _hello(self, request: web.Request) -> web.Response:
+        self.hello_requests += 1
+        return web.json_response({"Result": "ok"})
+
+    async def _vehicles(self, request: web.Request) -> web.Response:
+        self.search_requests += 1
+        query = request.query
+        latitude, longitude = float(query["latitude"]), float(query["longitude"])
+        half_lat_delta, half_lon_delta = float(query["latitudeDelta"]) / 2, float(query["longitudeDelta"]) / 2
+        sizes = set(query["VehicleSizeFilter"].split(",")) if "VehicleSizeFilter" in query else None
+        vehicles = [
+            vehicle
+            for vehicle in self.fleet
+            if abs(vehicle["Latitude"] - latitude) <= half_lat_delta
+            and abs(vehicle["Longitude"] - longitude) <= half_lon_delta
+            and (sizes is None or vehicle["VehicleSize"] in sizes)
+        ]
+        response = web.json_response(search_payload(vehicles))
+        self.response_bytes += len(response.body)
+        return response
@@ -0,0 +1,179 @@
+"""Offline benchmarks of the vehicle processing and the sensor update path."""
+
+import asyncio
+import time
+import tracemalloc
+from typing import Any, Callable
+from unittest.mock import patch
+
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.json import json_bytes
+from homeassistant.setup import async_setup_component
+from m_car_api.objects import parse_vehicles_payload
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from benchmarks.fleet import CENTER_LATITUDE, CENTER_LONGITUDE, synthetic_fleet
+from benchmarks.stub_server import StubVehicleApi
+from custom_components.ha_m_car_api.cache import async_get_tile_cache
+from custom_components.ha_m_car_api.const import (
+    CONF_DEVICE_KEY,
+    CONF_DISTANCE_METERS,
+    CONF_ELECTRIC_ONLY,
+    CONF_GAS_ONLY,
+    CONF_LOCATION,
+    CONF_TYPE_LIMIT,
+    DATA_COORDINATORS,
+    DATA_REQUEST_SCHEDULER,
+    DOMAIN,
+    VALID_ATTRIBUTE_PROFILES,
+)
+from custom_components.ha_m_car_api.response import format_attrs
+from custom_components.ha_m_car_api.scheduler import RequestScheduler
+from custom_components.ha_m_car_api.snapshot import VehicleSnapshot
+from tests.payloads import search_payload
+
+FLEET_SIZES = [100, 1_000, 10_000, 50_000]
+ENTRY_COUNTS = [1, 10, 50, 200]
+MAX_LOCATIONS = 20
+REPEATS = 5
+TYPE_LIMITS: list[list[str]] = [[], ["S"], ["M"], ["L", "X"], ["P"]]
+FUEL_FILTERS = [{}, {CONF_ELECTRIC_ONLY: True}, {CONF_GAS_ONLY: True}]
+
+
+def _best_of(func: Callable[[], Any], repeats: int = REPEATS) -> float:
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+@pytest.mark.parametrize("fleet_size", FLEET_SIZES)
+def test_format_attrs(fleet_size: int, record_benchmark: Callable[..., None]) -> None:
+    """Measure parsing, snapshotting and attribute formatting of one search result."""
+    payload = search_payload(synthetic_fleet(fleet_size))
+    parse_seconds = _best_of(lambda: parse_vehicles_payload(payload), repeats=1)
+    vehicles = parse_vehicles_payload(payload).data.vehicles
+    snapshot_seconds = _best_of(lambda: VehicleSnapshot.from_vehicles(vehicles))
+    snapshot = VehicleSnapshot.from_vehicles(vehicles)
+
+    for profile in VALID_ATTRIBUTE_PROFILES:
+
+        def format_snapshot() -> dict[str, Any]:
+            return format_attrs(snapshot, profile=profile, origin=(CENTER_LATITUDE, CENTER_LONGITUDE))
+
+        record_benchmark(
+            fleet_size=fleet_size,
+            profile=profile,
+            parse_seconds=parse_seconds,
+            snapshot_seconds=snapshot_seconds,
+            format_attrs_seconds=_best_of(format_snapshot),
+            attribute_bytes=len(json_bytes(format_snapshot())),
+        )
+
+
+@pytest.mark.parametrize("fleet_size", [100, 10_000, 50_000])
+@pytest.mark.parametrize("entry_count", ENTRY_COUNTS)
+async def test_sensor_update(
+    hass: HomeAssistant,
+    socket_enabled: None,
+    entry_count: int,
+    fleet_size: int,
+    record_benchmark: Callable[..., None],
+) -> None:
+    """Measure setting up and refreshing entry_count sensors against a local stub of the API."""
+    stub = StubVehicleApi(synthetic_fleet(fleet_size))
+    url = await stub.start()
+    try:
+        with patch("custom_components.ha_m_car_api.client.DEFAULT_ROOT_URL", url):
+            await _benchmark_sensor_update(hass, stub, entry_count, fleet_size, record_benchmark)
+    finally:
+        await stub.stop()
+
+
+async def _benchmark_sensor_update(
+    hass: HomeAssistant,
+    stub: StubVehicleApi,
+    entry_count: int,
+    fleet_size: int,
+    record_benchmark: Callable[..., None],
+) -> None:
+    location_count = min(entry_count, MAX_LOCATIONS)
+    for location_index in range(location_count):
+        hass.states.async_set(
+            f"zone.bench_{location_index}",
+            "0",
+            {
+                "latitude": CENTER_LATITUDE + (location_index % 5) * 0.004,
+                "longitude": CENTER_LONGITUDE + (location_index // 5) * 0.006,
+                # Zones always have a radius, the nearest vehicle trackers read it for their state.
+                "radius": 100,
+            },
+        )
+
+    entries = []
+    for entry_index in range(entry_count):
+        location_index = entry_index % location_count
+        variant = entry_index // location_count
+        entry = MockConfigEntry(
+            domain=DOMAIN,
+            data={
+                CONF_LOCATION: f"zone.bench_{location_index}",
+                CONF_DEVICE_KEY: f"benchmark-{entry_index}",
+                CONF_DISTANCE_METERS: 300 + 100 * (variant % 10),
+                CONF_TYPE_LIMIT: TYPE_LIMITS[variant % len(TYPE_LIMITS)],
+                CONF_ELECTRIC_ONLY: False,
+                CONF_GAS_ONLY: False,
+                **FUEL_FILTERS[(variant // len(TYPE_LIMITS)) % len(FUEL_FILTERS)],
+            },
+        )
+        entry.add_to_hass(hass)
+        entries.append(entry)
+
+    # Measure the integration itself, not how long the rate limit holds back the requests.
+    hass.data.setdefault(DOMAIN, {})[DATA_REQUEST_SCHEDULER] = RequestScheduler(rate=1_000_000, burst=1_000_000)
+    start = time.perf_counter()
+    assert await async_setup_component(hass, DOMAIN, {})
+    await hass.async_block_till_done()
+    setup_seconds = time.perf_counter() - start
+    # The first refresh runs in the background after the setup finished.
+    coordinators = list(hass.data[DOMAIN][DATA_COORDINATORS].values())
+    while any(coordinator.data is None for coordinator in coordinators):
+        await asyncio.sleep(0.01)
+    first_refresh_seconds = time.perf_counter() - start
+    setup_requests = stub.search_requests
+
+    async_get_tile_cache(hass).clear()
+    stub.search_requests = stub.response_bytes = 0
+    tracemalloc.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(coordinator.async_refresh() for coordinator in coordinators))
+    await hass.async_block_till_done()
+    refresh_seconds = time.perf_counter() - start
+    _, peak_memory_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    states = hass.states.async_all("sensor")
+    assert len(states) == entry_count
+    attribute_bytes = [len(json_bytes(dict(state.attributes))) for state in states]
+    record_benchmark(
+        entry_count=entry_count,
+        fleet_size=fleet_size,
+        locations=location_count,
+        setup_seconds=setup_seconds,
+        first_refresh_seconds=first_refresh_seconds,
+        setup_upstream_requests=setup_requests,
+        refresh_seconds=refresh_seconds,
+        update_latency_seconds=refresh_seconds / len(coordinators),
+        upstream_requests=stub.search_requests,
+        upstream_response_bytes=stub.response_bytes,
+        peak_memory_bytes=peak_memory_bytes,
+        state_attribute_bytes_total=sum(attribute_bytes),
+        state_attribute_bytes_max=max(attribute_bytes),
+    )
+
+    for entry in entries:
+        assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
@@ -1,25 +1,70 @@
 import asyncio
-from datetime import timedelta
-from typing import Any
+import importlib
+from typing import Any, Awaitable, Callable
 
+import homeassistant.helpers.config_validation as cv
+import voluptuous as vol
 from homeassistant import config_entries, core
 
-from custom_components.ha_m_car_api.config_flow import DOMAIN
-from custom_components.ha_m_car_api.services import search_vehicles_service
-
-CONF_SCAN_INTERVAL = 2
-SCAN_INTERVAL = timedelta(minutes=2)
+from custom_components.ha_m_car_api.const import (
+    CONF_EXECUTOR_QUEUE_SIZE,
+    CONF_EXECUTOR_WORKERS,
+    CONF_LOCATION,
+    DATA_EXECUTOR,
+    DEFAULT_CONF_EXECUTOR_QUEUE_SIZE,
+    DEFAULT_CONF_EXECUTOR_WORKERS,
+    DOMAIN,
+)
+from custom_components.ha_m_car_api.executor import async_get_executor
+
+PLATFORMS = ["sensor", "device_tracker"]
+SERVICES = ["search_vehicles", "vehicle_grid"]
+
+CONFIG_SCHEMA = vol.Schema(
+    {
+        vol.Optional(DOMAIN): vol.Schema(
+            {
+                vol.Optional(CONF_EXECUTOR_WORKERS, default=DEFAULT_CONF_EXECUTOR_WORKERS): cv.positive_int,
+                vol.Optional(CONF_EXECUTOR_QUEUE_SIZE, default=DEFAULT_CONF_EXECUTOR_QUEUE_SIZE): cv.positive_int,
+            }
+        )
+    },
+    extra=vol.ALLOW_EXTRA,
+)
 
 
 async def async_setup(hass: core.HomeAssistant, config: dict) -> bool:
     """Set up the M Car API component."""
-    hass.services.async_register(
-        DOMAIN, "search_vehicles", search_vehicles_service(hass), supports_response=core.SupportsResponse.ONLY
-    )
+    if DOMAIN in config:
+        # The pool is only started on first use, its size can still be changed.
+        executor = async_get_executor(hass)
+        executor.workers = config[DOMAIN][CONF_EXECUTOR_WORKERS]
+        executor.queue_size = config[DOMAIN][CONF_EXECUTOR_QUEUE_SIZE]
+
+    for service in SERVICES:
+        hass.services.async_register(
+            DOMAIN, service, _lazy_service(hass, service), supports_response=core.SupportsResponse.ONLY
+        )
 
     return True
 
 
+def _lazy_service(
+    hass: core.HomeAssistant, service: str
+) -> Callable[[core.ServiceCall], Awaitable[core.ServiceResponse]]:
+    handler: Callable[[core.ServiceCall], Awaitable[core.ServiceResponse]] | None = None
+
+    async def call_service(call: core.ServiceCall) -> core.ServiceResponse:
+        # The API client and its dependencies are only imported once the service is used.
+        nonlocal handler
+        if handler is None:
+            services = await hass.async_add_import_executor_job(importlib.import_module, f"{__name__}.services")
+            handler = getattr(services, f"{service}_service")(hass)
+        return await handler(call)
+
+    return call_service
+
+
 async def async_setup_entry(hass: core.HomeAssistant, entry: config_entries.ConfigEntry) -> bool:
     """Set up platform from a ConfigEntry."""
     hass.data.setdefault(DOMAIN, {})
@@ -30,8 +75,9 @@ async def async_setup_entry(hass: core.HomeAssistant, entry: config_entries.Conf
     hass_data["unsub_options_update_listener"] = unsub_options_update_listener
     hass.data[DOMAIN][entry.entry_id] = hass_data
 
-    # Forward the setup to the sensor platform.
-    await hass.config_entries.async_forward_entry_setup(entry, "sensor")
+    # Forward the setup to the platforms, one after the other as the trackers use the coordinator of the sensor.
+    for platform in PLATFORMS:
+        await hass.config_entries.async_forward_entry_setup(entry, platform)
 
     return True
 
@@ -48,12 +94,43 @@ async def async_update(self: Any) -> bool:
 
 async def async_unload_entry(hass: core.HomeAssistant, entry: config_entries.ConfigEntry) -> bool:
     """Unload a config entry."""
-    unload_ok = all(await asyncio.gather(*[hass.config_entries.async_forward_entry_unload(entry, "sensor")]))
+    unload_ok = all(
+        await asyncio.gather(
+            *[hass.config_entries.async_forward_entry_unload(entry, platform) for platform in PLATFORMS]
+        )
+    )
     # Remove options_update_listener.
     hass.data[DOMAIN][entry.entry_id]["unsub_options_update_listener"]()
 
     # Remove config entry from domain.
     if unload_ok:
         hass.data[DOMAIN].pop(entry.entry_id)
+        # Stop the parser threads with the last entry, a later service call starts them again.
+        if (executor := hass.data[DOMAIN].get(DATA_EXECUTOR)) is not None and not any(
+            other.state is config_entries.ConfigEntryState.LOADED
+            for other in hass.config_entries.async_entries(DOMAIN)
+            if other.entry_id != entry.entry_id
+        ):
+            executor.async_shutdown()
 
     return unload_ok
+
+
+async def async_remove_entry(hass: core.HomeAssistant, entry: config_entries.ConfigEntry) -> None:
+    """Drop the persisted aggregates of the entry and the snapshot of the location unless another entry tracks it."""
+    storage = await hass.async_add_import_executor_job(importlib.import_module, f"{__name__}.storage")
+    aggregate_store = storage.async_get_aggregate_store(hass)
+    await aggregate_store.async_load()
+    aggregate_store.async_remove(entry.entry_id)
+
+    location = entry.options.get(CONF_LOCATION, entry.data.get(CONF_LOCATION))
+    for other in hass.config_entries.async_entries(DOMAIN):
+        if (
+            other.entry_id != entry.entry_id
+            and other.options.get(CONF_LOCATION, other.data.get(CONF_LOCATION)) == location
+        ):
+            return
+
+    snapshot_store = storage.async_get_snapshot_store(hass)
+    await snapshot_store.async_load()
+    snapshot_store.async_remove(location)
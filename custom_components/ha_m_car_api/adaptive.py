@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+from typing import Any, Iterable
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.ha_m_car_api.const import ADAPTIVE_SMOOTHING, ADAPTIVE_TARGET_CHANGES
+
+
+def _clamp(value: timedelta, minimum: timedelta, maximum: timedelta) -> timedelta:
+    return max(minimum, min(value, maximum))
+
+
+class ChurnTracker:
+    """Moving average of how many vehicles arrive or leave an area per minute, for every hour of the day."""
+
+    def __init__(self, smoothing: float = ADAPTIVE_SMOOTHING) -> None:
+        self.smoothing = smoothing
+        self.rates: list[float | None] = [None] * 24
+        self._previous: tuple[datetime, frozenset[int]] | None = None
+
+    def record(self, fetched_at: datetime, vehicle_ids: Iterable[int]) -> None:
+        ids = frozenset(vehicle_ids)
+        if self._previous is not None:
+            previous_at, previous_ids = self._previous
+            minutes = (fetched_at - previous_at).total_seconds() / 60
+            if minutes > 0:
+                rate = len(ids ^ previous_ids) / minutes
+                hour = dt_util.as_local(fetched_at).hour
+                average = self.rates[hour]
+                self.rates[hour] = rate if average is None else average + self.smoothing * (rate - average)
+        self._previous = (fetched_at, ids)
+
+    def interval(self, at: datetime, default: timedelta, minimum: timedelta, maximum: timedelta) -> timedelta:
+        """Return the interval in which the target number of changes is expected at the given time."""
+        rate = self.rates[dt_util.as_local(at).hour]
+        if rate is None:
+            return _clamp(default, minimum, maximum)
+        if rate <= 0:
+            return maximum
+        return _clamp(timedelta(minutes=ADAPTIVE_TARGET_CHANGES / rate), minimum, maximum)
+
+    @property
+    def statistics(self) -> dict[str, Any]:
+        return {
+            "churn_per_minute_by_hour": [None if rate is None else round(rate, 3) for rate in self.rates],
+        }
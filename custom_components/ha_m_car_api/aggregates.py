@@ -0,0 +1,107 @@
+from datetime import datetime
+from typing import Any, Mapping, NamedTuple
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.ha_m_car_api.const import AGGREGATE_SMOOTHING
+from custom_components.ha_m_car_api.snapshot import COUNT_KEYS
+
+HOURS_PER_WEEK = 7 * 24
+# The state of the sensor, the other aggregated counts are read from its attributes.
+TOTAL_COUNT_KEY = "num_cars"
+COUNT_ATTRIBUTES = tuple(
+    dict.fromkeys(["num_electric_cars", "num_gas_cars", *(key for keys in COUNT_KEYS.values() for key in keys)])
+)
+
+# Minimum, mean and maximum.
+Aggregate = tuple[float, float, float]
+
+
+class HourSummary(NamedTuple):
+    start: datetime
+    aggregates: dict[str, Aggregate]
+
+
+def hour_of_week(at: datetime) -> int:
+    local = dt_util.as_local(at)
+    return local.weekday() * 24 + local.hour
+
+
+class HourOfWeekAggregates:
+    """Minimum, mean and maximum of the vehicle counts for every hour of the week.
+
+    Samples only update the running aggregate of the current hour. Once the hour is over its summary is returned for
+    the long-term statistics and folded into a moving average of the same hour in the previous weeks.
+    """
+
+    def __init__(
+        self, smoothing: float = AGGREGATE_SMOOTHING, profile: list[dict[str, Aggregate]] | None = None
+    ) -> None:
+        self.smoothing = smoothing
+        self.profile: list[dict[str, Aggregate]] = profile or [{} for _ in range(HOURS_PER_WEEK)]
+        self._start: datetime | None = None
+        self._samples = 0
+        self._minimum: dict[str, int] = {}
+        self._maximum: dict[str, int] = {}
+        self._sum: dict[str, int] = {}
+
+    def record(self, at: datetime, counts: Mapping[str, int]) -> HourSummary | None:
+        """Add the counts measured at the given time and return the summary of the previous hour once it is over."""
+        start = dt_util.as_utc(at).replace(minute=0, second=0, microsecond=0)
+        summary = None
+        if start != self._start:
+            summary = self._close()
+            self._start = start
+
+        self._samples += 1
+        for key, value in counts.items():
+            if key in self._sum:
+                self._minimum[key] = min(self._minimum[key], value)
+                self._maximum[key] = max(self._maximum[key], value)
+                self._sum[key] += value
+            else:
+                self._minimum[key] = self._maximum[key] = self._sum[key] = value
+        return summary
+
+    def _close(self) -> HourSummary | None:
+        if self._start is None or not self._samples:
+            return None
+        summary = HourSummary(
+            self._start,
+            {key: (self._minimum[key], self._sum[key] / self._samples, self._maximum[key]) for key in self._sum},
+        )
+        usual = self.profile[hour_of_week(self._start)]
+        for key, aggregate in summary.aggregates.items():
+            previous = usual.get(key)
+            usual[key] = aggregate if previous is None else self._moving_average(previous, aggregate)
+        self._samples = 0
+        self._minimum, self._maximum, self._sum = {}, {}, {}
+        return summary
+
+    def _moving_average(self, previous: Aggregate, aggregate: Aggregate) -> Aggregate:
+        minimum, mean, maximum = (
+            average + self.smoothing * (value - average) for average, value in zip(previous, aggregate)
+        )
+        return minimum, mean, maximum
+
+    def usual(self, at: datetime, key: str) -> Aggregate | None:
+        """Return the usual minimum, mean and maximum of the count at this hour of the week."""
+        return self.profile[hour_of_week(at)].get(key)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "profile": [
+                {key: [round(value, 2) for value in aggregate] for key, aggregate in usual.items()}
+                for usual in self.profile
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "HourOfWeekAggregates":
+        profile: list[dict[str, Aggregate]] = [
+            {key: (minimum, mean, maximum) for key, (minimum, mean, maximum) in usual.items()}
+            for usual in data["profile"]
+        ]
+        if len(profile) != HOURS_PER_WEEK:
+            raise ValueError("The profile does not cover every hour of the week")
+        return cls(profile=profile)
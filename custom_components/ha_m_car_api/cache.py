@@ -0,0 +1,290 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Collection, Generic, Hashable, NamedTuple, TypeVar
+
+from homeassistant.core import HomeAssistant, callback
+from m_car_api.api import VehicleQuery
+from m_car_api.objects import Vehicle
+
+from custom_components.ha_m_car_api.client import AsyncMApi
+from custom_components.ha_m_car_api.const import (
+    DATA_RESPONSE_CACHE,
+    DATA_TILE_CACHE,
+    DEFAULT_MAX_TILES,
+    DEFAULT_RESPONSE_CACHE_SIZE,
+    DEFAULT_TILE_SIZE_DEGREES,
+    DEFAULT_TILE_TTL_SECONDS,
+    DOMAIN,
+)
+from custom_components.ha_m_car_api.geo import bounding_box_deltas, in_bounding_box
+from custom_components.ha_m_car_api.response import SearchResult
+from custom_components.ha_m_car_api.scheduler import PRIORITY_BACKGROUND
+from custom_components.ha_m_car_api.telemetry import Telemetry
+
+TileKey = tuple[int, int]
+# The (sizes, electric) filter a tile was fetched with, (None, None) holds all vehicles.
+TileVariant = tuple[tuple[str, ...] | None, bool | None]
+UNFILTERED: TileVariant = (None, None)
+T = TypeVar("T")
+
+
+class _Tile(NamedTuple):
+    fetched_at: float
+    vehicles: list[Vehicle]
+
+
+class VehicleTileCache:
+    """Caches vehicle positions on a fixed latitude/longitude grid.
+
+    Radius queries are answered by merging the tiles covering the search box. Only if one of these tiles is
+    missing or older than the TTL the whole rectangle of covering tiles is fetched again in one upstream call.
+    Filtered queries are fetched with the filter pushed upstream and cached apart, but are answered from
+    unfiltered tiles if those are fresh.
+    """
+
+    def __init__(
+        self,
+        tile_size: float = DEFAULT_TILE_SIZE_DEGREES,
+        ttl: float = DEFAULT_TILE_TTL_SECONDS,
+        max_tiles: int = DEFAULT_MAX_TILES,
+    ) -> None:
+        self.tile_size = tile_size
+        self.ttl = ttl
+        self.max_tiles = max_tiles
+        self._tiles: OrderedDict[tuple[TileVariant, TileKey], _Tile] = OrderedDict()
+        self._inflight: dict[tuple[TileVariant, TileKey, TileKey], asyncio.Future[None]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._tiles)
+
+    @property
+    def statistics(self) -> dict[str, Any]:
+        return {"tiles": len(self._tiles), "hits": self.hits, "misses": self.misses}
+
+    def clear(self) -> None:
+        self._tiles.clear()
+
+    def _tile_key(self, lat: float, lon: float) -> TileKey:
+        return math.floor(lat / self.tile_size), math.floor(lon / self.tile_size)
+
+    def _is_fresh(self, variant: TileVariant, key: TileKey, now: float, max_age: float) -> bool:
+        tile = self._tiles.get((variant, key))
+        return tile is not None and now - tile.fetched_at < max_age
+
+    async def async_vehicles_around(
+        self,
+        m_api: AsyncMApi,
+        lat: float,
+        lon: float,
+        meters: float,
+        sizes: Collection[str] | None = None,
+        electric: bool | None = None,
+        telemetry: Telemetry | None = None,
+        priority: int = PRIORITY_BACKGROUND,
+        max_age: float | None = None,
+    ) -> list[Vehicle]:
+        """Return the vehicles of the sizes and fuel type in the box the upstream API would search for the radius."""
+        lat_delta, lon_delta = bounding_box_deltas(lat, lon, meters)
+        return await self.async_vehicles_in_box(
+            m_api,
+            lat,
+            lon,
+            lat_delta,
+            lon_delta,
+            sizes=sizes,
+            electric=electric,
+            telemetry=telemetry,
+            priority=priority,
+            max_age=max_age,
+        )
+
+    async def async_vehicles_in_box(
+        self,
+        m_api: AsyncMApi,
+        lat: float,
+        lon: float,
+        lat_delta: float,
+        lon_delta: float,
+        sizes: Collection[str] | None = None,
+        electric: bool | None = None,
+        telemetry: Telemetry | None = None,
+        priority: int = PRIORITY_BACKGROUND,
+        max_age: float | None = None,
+    ) -> list[Vehicle]:
+        """Return the vehicles of the sizes and fuel type in the box of the deltas centered on the location.
+
+        Tiles older than max_age seconds, or the TTL of the cache if it is shorter, are fetched again.
+        """
+        first = self._tile_key(lat - lat_delta / 2, lon - lon_delta / 2)
+        last = self._tile_key(lat + lat_delta / 2, lon + lon_delta / 2)
+        keys = [(x, y) for x in range(first[0], last[0] + 1) for y in range(first[1], last[1] + 1)]
+        variant: TileVariant = (tuple(sorted(sizes)) if sizes else None, electric)
+
+        if len(keys) > self.max_tiles:
+            # The search area does not fit into the cache, pass it through.
+            self.misses += 1
+            if telemetry is not None:
+                telemetry.record_cache(False)
+            vehicles = await m_api.vehicles(
+                lat=lat,
+                lon=lon,
+                latitude_delta=lat_delta,
+                longitude_delta=lon_delta,
+                query=VehicleQuery(vehicle_size_filter=variant[0]),
+                telemetry=telemetry,
+                electric=electric,
+                priority=priority,
+            )
+        else:
+            now = time.monotonic()
+            max_age = self.ttl if max_age is None else min(max_age, self.ttl)
+            candidates = [variant] if variant == UNFILTERED else [variant, UNFILTERED]
+            source = next(
+                (
+                    candidate
+                    for candidate in candidates
+                    if all(self._is_fresh(candidate, key, now, max_age) for key in keys)
+                ),
+                None,
+            )
+            if telemetry is not None:
+                telemetry.record_cache(source is not None)
+            if source is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+                source = variant
+                await self._async_fetch(m_api, variant, first, last, telemetry, priority)
+
+            vehicles = []
+            for key in keys:
+                if (tile := self._tiles.get((source, key))) is not None:
+                    self._tiles.move_to_end((source, key))
+                    vehicles.extend(tile.vehicles)
+
+        size_set = set(sizes) if sizes else None
+        return [
+            vehicle
+            for vehicle in vehicles
+            if in_bounding_box(lat, lon, lat_delta, lon_delta, vehicle.latitude, vehicle.longitude)
+            and (size_set is None or vehicle.size in size_set)
+            and (electric is None or vehicle.electric == electric)
+        ]
+
+    async def _async_fetch(
+        self,
+        m_api: AsyncMApi,
+        variant: TileVariant,
+        first: TileKey,
+        last: TileKey,
+        telemetry: Telemetry | None = None,
+        priority: int = PRIORITY_BACKGROUND,
+    ) -> None:
+        # Concurrent lookups of the same area wait for the same upstream call.
+        inflight_key = (variant, first, last)
+        if (future := self._inflight.get(inflight_key)) is None:
+            future = self._inflight[inflight_key] = asyncio.ensure_future(
+                self._fetch(m_api, variant, first, last, telemetry, priority)
+            )
+            future.add_done_callback(lambda _: self._inflight.pop(inflight_key, None))
+        await asyncio.shield(future)
+
+    async def _fetch(
+        self,
+        m_api: AsyncMApi,
+        variant: TileVariant,
+        first: TileKey,
+        last: TileKey,
+        telemetry: Telemetry | None,
+        priority: int,
+    ) -> None:
+        min_lat, min_lon = first[0] * self.tile_size, first[1] * self.tile_size
+        max_lat, max_lon = (last[0] + 1) * self.tile_size, (last[1] + 1) * self.tile_size
+        sizes, electric = variant
+        vehicles = await m_api.vehicles(
+            lat=(min_lat + max_lat) / 2,
+            lon=(min_lon + max_lon) / 2,
+            latitude_delta=max_lat - min_lat,
+            longitude_delta=max_lon - min_lon,
+            query=VehicleQuery(vehicle_size_filter=sizes),
+            telemetry=telemetry,
+            electric=electric,
+            priority=priority,
+        )
+
+        tiles: dict[TileKey, list[Vehicle]] = {
+            (x, y): [] for x in range(first[0], last[0] + 1) for y in range(first[1], last[1] + 1)
+        }
+        for vehicle in vehicles:
+            if (tile_vehicles := tiles.get(self._tile_key(vehicle.latitude, vehicle.longitude))) is not None:
+                tile_vehicles.append(vehicle)
+
+        fetched_at = time.monotonic()
+        for key, tile_vehicles in tiles.items():
+            self._tiles[(variant, key)] = _Tile(fetched_at, tile_vehicles)
+            self._tiles.move_to_end((variant, key))
+        while len(self._tiles) > self.max_tiles:
+            self._tiles.popitem(last=False)
+
+
+class ResponseCache(Generic[T]):
+    """Bounded LRU cache of finished responses which lets identical concurrent lookups share one fetch."""
+
+    def __init__(self, max_entries: int = DEFAULT_RESPONSE_CACHE_SIZE) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, tuple[float, T]] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Future[T]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def statistics(self) -> dict[str, Any]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "coalesced": self.coalesced}
+
+    async def async_get(self, key: Hashable, fetch: Callable[[], Awaitable[T]], max_age: float) -> T:
+        """Return the cached value for the key if it is younger than max_age seconds, fetch it otherwise."""
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] < max_age:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+
+        if (future := self._inflight.get(key)) is None:
+            self.misses += 1
+            future = self._inflight[key] = asyncio.ensure_future(self._fetch(key, fetch))
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(future)
+
+    async def _fetch(self, key: Hashable, fetch: Callable[[], Awaitable[T]]) -> T:
+        value = await fetch()
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return value
+
+
+@callback
+def async_get_response_cache(hass: HomeAssistant) -> ResponseCache[SearchResult]:
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_RESPONSE_CACHE not in domain_data:
+        domain_data[DATA_RESPONSE_CACHE] = ResponseCache()
+    return domain_data[DATA_RESPONSE_CACHE]
+
+
+@callback
+def async_get_tile_cache(hass: HomeAssistant) -> VehicleTileCache:
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_TILE_CACHE not in domain_data:
+        domain_data[DATA_TILE_CACHE] = VehicleTileCache()
+    return domain_data[DATA_TILE_CACHE]
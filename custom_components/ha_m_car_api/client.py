@@ -0,0 +1,192 @@
+import asyncio
+import time
+from typing import Any, Collection
+from urllib.parse import urljoin
+
+import aiohttp
+from homeassistant.util.json import json_loads
+from m_car_api.api import VehicleQuery
+from m_car_api.const import DEFAULT_ROOT_URL, U_HEL_URL_PATH, V_URL_PATH
+from m_car_api.objects import APIReturn, DeviceInfo, Vehicle, VehicleReturn, parse_vehicles_payload
+
+from custom_components.ha_m_car_api.const import (
+    DEFAULT_CONNECT_TIMEOUT_SECONDS,
+    DEFAULT_READ_TIMEOUT_SECONDS,
+    DEFAULT_TOTAL_TIMEOUT_SECONDS,
+)
+from custom_components.ha_m_car_api.executor import BlockingExecutor
+from custom_components.ha_m_car_api.geo import bounding_box_deltas
+from custom_components.ha_m_car_api.resilience import CircuitBreaker
+from custom_components.ha_m_car_api.scheduler import PRIORITY_BACKGROUND, RequestScheduler
+from custom_components.ha_m_car_api.telemetry import Telemetry
+
+DEFAULT_TIMEOUT = aiohttp.ClientTimeout(
+    total=DEFAULT_TOTAL_TIMEOUT_SECONDS,
+    connect=DEFAULT_CONNECT_TIMEOUT_SECONDS,
+    sock_read=DEFAULT_READ_TIMEOUT_SECONDS,
+)
+
+
+def _clean_params(params: dict[str, Any]) -> dict[str, Any]:
+    # requests silently drops None values, aiohttp refuses them.
+    return {key: value for key, value in params.items() if value is not None}
+
+
+def _is_electric(value: Any) -> bool:
+    # Mirrors how pydantic coerces the raw isElectric value.
+    if isinstance(value, str):
+        return value.lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+def _parse_vehicles(
+    body: bytes, submitted: float, sizes: Collection[str] | None, electric: bool | None
+) -> tuple[float, APIReturn[VehicleReturn]]:
+    """Decode and validate a vehicle search payload in the executor.
+
+    Vehicles not matching the sizes or fuel type are dropped from the raw payload, so that only the ones kept are
+    validated into models.
+    """
+    executor_wait = time.monotonic() - submitted
+    payload = json_loads(body)
+    data = payload.get("Data") if isinstance(payload, dict) else None
+    vehicles = data.get("vehicles") if isinstance(data, dict) else None
+    if isinstance(data, dict) and isinstance(vehicles, list) and (sizes or electric is not None):
+        data["vehicles"] = [
+            vehicle
+            for vehicle in vehicles
+            if (not sizes or vehicle.get("VehicleSize") in sizes)
+            and (electric is None or _is_electric(vehicle.get("isElectric")) == electric)
+        ]
+    return executor_wait, parse_vehicles_payload(payload)
+
+
+class AsyncMApi:
+    """Asyncio version of ``m_car_api.MApi`` running on a shared aiohttp session."""
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        device_key: str,
+        root_url: str | None = None,
+        timeout: aiohttp.ClientTimeout = DEFAULT_TIMEOUT,
+        circuit_breaker: CircuitBreaker | None = None,
+        scheduler: RequestScheduler | None = None,
+        executor: BlockingExecutor | None = None,
+    ) -> None:
+        self.session = session
+        self.device_key = device_key
+        self.root_url = root_url or DEFAULT_ROOT_URL
+        self.timeout = timeout
+        self.circuit_breaker = circuit_breaker
+        self.scheduler = scheduler
+        self.executor = executor
+        self._hello_done = False
+
+    async def _get(self, path: str, params: dict[str, Any], priority: int = PRIORITY_BACKGROUND) -> tuple[bytes, float]:
+        """Return the body and the seconds the request took, not counting the wait for the rate limit."""
+        if self.circuit_breaker is not None:
+            # Fail fast instead of queueing for a token while the API is down.
+            self.circuit_breaker.before_call()
+        if self.scheduler is not None:
+            await self.scheduler.acquire(priority)
+        started = time.monotonic()
+        if self.circuit_breaker is None:
+            body = await self._request(path, params)
+            return body, time.monotonic() - started
+
+        try:
+            body = await self._request(path, params)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.circuit_breaker.record_failure()
+            raise
+        self.circuit_breaker.record_success()
+        return body, time.monotonic() - started
+
+    async def _request(self, path: str, params: dict[str, Any]) -> bytes:
+        async with self.session.get(
+            urljoin(self.root_url, path), params=_clean_params(params), timeout=self.timeout
+        ) as response:
+            response.raise_for_status()
+            return await response.read()
+
+    async def _get_json(self, path: str, params: dict[str, Any], priority: int = PRIORITY_BACKGROUND) -> Any:
+        body, _ = await self._get(path, params, priority)
+        return json_loads(body)
+
+    async def hello(self, device_info: DeviceInfo | None = None, priority: int = PRIORITY_BACKGROUND) -> bool:
+        device_info = device_info or DeviceInfo()
+        params = {
+            "deviceKey": self.device_key,
+            **device_info.to_params(),
+        }
+        result = (await self._get_json(U_HEL_URL_PATH, params, priority))["Result"] == "ok"
+        if result:
+            self._hello_done = True
+        return result
+
+    async def hello_if_not_done(
+        self, device_info: DeviceInfo | None = None, priority: int = PRIORITY_BACKGROUND
+    ) -> bool:
+        if not self._hello_done:
+            return await self.hello(device_info=device_info, priority=priority)
+        return True
+
+    async def vehicles(
+        self,
+        lat: float,
+        lon: float,
+        latitude_delta: float,
+        longitude_delta: float,
+        query: VehicleQuery | None = None,
+        telemetry: Telemetry | None = None,
+        electric: bool | None = None,
+        priority: int = PRIORITY_BACKGROUND,
+    ) -> list[Vehicle]:
+        """Search the vehicles in the box, electric limits the result to electric (True) or gas (False) vehicles.
+
+        The upstream engine filter is not documented, so the fuel type is filtered while parsing the payload.
+        """
+        await self.hello_if_not_done(priority=priority)
+        query = query or VehicleQuery()
+        params = query.to_params(
+            latitude=lat,
+            longitude=lon,
+            latitude_delta=latitude_delta,
+            longitude_delta=longitude_delta,
+        )
+        params["deviceKey"] = self.device_key
+        body, latency = await self._get(V_URL_PATH, params, priority)
+        # Validating large payloads takes long enough to stall the event loop.
+        parse_args = (body, time.monotonic(), query.vehicle_size_filter, electric)
+        if self.executor is not None:
+            executor_wait, result = await self.executor.async_run(_parse_vehicles, *parse_args)
+        else:
+            executor_wait, result = await asyncio.get_running_loop().run_in_executor(None, _parse_vehicles, *parse_args)
+        if result.result != "OK":
+            raise ValueError(result.response_text)
+        if telemetry is not None:
+            telemetry.record_request(latency, len(body), len(result.data.vehicles), executor_wait)
+        return result.data.vehicles
+
+    async def vehicles_meters_around_location(
+        self,
+        lat: float,
+        lon: float,
+        meters: float,
+        query: VehicleQuery | None = None,
+        telemetry: Telemetry | None = None,
+        electric: bool | None = None,
+        priority: int = PRIORITY_BACKGROUND,
+    ) -> list[Vehicle]:
+        lat_delta, lon_delta = bounding_box_deltas(lat, lon, meters)
+        return await self.vehicles(
+            lat=lat,
+            lon=lon,
+            latitude_delta=lat_delta,
+            longitude_delta=lon_delta,
+            query=query,
+            telemetry=telemetry,
+            electric=electric,
+            priority=priority,
+        )
@@ -10,22 +10,51 @@ from homeassistant.data_entry_flow import FlowResult
 from homeassistant.helpers.selector import SelectSelector, SelectSelectorConfig, SelectSelectorMode
 
 from custom_components.ha_m_car_api.const import (
+    CONF_ADAPTIVE_SCAN_INTERVAL,
+    CONF_ATTRIBUTE_PROFILE,
     CONF_DEVICE_KEY,
     CONF_DISTANCE_METERS,
     CONF_ELECTRIC_ONLY,
     CONF_GAS_ONLY,
     CONF_LOCATION,
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_MIN_SCAN_INTERVAL,
+    CONF_MOVEMENT_DISTANCE_METERS,
+    CONF_MOVEMENT_REFRESH,
+    CONF_NEAREST_COUNT,
+    CONF_POLYGON,
     CONF_SCAN_INTERVAL,
+    CONF_SEARCH_AREA,
+    CONF_STALE_MAX_AGE,
+    CONF_STATIONARY_SCAN_INTERVAL,
     CONF_TYPE_LIMIT,
+    CONF_VEHICLE_FIELDS,
+    DEFAULT_CONF_ADAPTIVE_SCAN_INTERVAL,
+    DEFAULT_CONF_ATTRIBUTE_PROFILE,
     DEFAULT_CONF_DISTANCE_METERS,
     DEFAULT_CONF_ELECTRIC_ONLY,
     DEFAULT_CONF_GAS_ONLY,
+    DEFAULT_CONF_MAX_SCAN_INTERVAL,
+    DEFAULT_CONF_MIN_SCAN_INTERVAL,
+    DEFAULT_CONF_MOVEMENT_DISTANCE_METERS,
+    DEFAULT_CONF_MOVEMENT_REFRESH,
+    DEFAULT_CONF_NEAREST_COUNT,
+    DEFAULT_CONF_POLYGON,
     DEFAULT_CONF_SCAN_INTERVAL,
+    DEFAULT_CONF_SEARCH_AREA,
+    DEFAULT_CONF_STALE_MAX_AGE,
+    DEFAULT_CONF_STATIONARY_SCAN_INTERVAL,
     DEFAULT_CONF_TYPE_LIMIT,
+    DEFAULT_CONF_VEHICLE_FIELDS,
     DOMAIN,
+    SEARCH_AREA_POLYGON,
+    VALID_ATTRIBUTE_PROFILES,
     VALID_CAR_TYPES,
     VALID_ENTITY_TYPES,
+    VALID_SEARCH_AREAS,
+    VALID_VEHICLE_FIELDS,
 )
+from custom_components.ha_m_car_api.shapes import parse_polygon
 
 M_CAR_API_DATA_SCHEMA = vol.Schema({vol.Required("")})
 
@@ -47,6 +76,18 @@ async def _validate_location(hass: HomeAssistant, location: str) -> str:
     return location_check.name
 
 
+def _validate_search_area(location: str, data: dict[str, Any]) -> None:
+    if data.get(CONF_SEARCH_AREA, DEFAULT_CONF_SEARCH_AREA) != SEARCH_AREA_POLYGON:
+        return
+    # The vehicles are searched around the location, the search of a person would follow them away from the polygon.
+    if not location.startswith("zone."):
+        raise vol.Invalid("polygon_needs_zone")
+    try:
+        parse_polygon(data.get(CONF_POLYGON, DEFAULT_CONF_POLYGON))
+    except ValueError as error:
+        raise vol.Invalid("polygon_invalid") from error
+
+
 async def _get_valid_locations(hass: HomeAssistant) -> List[str]:
     locations = []
     for entity_type in VALID_ENTITY_TYPES:
@@ -110,7 +151,6 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         errors = {}
         if user_input is not None:
             user_input[CONF_DEVICE_KEY] = await validate_device_key(__get_option(CONF_DEVICE_KEY, None))
-            user_input[CONF_SCAN_INTERVAL] = __get_option(CONF_SCAN_INTERVAL, DEFAULT_CONF_SCAN_INTERVAL)
 
             location = __get_option(CONF_LOCATION, "")
             try:
@@ -119,10 +159,15 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                 location_entry = items[-1]
             except vol.Invalid as error:
                 errors[CONF_LOCATION] = error.error_message
+            try:
+                _validate_search_area(__get_option(CONF_LOCATION, ""), user_input)
+            except vol.Invalid as error:
+                errors[CONF_POLYGON] = error.error_message
 
             if len(errors) == 0:
                 return self.async_create_entry(
-                    title=get_title_of(location_entry, user_input),
+                    # The filters of the title are not options, they stay the ones of the entry.
+                    title=get_title_of(location_entry, {**self.config_entry.data, **user_input}),
                     data=user_input,
                 )
 
@@ -142,6 +187,47 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                     vol.Required(
                         CONF_SCAN_INTERVAL, default=__get_option(CONF_SCAN_INTERVAL, DEFAULT_CONF_SCAN_INTERVAL)
                     ): cv.positive_int,
+                    vol.Required(
+                        CONF_STALE_MAX_AGE, default=__get_option(CONF_STALE_MAX_AGE, DEFAULT_CONF_STALE_MAX_AGE)
+                    ): cv.positive_int,
+                    vol.Required(
+                        CONF_MOVEMENT_REFRESH,
+                        default=__get_option(CONF_MOVEMENT_REFRESH, DEFAULT_CONF_MOVEMENT_REFRESH),
+                    ): cv.boolean,
+                    vol.Required(
+                        CONF_MOVEMENT_DISTANCE_METERS,
+                        default=__get_option(CONF_MOVEMENT_DISTANCE_METERS, DEFAULT_CONF_MOVEMENT_DISTANCE_METERS),
+                    ): cv.positive_int,
+                    vol.Required(
+                        CONF_STATIONARY_SCAN_INTERVAL,
+                        default=__get_option(CONF_STATIONARY_SCAN_INTERVAL, DEFAULT_CONF_STATIONARY_SCAN_INTERVAL),
+                    ): cv.positive_int,
+                    vol.Required(
+                        CONF_ADAPTIVE_SCAN_INTERVAL,
+                        default=__get_option(CONF_ADAPTIVE_SCAN_INTERVAL, DEFAULT_CONF_ADAPTIVE_SCAN_INTERVAL),
+                    ): cv.boolean,
+                    vol.Required(
+                        CONF_MIN_SCAN_INTERVAL,
+                        default=__get_option(CONF_MIN_SCAN_INTERVAL, DEFAULT_CONF_MIN_SCAN_INTERVAL),
+                    ): cv.positive_int,
+                    vol.Required(
+                        CONF_MAX_SCAN_INTERVAL,
+                        default=__get_option(CONF_MAX_SCAN_INTERVAL, DEFAULT_CONF_MAX_SCAN_INTERVAL),
+                    ): cv.positive_int,
+                    vol.Required(
+                        CONF_SEARCH_AREA, default=__get_option(CONF_SEARCH_AREA, DEFAULT_CONF_SEARCH_AREA)
+                    ): vol.In(VALID_SEARCH_AREAS),
+                    vol.Optional(CONF_POLYGON, default=__get_option(CONF_POLYGON, DEFAULT_CONF_POLYGON)): cv.string,
+                    vol.Required(
+                        CONF_ATTRIBUTE_PROFILE,
+                        default=__get_option(CONF_ATTRIBUTE_PROFILE, DEFAULT_CONF_ATTRIBUTE_PROFILE),
+                    ): vol.In(VALID_ATTRIBUTE_PROFILES),
+                    vol.Required(
+                        CONF_NEAREST_COUNT, default=__get_option(CONF_NEAREST_COUNT, DEFAULT_CONF_NEAREST_COUNT)
+                    ): cv.positive_int,
+                    vol.Required(
+                        CONF_VEHICLE_FIELDS, default=__get_option(CONF_VEHICLE_FIELDS, DEFAULT_CONF_VEHICLE_FIELDS)
+                    ): cv.multi_select(VALID_VEHICLE_FIELDS),
                 }
             ),
             errors=errors,
@@ -166,6 +252,10 @@ class MCarAPIConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):  # type: igno
                 unique_id = get_unique_id(location, user_input)
             except vol.Invalid as error:
                 errors[CONF_LOCATION] = error.error_message
+            try:
+                _validate_search_area(user_input.get(CONF_LOCATION, ""), user_input)
+            except vol.Invalid as error:
+                errors[CONF_POLYGON] = error.error_message
 
             if len(errors) == 0:
                 await self.async_set_unique_id(unique_id)
@@ -191,6 +281,26 @@ class MCarAPIConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):  # type: igno
                     vol.Required(CONF_TYPE_LIMIT, default=DEFAULT_CONF_TYPE_LIMIT): cv.multi_select(VALID_CAR_TYPES),
                     vol.Required(CONF_ELECTRIC_ONLY, default=DEFAULT_CONF_ELECTRIC_ONLY): cv.boolean,
                     vol.Required(CONF_GAS_ONLY, default=DEFAULT_CONF_GAS_ONLY): cv.boolean,
+                    vol.Required(CONF_STALE_MAX_AGE, default=DEFAULT_CONF_STALE_MAX_AGE): cv.positive_int,
+                    vol.Required(CONF_MOVEMENT_REFRESH, default=DEFAULT_CONF_MOVEMENT_REFRESH): cv.boolean,
+                    vol.Required(
+                        CONF_MOVEMENT_DISTANCE_METERS, default=DEFAULT_CONF_MOVEMENT_DISTANCE_METERS
+                    ): cv.positive_int,
+                    vol.Required(
+                        CONF_STATIONARY_SCAN_INTERVAL, default=DEFAULT_CONF_STATIONARY_SCAN_INTERVAL
+                    ): cv.positive_int,
+                    vol.Required(CONF_ADAPTIVE_SCAN_INTERVAL, default=DEFAULT_CONF_ADAPTIVE_SCAN_INTERVAL): cv.boolean,
+                    vol.Required(CONF_MIN_SCAN_INTERVAL, default=DEFAULT_CONF_MIN_SCAN_INTERVAL): cv.positive_int,
+                    vol.Required(CONF_MAX_SCAN_INTERVAL, default=DEFAULT_CONF_MAX_SCAN_INTERVAL): cv.positive_int,
+                    vol.Required(CONF_SEARCH_AREA, default=DEFAULT_CONF_SEARCH_AREA): vol.In(VALID_SEARCH_AREAS),
+                    vol.Optional(CONF_POLYGON, default=DEFAULT_CONF_POLYGON): cv.string,
+                    vol.Required(CONF_ATTRIBUTE_PROFILE, default=DEFAULT_CONF_ATTRIBUTE_PROFILE): vol.In(
+                        VALID_ATTRIBUTE_PROFILES
+                    ),
+                    vol.Required(CONF_NEAREST_COUNT, default=DEFAULT_CONF_NEAREST_COUNT): cv.positive_int,
+                    vol.Required(CONF_VEHICLE_FIELDS, default=DEFAULT_CONF_VEHICLE_FIELDS): cv.multi_select(
+                        VALID_VEHICLE_FIELDS
+                    ),
                 }
             ),
             errors=errors,
@@ -8,12 +8,151 @@ CONF_ELECTRIC_ONLY = "electric_only"
 CONF_GAS_ONLY = "gas_only"
 CONF_LATITUDE = "latitude"
 CONF_LONGITUDE = "longitude"
+CONF_CACHE_MAX_AGE = "cache_max_age"
+CONF_ATTRIBUTE_PROFILE = "attribute_profile"
+CONF_NEAREST_COUNT = "nearest_count"
+CONF_VEHICLE_FIELDS = "vehicle_fields"
+CONF_LOCATIONS = "locations"
+CONF_COORDINATES = "coordinates"
+CONF_MAX_CONCURRENCY = "max_concurrency"
+CONF_BOUNDING_BOX = "bounding_box"
+CONF_CELL_SIZE_METERS = "cell_size_meters"
+CONF_FIELDS = "fields"
+CONF_SORT_BY = "sort_by"
+CONF_LIMIT = "limit"
+CONF_CURSOR = "cursor"
+CONF_STALE_MAX_AGE = "stale_max_age"
+CONF_MOVEMENT_REFRESH = "movement_refresh"
+CONF_MOVEMENT_DISTANCE_METERS = "movement_distance_meters"
+CONF_STATIONARY_SCAN_INTERVAL = "stationary_scan_interval"
+CONF_ADAPTIVE_SCAN_INTERVAL = "adaptive_scan_interval"
+CONF_MIN_SCAN_INTERVAL = "min_scan_interval"
+CONF_MAX_SCAN_INTERVAL = "max_scan_interval"
+CONF_SEARCH_AREA = "search_area"
+CONF_POLYGON = "polygon"
+CONF_EXECUTOR_WORKERS = "executor_workers"
+CONF_EXECUTOR_QUEUE_SIZE = "executor_queue_size"
+
+EVENT_VEHICLES_CHANGED = f"{DOMAIN}_vehicles_changed"
+
+DATA_COORDINATORS = "coordinators"
+DATA_TILE_CACHE = "tile_cache"
+DATA_RESPONSE_CACHE = "response_cache"
+DATA_TELEMETRY = "telemetry"
+DATA_CIRCUIT_BREAKER = "circuit_breaker"
+DATA_SNAPSHOT_STORE = "snapshot_store"
+DATA_REQUEST_SCHEDULER = "request_scheduler"
+DATA_CLIENT_REGISTRY = "client_registry"
+DATA_EXECUTOR = "executor"
+DATA_AGGREGATE_STORE = "aggregate_store"
+
+STORAGE_KEY = f"{DOMAIN}.snapshots"
+STORAGE_VERSION = 1
+# Seconds successful refreshes are collected before the snapshots are written to disk.
+STORAGE_SAVE_DELAY = 300
+AGGREGATE_STORAGE_KEY = f"{DOMAIN}.aggregates"
 
 VALID_ENTITY_TYPES = ["zone", "person", "device_tracker"]
 VALID_CAR_TYPES = ["S", "M", "L", "X", "P"]
 
+ATTRIBUTE_PROFILE_COUNTS = "counts"
+ATTRIBUTE_PROFILE_NEAREST = "nearest"
+ATTRIBUTE_PROFILE_FULL = "full"
+VALID_ATTRIBUTE_PROFILES = [ATTRIBUTE_PROFILE_COUNTS, ATTRIBUTE_PROFILE_NEAREST, ATTRIBUTE_PROFILE_FULL]
+SEARCH_AREA_BOX = "box"
+SEARCH_AREA_CIRCLE = "circle"
+SEARCH_AREA_ZONE = "zone"
+SEARCH_AREA_POLYGON = "polygon"
+VALID_SEARCH_AREAS = [SEARCH_AREA_BOX, SEARCH_AREA_CIRCLE, SEARCH_AREA_ZONE, SEARCH_AREA_POLYGON]
+VALID_VEHICLE_FIELDS = [
+    "id",
+    "license_plate",
+    "type",
+    "color",
+    "size",
+    "electric",
+    "latitude",
+    "longitude",
+    "fuel_percent",
+    "remaining_range",
+    "ev_plugged",
+    "rental_price",
+    "parking_price",
+    "unlock_fee",
+    "url_vehicle_image",
+]
+# Set upstream relative to the center of the search it answered, for cached vehicles the one of whichever caller
+# fetched their tile. They are left out of the attributes and responses, which list the distance to the caller.
+UPSTREAM_DISTANCE_FIELDS = frozenset({"distance_from_user_position", "distance_from_middle_position"})
+# Vehicles of service responses can be sorted by these, descending if prefixed with "-".
+SORT_BY_DISTANCE = "distance"
+VALID_SORT_FIELDS = [SORT_BY_DISTANCE, "fuel_percent", "remaining_range", "license_plate", "id"]
+
 DEFAULT_CONF_SCAN_INTERVAL = 2
 DEFAULT_CONF_DISTANCE_METERS = 500
 DEFAULT_CONF_ELECTRIC_ONLY = False
 DEFAULT_CONF_GAS_ONLY = False
 DEFAULT_CONF_TYPE_LIMIT = VALID_CAR_TYPES
+DEFAULT_CONF_ATTRIBUTE_PROFILE = ATTRIBUTE_PROFILE_FULL
+DEFAULT_CONF_NEAREST_COUNT = 5
+# The box the upstream API searches, as before search areas existed.
+DEFAULT_CONF_SEARCH_AREA = SEARCH_AREA_BOX
+DEFAULT_CONF_POLYGON = ""
+# From this many vehicles on, distances are computed on numpy arrays if numpy is installed.
+VECTORIZE_MIN_VEHICLES = 64
+DEFAULT_CONF_VEHICLE_FIELDS = ["license_plate", "type", "size", "electric", "latitude", "longitude", "fuel_percent"]
+
+DEFAULT_CONNECT_TIMEOUT_SECONDS = 10
+DEFAULT_READ_TIMEOUT_SECONDS = 30
+DEFAULT_TOTAL_TIMEOUT_SECONDS = 60
+
+DEFAULT_CONF_MOVEMENT_REFRESH = False
+DEFAULT_CONF_MOVEMENT_DISTANCE_METERS = 100
+DEFAULT_CONF_STATIONARY_SCAN_INTERVAL = 15
+DEFAULT_CONF_ADAPTIVE_SCAN_INTERVAL = False
+DEFAULT_CONF_MIN_SCAN_INTERVAL = 1
+DEFAULT_CONF_MAX_SCAN_INTERVAL = 30
+# The adaptive interval is chosen so that this many vehicles arrive or leave between two refreshes on average.
+ADAPTIVE_TARGET_CHANGES = 1
+# Weight of the newest churn measurement in the moving average of its hour of the day.
+ADAPTIVE_SMOOTHING = 0.2
+# Weight of the newest hour in the rolling min, mean and max of its hour of the week.
+AGGREGATE_SMOOTHING = 0.25
+# Seconds between two refreshes triggered by a moving location.
+MOVEMENT_REFRESH_COOLDOWN_SECONDS = 30
+
+# Minutes a sensor keeps serving the last good snapshot while refreshes fail.
+DEFAULT_CONF_STALE_MAX_AGE = 30
+# Failed refreshes are retried after an exponentially growing, jittered delay.
+DEFAULT_BACKOFF_BASE_SECONDS = 30
+DEFAULT_BACKOFF_MAX_SECONDS = 30 * 60
+# Consecutive upstream failures after which all calls fail fast until the reset timeout passed.
+DEFAULT_CIRCUIT_FAILURE_THRESHOLD = 5
+DEFAULT_CIRCUIT_RESET_SECONDS = 60
+# Token bucket shared by all upstream calls of the integration.
+DEFAULT_RATE_LIMIT_PER_MINUTE = 30
+DEFAULT_RATE_LIMIT_BURST = 10
+# Periodic refreshes of the areas are spread over this many seconds.
+REFRESH_STAGGER_SECONDS = 10
+
+DEFAULT_TILE_SIZE_DEGREES = 0.01
+DEFAULT_TILE_TTL_SECONDS = 90
+DEFAULT_MAX_TILES = 2048
+
+DEFAULT_CONF_CACHE_MAX_AGE = 30
+DEFAULT_RESPONSE_CACHE_SIZE = 128
+# Coordinates of service calls are rounded to this many decimals (about 11 m) to share cached responses.
+SERVICE_CACHE_COORDINATE_PRECISION = 4
+DEFAULT_CONF_MAX_CONCURRENCY = 4
+DEFAULT_CONF_CELL_SIZE_METERS = 250
+# Upper bound of the cells of a grid service call, every cell adds to each array of the response.
+MAX_GRID_CELLS = 10000
+# Threads parsing payloads, and how many more jobs may wait for them before callers are held back.
+DEFAULT_CONF_EXECUTOR_WORKERS = 2
+DEFAULT_CONF_EXECUTOR_QUEUE_SIZE = 8
+
+# Number of upstream calls the latency percentiles and payload sizes are computed over.
+DEFAULT_TELEMETRY_SAMPLES = 100
+
+# Vehicles which moved less than this between two updates are considered parked at the same spot.
+MOVED_THRESHOLD_METERS = 10
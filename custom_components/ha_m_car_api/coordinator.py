@@ -0,0 +1,350 @@
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Callable, NamedTuple, Sequence
+
+import aiohttp
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.event import async_track_state_change_event
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
+
+from custom_components.ha_m_car_api.adaptive import ChurnTracker
+from custom_components.ha_m_car_api.cache import async_get_tile_cache
+from custom_components.ha_m_car_api.client import AsyncMApi
+from custom_components.ha_m_car_api.const import (
+    DATA_COORDINATORS,
+    DEFAULT_CONF_MAX_SCAN_INTERVAL,
+    DEFAULT_CONF_MIN_SCAN_INTERVAL,
+    DEFAULT_CONF_SCAN_INTERVAL,
+    DEFAULT_CONF_STATIONARY_SCAN_INTERVAL,
+    DOMAIN,
+    MOVEMENT_REFRESH_COOLDOWN_SECONDS,
+    REFRESH_STAGGER_SECONDS,
+    VALID_CAR_TYPES,
+)
+from custom_components.ha_m_car_api.geo import bounding_box_deltas, haversine_meters
+from custom_components.ha_m_car_api.resilience import CircuitOpenError, backoff_delay
+from custom_components.ha_m_car_api.shapes import (
+    Polygon,
+    circle_extremes,
+    covering_radius_meters,
+    within_polygon,
+    within_radius,
+)
+from custom_components.ha_m_car_api.snapshot import EMPTY_SNAPSHOT, VehicleSnapshot
+from custom_components.ha_m_car_api.telemetry import Telemetry, async_get_telemetry
+
+if TYPE_CHECKING:
+    from custom_components.ha_m_car_api.storage import SnapshotStore
+
+_LOGGER = logging.getLogger(__name__)
+SCAN_INTERVAL = timedelta(minutes=DEFAULT_CONF_SCAN_INTERVAL)
+
+
+class VehicleFilter(NamedTuple):
+    distance_meters: int
+    type_limit: tuple[str, ...] | None = None
+    electric_only: bool = False
+    gas_only: bool = False
+    # Clip to the circle of distance_meters or the polygon instead of the box the upstream API searches.
+    circle: bool = False
+    polygon: Polygon | None = None
+
+    @property
+    def electric(self) -> bool | None:
+        """Return True for electric, False for gas only and None if both or neither are wanted."""
+        if self.electric_only == self.gas_only:
+            return None
+        return self.electric_only
+
+    def around(self, latitude: float, longitude: float) -> "VehicleFilter":
+        """Return the filter with the distance of a search box around the location which contains its shape."""
+        if self.polygon is not None:
+            points: Sequence[tuple[float, float]] = self.polygon
+        elif self.circle:
+            points = circle_extremes(latitude, longitude, self.distance_meters)
+        else:
+            return self
+        return self._replace(
+            distance_meters=max(self.distance_meters, covering_radius_meters(latitude, longitude, points))
+        )
+
+
+class RefreshPolicy(NamedTuple):
+    scan_interval: timedelta = SCAN_INTERVAL
+    # Refresh as soon as the location moved this far, None polls on the scan interval only.
+    movement_distance_meters: int | None = None
+    stationary_scan_interval: timedelta = timedelta(minutes=DEFAULT_CONF_STATIONARY_SCAN_INTERVAL)
+    # Derive the scan interval from the observed churn of the area, within the bounds.
+    adaptive: bool = False
+    min_scan_interval: timedelta = timedelta(minutes=DEFAULT_CONF_MIN_SCAN_INTERVAL)
+    max_scan_interval: timedelta = timedelta(minutes=DEFAULT_CONF_MAX_SCAN_INTERVAL)
+
+
+class AreaSnapshot(NamedTuple):
+    latitude: float
+    longitude: float
+    distance_meters: int
+    type_limit: tuple[str, ...] | None
+    electric: bool | None
+    vehicles: VehicleSnapshot
+    fetched_at: datetime | None = None
+
+    def covers(self, vehicle_filter: VehicleFilter) -> bool:
+        vehicle_filter = vehicle_filter.around(self.latitude, self.longitude)
+        if vehicle_filter.distance_meters > self.distance_meters:
+            return False
+        if self.electric is not None and vehicle_filter.electric != self.electric:
+            return False
+        if self.type_limit is None:
+            return True
+        return bool(vehicle_filter.type_limit) and set(vehicle_filter.type_limit or ()).issubset(self.type_limit)
+
+    def vehicles_for(self, vehicle_filter: VehicleFilter) -> VehicleSnapshot:
+        """Derive the vehicles of a single filter from the superset fetched for the area."""
+        if vehicle_filter.electric_only and vehicle_filter.gas_only:
+            return EMPTY_SNAPSHOT
+        radius_meters = vehicle_filter.distance_meters
+        vehicle_filter = vehicle_filter.around(self.latitude, self.longitude)
+
+        sizes = None
+        if vehicle_filter.type_limit and vehicle_filter.type_limit != self.type_limit:
+            sizes = vehicle_filter.type_limit
+
+        box = None
+        if vehicle_filter.distance_meters < self.distance_meters:
+            lat_delta, lon_delta = bounding_box_deltas(self.latitude, self.longitude, vehicle_filter.distance_meters)
+            box = (self.latitude, self.longitude, lat_delta, lon_delta)
+
+        electric = vehicle_filter.electric if vehicle_filter.electric != self.electric else None
+        vehicles = self.vehicles.where(sizes=sizes, electric=electric, box=box)
+        # The box is cheap to test and narrows the vehicles down before clipping them to the exact shape.
+        if vehicle_filter.polygon is not None:
+            return vehicles.select(within_polygon(vehicle_filter.polygon, vehicles.latitudes, vehicles.longitudes))
+        if vehicle_filter.circle:
+            return vehicles.select(
+                within_radius(self.latitude, self.longitude, radius_meters, vehicles.latitudes, vehicles.longitudes)
+            )
+        return vehicles
+
+
+def superset_of(filters: list[VehicleFilter]) -> tuple[int, tuple[str, ...] | None, bool | None]:
+    """Return the radius, size and fuel type filter which covers all given filters in one query."""
+    distance_meters = max(vehicle_filter.distance_meters for vehicle_filter in filters)
+    fuel_types = {vehicle_filter.electric for vehicle_filter in filters}
+    electric = fuel_types.pop() if len(fuel_types) == 1 else None
+    if any(not vehicle_filter.type_limit for vehicle_filter in filters):
+        return distance_meters, None, electric
+
+    type_limit: set[str] = set().union(*(vehicle_filter.type_limit or () for vehicle_filter in filters))
+    if type_limit.issuperset(VALID_CAR_TYPES):
+        return distance_meters, None, electric
+    return distance_meters, tuple(sorted(type_limit)), electric
+
+
+class VehicleAreaCoordinator(DataUpdateCoordinator[AreaSnapshot]):
+    """Fetches the vehicles around one location once for all config entries tracking it."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        m_api: AsyncMApi,
+        location: str,
+        snapshot_store: "SnapshotStore | None" = None,
+    ) -> None:
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN} {location}",
+            update_interval=SCAN_INTERVAL,
+            request_refresh_debouncer=Debouncer(
+                hass, _LOGGER, cooldown=MOVEMENT_REFRESH_COOLDOWN_SECONDS, immediate=True
+            ),
+        )
+        self._api = m_api
+        self.location = location
+        self._snapshot_store = snapshot_store
+        # Whether data was fetched since the start or only restored from the last run.
+        self._live = False
+        self._filters: dict[str, VehicleFilter] = {}
+        self._policies: dict[str, RefreshPolicy] = {}
+        self._apis: dict[str, AsyncMApi] = {}
+        self._movement_distance_meters: int | None = None
+        self._unsub_movement: CALLBACK_TYPE | None = None
+        self._refresh_lock = asyncio.Lock()
+        self.telemetry = Telemetry(parent=async_get_telemetry(hass))
+        # The config entry whose telemetry sensors expose the telemetry of the area.
+        self.telemetry_entry_id: str | None = None
+        # The callbacks adding sensors for every entry of the location, to hand the telemetry sensors over with.
+        self.telemetry_adders: dict[str, Callable[[list[Any]], None]] = {}
+        self.failures = 0
+        self.churn = ChurnTracker()
+        # Delay of the refresh following the first successful one, see _async_update_data.
+        self._stagger = timedelta(seconds=random.uniform(0, REFRESH_STAGGER_SECONDS))
+
+    @property
+    def filters(self) -> list[VehicleFilter]:
+        return list(self._filters.values())
+
+    def filter_of(self, key: str) -> VehicleFilter | None:
+        return self._filters.get(key)
+
+    @callback
+    def async_add_filter(
+        self,
+        key: str,
+        vehicle_filter: VehicleFilter,
+        refresh_policy: RefreshPolicy | None = None,
+        m_api: AsyncMApi | None = None,
+    ) -> Callable[[], None]:
+        """Track the filter of an entry, fetching with the client of the entry if passed."""
+        self._filters[key] = vehicle_filter
+        self._policies[key] = refresh_policy or RefreshPolicy()
+        if m_api is not None:
+            self._apis[key] = m_api
+        self._async_apply_policies()
+
+        @callback
+        def remove_filter() -> None:
+            self._filters.pop(key, None)
+            self._policies.pop(key, None)
+            if self._apis.pop(key, None) is self._api and self._apis:
+                # The client is closed once its entry is gone, continue with the one of another entry.
+                self._api = next(iter(self._apis.values()))
+            self._async_apply_policies()
+            if not self._filters:
+                self.hass.data[DOMAIN][DATA_COORDINATORS].pop(self.location, None)
+
+        return remove_filter
+
+    @property
+    def scan_interval(self) -> timedelta:
+        """Return the interval to poll at while the API is healthy, the shortest one any entry asks for."""
+        policies = self._policies.values()
+        if not policies:
+            return SCAN_INTERVAL
+        polling = [policy for policy in policies if not policy.movement_distance_meters]
+        if not polling:
+            # Every entry refreshes on movement, only poll slowly in the background.
+            return min(policy.stationary_scan_interval for policy in policies)
+        return min(self._polling_interval(policy) for policy in polling)
+
+    def _polling_interval(self, policy: RefreshPolicy) -> timedelta:
+        if not policy.adaptive:
+            return policy.scan_interval
+        return self.churn.interval(
+            dt_util.utcnow(), policy.scan_interval, policy.min_scan_interval, policy.max_scan_interval
+        )
+
+    @callback
+    def _async_apply_policies(self) -> None:
+        distances = [
+            policy.movement_distance_meters for policy in self._policies.values() if policy.movement_distance_meters
+        ]
+        self._movement_distance_meters = min(distances) if distances else None
+        if distances and self._unsub_movement is None:
+            self._unsub_movement = async_track_state_change_event(
+                self.hass, [self.location], self._async_location_changed
+            )
+        elif not distances and self._unsub_movement is not None:
+            self._unsub_movement()
+            self._unsub_movement = None
+        if not self.failures:
+            self.update_interval = self.scan_interval
+
+    @callback
+    def _async_location_changed(self, event: Event) -> None:
+        new_state = event.data["new_state"]
+        if new_state is None or self.data is None or self._movement_distance_meters is None:
+            return
+        latitude = new_state.attributes.get("latitude")
+        longitude = new_state.attributes.get("longitude")
+        if latitude is None or longitude is None:
+            return
+        if (
+            haversine_meters(self.data.latitude, self.data.longitude, latitude, longitude)
+            >= self._movement_distance_meters
+        ):
+            self.hass.async_create_task(self.async_request_refresh())
+
+    async def async_ensure_covered(self, vehicle_filter: VehicleFilter) -> None:
+        """Refresh the area unless the last live fetch already contains everything the filter needs."""
+        async with self._refresh_lock:
+            if not self._live or self.data is None or not self.data.covers(vehicle_filter):
+                await self.async_refresh()
+
+    async def _async_refresh(self, *args: Any, **kwargs: Any) -> None:
+        failed_before = not self.last_update_success
+        await super()._async_refresh(*args, **kwargs)
+        if failed_before and not self.last_update_success:
+            # Listeners are only told about the first failure, entities serving the stale snapshot want every one.
+            self.async_update_listeners()
+
+    async def _async_update_data(self) -> AreaSnapshot:
+        try:
+            snapshot = await self._async_fetch_area()
+        except UpdateFailed as error:
+            self.failures += 1
+            self.update_interval = backoff_delay(self.failures)
+            self.telemetry.record_failure(error)
+            raise
+        self.failures = 0
+        if (
+            self._live
+            and snapshot.fetched_at is not None
+            and snapshot.latitude == self.data.latitude
+            and snapshot.longitude == self.data.longitude
+        ):
+            # Vehicles appearing because the location moved are no churn.
+            self.churn.record(snapshot.fetched_at, snapshot.vehicles.ids)
+        # Areas set up together finish their first fetch in the same second and would keep refreshing in step,
+        # competing for the rate limit. Delaying the next refresh once spreads them over several seconds for good.
+        self.update_interval = self.scan_interval if self._live else self.scan_interval + self._stagger
+        self.telemetry.record_success()
+        self._live = True
+        if self._snapshot_store is not None:
+            self._snapshot_store.async_save(self.location, snapshot)
+        return snapshot
+
+    async def _async_fetch_area(self) -> AreaSnapshot:
+        if not self._filters:
+            raise UpdateFailed(f"No sensors are tracking location {self.location}.")
+
+        location = self.hass.states.get(self.location)
+        latitude = location.attributes.get("latitude") if location is not None else None
+        longitude = location.attributes.get("longitude") if location is not None else None
+        if latitude is None or longitude is None:
+            raise UpdateFailed(f"Latitude or longitude is missing for location {self.location}.")
+
+        # A single query around the location covers every shape, the vehicles are clipped to them locally.
+        distance_meters, type_limit, electric = superset_of(
+            [vehicle_filter.around(latitude, longitude) for vehicle_filter in self.filters]
+        )
+        try:
+            vehicles = await async_get_tile_cache(self.hass).async_vehicles_around(
+                self._api,
+                lat=latitude,
+                lon=longitude,
+                meters=distance_meters,
+                sizes=type_limit,
+                electric=electric,
+                telemetry=self.telemetry,
+            )
+        except (ValueError, aiohttp.ClientError, asyncio.TimeoutError, CircuitOpenError) as error:
+            raise UpdateFailed(f"Error retrieving data from Car API for location {self.location}: {error}") from error
+
+        snapshot = VehicleSnapshot.from_vehicles(vehicles)
+        return AreaSnapshot(latitude, longitude, distance_meters, type_limit, electric, snapshot, dt_util.utcnow())
+
+
+@callback
+def async_get_coordinator(
+    hass: HomeAssistant, m_api: AsyncMApi, location: str, snapshot_store: "SnapshotStore | None" = None
+) -> VehicleAreaCoordinator:
+    coordinators: dict[str, VehicleAreaCoordinator] = hass.data[DOMAIN].setdefault(DATA_COORDINATORS, {})
+    if location not in coordinators:
+        coordinators[location] = VehicleAreaCoordinator(hass, m_api, location, snapshot_store)
+    return coordinators[location]
@@ -0,0 +1,150 @@
+import logging
+from typing import Any, Callable, NamedTuple, Sequence
+
+from homeassistant.components.device_tracker import SourceType, TrackerEntity
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from custom_components.ha_m_car_api.const import (
+    CONF_LOCATION,
+    CONF_NEAREST_COUNT,
+    CONF_VEHICLE_FIELDS,
+    DATA_COORDINATORS,
+    DEFAULT_CONF_NEAREST_COUNT,
+    DEFAULT_CONF_VEHICLE_FIELDS,
+    DOMAIN,
+)
+from custom_components.ha_m_car_api.coordinator import AreaSnapshot, VehicleAreaCoordinator
+from custom_components.ha_m_car_api.ranking import nearest
+
+_LOGGER = logging.getLogger(__name__)
+
+# Reported as the position of the tracker instead.
+POSITION_FIELDS = frozenset({"latitude", "longitude"})
+
+
+class NearestVehicle(NamedTuple):
+    vehicle_id: int
+    latitude: float
+    longitude: float
+    distance_meters: int
+    attributes: dict[str, Any]
+
+
+class NearestVehicleRanking:
+    """Ranks the vehicles of an entry by their distance to the location, once per update for all its trackers."""
+
+    def __init__(self, coordinator: VehicleAreaCoordinator, entry_id: str, count: int, fields: Sequence[str]) -> None:
+        self.coordinator = coordinator
+        self.entry_id = entry_id
+        self.count = count
+        self.fields = [field for field in fields if field not in POSITION_FIELDS]
+        self._data: AreaSnapshot | None = None
+        self._ranked: list[NearestVehicle] = []
+
+    def vehicle(self, rank: int) -> NearestVehicle | None:
+        if (data := self.coordinator.data) is not self._data:
+            self._data = data
+            self._ranked = self._rank(data)
+        return self._ranked[rank] if rank < len(self._ranked) else None
+
+    def _rank(self, data: AreaSnapshot | None) -> list[NearestVehicle]:
+        vehicle_filter = self.coordinator.filter_of(self.entry_id)
+        if data is None or vehicle_filter is None:
+            return []
+        snapshot = data.vehicles_for(vehicle_filter)
+        ranked = nearest(data.latitude, data.longitude, snapshot.latitudes, snapshot.longitudes, self.count)
+        indices = [index for _, index in ranked]
+        return [
+            NearestVehicle(
+                snapshot.ids[index], snapshot.latitudes[index], snapshot.longitudes[index], round(distance), attrs
+            )
+            for (distance, index), attrs in zip(ranked, snapshot.as_dicts(self.fields, indices))
+        ]
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: Callable,
+) -> None:
+    """Set up a tracker for each of the vehicles closest to the location of the entry."""
+    # The sensor platform is set up first, merged the options into the config and created the coordinator.
+    config = hass.data[DOMAIN][entry.entry_id]
+    coordinator = hass.data[DOMAIN].get(DATA_COORDINATORS, {}).get(config[CONF_LOCATION])
+    if coordinator is None or coordinator.filter_of(entry.entry_id) is None:
+        _LOGGER.debug("No coordinator for %s, skipping the nearest vehicle trackers", config[CONF_LOCATION])
+        return
+
+    count = config.get(CONF_NEAREST_COUNT, DEFAULT_CONF_NEAREST_COUNT)
+    ranking = NearestVehicleRanking(
+        coordinator, entry.entry_id, count, config.get(CONF_VEHICLE_FIELDS, DEFAULT_CONF_VEHICLE_FIELDS)
+    )
+    async_add_entities(
+        NearestVehicleTracker(coordinator, ranking, rank, entry.entry_id, config[CONF_LOCATION])
+        for rank in range(count)
+    )
+
+
+class NearestVehicleTracker(CoordinatorEntity[VehicleAreaCoordinator], TrackerEntity):
+    """Tracks the vehicle at a rank of the distance to the location.
+
+    The trackers stay the same across updates, a tracker only writes its state when the vehicle at its rank or its
+    position changed.
+    """
+
+    _attr_icon = "mdi:car"
+    # Trackers default to diagnostic entities, these are meant for maps and dashboards.
+    _attr_entity_category = None
+
+    def __init__(
+        self,
+        coordinator: VehicleAreaCoordinator,
+        ranking: NearestVehicleRanking,
+        rank: int,
+        entry_id: str,
+        location: str,
+    ) -> None:
+        super().__init__(coordinator)
+        self._ranking = ranking
+        self._rank = rank
+        self._attr_name = f"Miles car {rank + 1} closest to {location}"
+        self._attr_unique_id = f"{entry_id}_nearest_{rank + 1}"
+        # Each tracker writes its own state, only the closest vehicle is tracked unless the others are enabled.
+        self._attr_entity_registry_enabled_default = rank == 0
+        self._vehicle = ranking.vehicle(rank)
+
+    @property
+    def source_type(self) -> SourceType:
+        return SourceType.GPS
+
+    @property
+    def available(self) -> bool:
+        return self._vehicle is not None
+
+    @property
+    def latitude(self) -> float | None:
+        return self._vehicle.latitude if self._vehicle is not None else None
+
+    @property
+    def longitude(self) -> float | None:
+        return self._vehicle.longitude if self._vehicle is not None else None
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        if self._vehicle is None:
+            return None
+        return {
+            **self._vehicle.attributes,
+            "vehicle_id": self._vehicle.vehicle_id,
+            "distance": self._vehicle.distance_meters,
+        }
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        vehicle = self._ranking.vehicle(self._rank)
+        if vehicle == self._vehicle:
+            return
+        self._vehicle = vehicle
+        self.async_write_ha_state()
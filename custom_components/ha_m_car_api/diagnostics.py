@@ -0,0 +1,41 @@
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from custom_components.ha_m_car_api.cache import async_get_response_cache, async_get_tile_cache
+from custom_components.ha_m_car_api.const import CONF_DEVICE_KEY, CONF_LOCATION, DATA_COORDINATORS, DOMAIN
+from custom_components.ha_m_car_api.executor import async_get_executor
+from custom_components.ha_m_car_api.registry import async_get_client_registry
+from custom_components.ha_m_car_api.resilience import async_get_circuit_breaker
+from custom_components.ha_m_car_api.scheduler import async_get_request_scheduler
+from custom_components.ha_m_car_api.telemetry import async_get_telemetry
+
+TO_REDACT = {CONF_DEVICE_KEY}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    location = entry.options.get(CONF_LOCATION, entry.data.get(CONF_LOCATION))
+    # Entries tracking the same location share the coordinator and with it the telemetry of the area.
+    coordinator = hass.data.get(DOMAIN, {}).get(DATA_COORDINATORS, {}).get(location)
+    return {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": async_redact_data(dict(entry.options), TO_REDACT),
+        },
+        "telemetry": coordinator.telemetry.as_dict() if coordinator is not None else None,
+        "polling": (
+            {"update_interval_seconds": coordinator.update_interval.total_seconds(), **coordinator.churn.statistics}
+            if coordinator is not None and coordinator.update_interval is not None
+            else None
+        ),
+        "integration_telemetry": async_get_telemetry(hass).as_dict(),
+        "tile_cache": async_get_tile_cache(hass).statistics,
+        "service_cache": async_get_response_cache(hass).statistics,
+        "circuit_breaker": async_get_circuit_breaker(hass).statistics,
+        "request_scheduler": async_get_request_scheduler(hass).statistics,
+        "client_registry": async_get_client_registry(hass).statistics,
+        "executor": async_get_executor(hass).statistics,
+    }
@@ -0,0 +1,54 @@
+from typing import Any, NamedTuple
+
+from m_car_api.objects import Vehicle
+
+from custom_components.ha_m_car_api.const import MOVED_THRESHOLD_METERS
+from custom_components.ha_m_car_api.geo import haversine_meters
+from custom_components.ha_m_car_api.snapshot import VehicleSnapshot
+
+Positions = dict[int, tuple[float, float]]
+
+
+class VehicleDiff(NamedTuple):
+    added: list[Vehicle]
+    removed: list[int]
+    moved: list[Vehicle]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.moved)
+
+    def as_event_data(self) -> dict[str, Any]:
+        return {
+            "added": [compact_vehicle(vehicle) for vehicle in self.added],
+            "removed": self.removed,
+            "moved": [compact_vehicle(vehicle) for vehicle in self.moved],
+        }
+
+
+def compact_vehicle(vehicle: Vehicle) -> dict[str, Any]:
+    return {
+        "id": vehicle.id,
+        "license_plate": vehicle.license_plate,
+        "size": vehicle.size,
+        "electric": vehicle.electric,
+        "latitude": vehicle.latitude,
+        "longitude": vehicle.longitude,
+    }
+
+
+def diff_vehicles(previous: Positions, snapshot: VehicleSnapshot) -> VehicleDiff:
+    """Compare the vehicles with the positions of the last update keyed by vehicle ID."""
+    added = []
+    moved = []
+    for index, (vehicle_id, latitude, longitude) in enumerate(
+        zip(snapshot.ids, snapshot.latitudes, snapshot.longitudes)
+    ):
+        position = previous.get(vehicle_id)
+        if position is None:
+            added.append(snapshot.vehicles[index])
+        elif haversine_meters(*position, latitude, longitude) > MOVED_THRESHOLD_METERS:
+            moved.append(snapshot.vehicles[index])
+
+    current_ids = set(snapshot.ids)
+    removed = [vehicle_id for vehicle_id in previous if vehicle_id not in current_ids]
+    return VehicleDiff(added, removed, moved)
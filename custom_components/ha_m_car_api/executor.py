@@ -0,0 +1,110 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import Event, HomeAssistant, callback
+
+from custom_components.ha_m_car_api.const import (
+    DATA_EXECUTOR,
+    DEFAULT_CONF_EXECUTOR_QUEUE_SIZE,
+    DEFAULT_CONF_EXECUTOR_WORKERS,
+    DOMAIN,
+)
+
+T = TypeVar("T")
+
+
+class BlockingExecutor:
+    """Thread pool of the integration for blocking work like parsing payloads.
+
+    Keeps a slow or huge response from occupying the executor Home Assistant shares with the recorder and other
+    integrations. At most queue_size jobs wait for a free worker, further callers are held back on the event loop.
+    The pool is started on first use and again after a shutdown.
+    """
+
+    def __init__(
+        self, workers: int = DEFAULT_CONF_EXECUTOR_WORKERS, queue_size: int = DEFAULT_CONF_EXECUTOR_QUEUE_SIZE
+    ) -> None:
+        self.workers = workers
+        self.queue_size = queue_size
+        self.pending = 0
+        self.peak_queue_depth = 0
+        self.saturated = 0
+        self.completed = 0
+        self._running = 0
+        self._lock = threading.Lock()
+        self._slots: asyncio.Semaphore | None = None
+        self._executor: ThreadPoolExecutor | None = None
+
+    @property
+    def queue_depth(self) -> int:
+        """Return the number of jobs waiting for a worker."""
+        with self._lock:
+            return max(self.pending - self._running, 0)
+
+    @property
+    def statistics(self) -> dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "running": self._running,
+            "queue_depth": self.queue_depth,
+            "peak_queue_depth": self.peak_queue_depth,
+            "saturated": self.saturated,
+            "completed": self.completed,
+        }
+
+    async def async_run(self, func: Callable[..., T], *args: Any) -> T:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers + self.queue_size)
+        if self._slots.locked():
+            # Every worker is busy and the queue is full.
+            self.saturated += 1
+
+        async with self._slots:
+            # The pool may have been shut down while waiting for the slot, never fall back to the shared executor.
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix=DOMAIN)
+            self.pending += 1
+            self.peak_queue_depth = max(self.peak_queue_depth, self.queue_depth)
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self._executor, self._run, func, args)
+            finally:
+                self.pending -= 1
+                self.completed += 1
+
+    def _run(self, func: Callable[..., T], args: tuple[Any, ...]) -> T:
+        with self._lock:
+            self._running += 1
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    @callback
+    def async_shutdown(self, cancel_queued: bool = False) -> None:
+        """Stop the workers once the jobs submitted so far are done, a later job starts the pool again.
+
+        Queued jobs still run unless cancelled, so a service call parsing its response while the last entry is
+        unloaded gets its result.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=cancel_queued)
+            self._executor = None
+
+    @callback
+    def async_close(self, _: Event) -> None:
+        """Cancel the queued jobs when Home Assistant closes, nobody waits for their results anymore."""
+        self.async_shutdown(cancel_queued=True)
+
+
+@callback
+def async_get_executor(hass: HomeAssistant) -> BlockingExecutor:
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_EXECUTOR not in domain_data:
+        executor = domain_data[DATA_EXECUTOR] = BlockingExecutor()
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, executor.async_close)
+    return domain_data[DATA_EXECUTOR]
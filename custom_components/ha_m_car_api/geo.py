@@ -0,0 +1,36 @@
+import math
+from types import ModuleType
+from typing import Tuple
+
+from m_car_api.geo import get_bounding_box
+
+# The vectorised paths use numpy if it is installed, it ships with Home Assistant but is no requirement.
+np: ModuleType | None
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+EARTH_RADIUS_METERS = 6371008.8
+
+
+def bounding_box_deltas(lat: float, lon: float, meters: float) -> Tuple[float, float]:
+    """Return the latitude and longitude deltas which the M API sends for a radius search."""
+    # Unpacked in the same order as ``MApi.vehicles_return_meters_around_location`` to match the upstream query.
+    lon_top_left, lat_top_left, lon_bottom_right, lat_bottom_right = get_bounding_box(lat=lat, lon=lon, meters=meters)
+    return abs(lat_top_left - lat_bottom_right), abs(lon_top_left - lon_bottom_right)
+
+
+def in_bounding_box(
+    lat: float, lon: float, lat_delta: float, lon_delta: float, point_lat: float, point_lon: float
+) -> bool:
+    return abs(point_lat - lat) <= lat_delta / 2 and abs(point_lon - lon) <= lon_delta / 2
+
+
+def haversine_meters(lat: float, lon: float, point_lat: float, point_lon: float) -> float:
+    lat_rad, point_lat_rad = math.radians(lat), math.radians(point_lat)
+    a = (
+        math.sin((point_lat_rad - lat_rad) / 2) ** 2
+        + math.cos(lat_rad) * math.cos(point_lat_rad) * math.sin(math.radians(point_lon - lon) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_METERS * math.asin(math.sqrt(a))
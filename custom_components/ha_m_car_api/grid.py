@@ -0,0 +1,92 @@
+import math
+from typing import Any, NamedTuple, Sequence
+
+from custom_components.ha_m_car_api.const import MAX_GRID_CELLS, VALID_CAR_TYPES, VECTORIZE_MIN_VEHICLES
+from custom_components.ha_m_car_api.geo import EARTH_RADIUS_METERS, np
+from custom_components.ha_m_car_api.snapshot import VehicleSnapshot
+
+
+class Grid(NamedTuple):
+    """Cells of roughly equal size in meters over a bounding box, the first one in its south west corner."""
+
+    south: float
+    west: float
+    rows: int
+    columns: int
+    cell_lat_delta: float
+    cell_lon_delta: float
+
+    @classmethod
+    def covering(cls, south: float, west: float, north: float, east: float, cell_size_meters: float) -> "Grid":
+        if not (south < north and west < east):
+            raise ValueError("The bounding box needs south < north and west < east")
+        if cell_size_meters <= 0:
+            raise ValueError("The cell size needs to be positive")
+        cell_lat_delta = math.degrees(cell_size_meters / EARTH_RADIUS_METERS)
+        cell_lon_delta = cell_lat_delta / math.cos(math.radians((south + north) / 2))
+        rows = math.ceil((north - south) / cell_lat_delta)
+        columns = math.ceil((east - west) / cell_lon_delta)
+        if rows * columns > MAX_GRID_CELLS:
+            raise ValueError(f"The grid has {rows * columns} cells, at most {MAX_GRID_CELLS} are supported")
+        return cls(south, west, rows, columns, cell_lat_delta, cell_lon_delta)
+
+    def __len__(self) -> int:
+        return self.rows * self.columns
+
+    def cell_indices(self, latitudes: Sequence[float], longitudes: Sequence[float]) -> list[int]:
+        """Return the row major index of the cell of every point, -1 for points outside of the grid."""
+        indices = []
+        for latitude, longitude in zip(latitudes, longitudes):
+            row = math.floor((latitude - self.south) / self.cell_lat_delta)
+            column = math.floor((longitude - self.west) / self.cell_lon_delta)
+            inside = 0 <= row < self.rows and 0 <= column < self.columns
+            indices.append(row * self.columns + column if inside else -1)
+        return indices
+
+    def counts(self, snapshot: VehicleSnapshot) -> dict[str, Any]:
+        """Count the vehicles of every cell, in total, by size and by fuel type, as flat row major arrays."""
+        total: list[int]
+        electric: list[int]
+        gas: list[int]
+        sizes: dict[str, list[int]]
+        if np is not None and len(snapshot.latitudes) >= VECTORIZE_MIN_VEHICLES:
+            rows = np.floor((np.asarray(snapshot.latitudes, dtype=float) - self.south) / self.cell_lat_delta)
+            columns = np.floor((np.asarray(snapshot.longitudes, dtype=float) - self.west) / self.cell_lon_delta)
+            inside = (rows >= 0) & (rows < self.rows) & (columns >= 0) & (columns < self.columns)
+            indices = (rows * self.columns + columns).astype(int)
+            is_electric = np.asarray(snapshot.electric, dtype=bool)
+            vehicle_sizes = np.asarray(snapshot.sizes, dtype=object)
+            total_counts = np.bincount(indices[inside], minlength=len(self))
+            electric_counts = np.bincount(indices[inside & is_electric], minlength=len(self))
+            total = total_counts.tolist()
+            electric = electric_counts.tolist()
+            gas = (total_counts - electric_counts).tolist()
+            sizes = {
+                size: np.bincount(indices[inside & (vehicle_sizes == size)], minlength=len(self)).tolist()
+                for size in VALID_CAR_TYPES
+            }
+        else:
+            total, electric, gas = [0] * len(self), [0] * len(self), [0] * len(self)
+            sizes = {size: [0] * len(self) for size in VALID_CAR_TYPES}
+            for index, size, vehicle_is_electric in zip(
+                self.cell_indices(snapshot.latitudes, snapshot.longitudes), snapshot.sizes, snapshot.electric
+            ):
+                if index < 0:
+                    continue
+                total[index] += 1
+                (electric if vehicle_is_electric else gas)[index] += 1
+                if size in sizes:
+                    sizes[size][index] += 1
+
+        return {
+            "south": self.south,
+            "west": self.west,
+            "rows": self.rows,
+            "columns": self.columns,
+            "cell_latitude_delta": self.cell_lat_delta,
+            "cell_longitude_delta": self.cell_lon_delta,
+            "total": total,
+            "electric": electric,
+            "gas": gas,
+            "sizes": sizes,
+        }
@@ -0,0 +1,33 @@
+import heapq
+import math
+from typing import Sequence
+
+from custom_components.ha_m_car_api.const import VECTORIZE_MIN_VEHICLES
+from custom_components.ha_m_car_api.geo import EARTH_RADIUS_METERS, haversine_meters, np
+
+
+def distances_meters(
+    lat: float, lon: float, latitudes: Sequence[float], longitudes: Sequence[float]
+) -> Sequence[float]:
+    """Return the haversine distance of every point to the origin, in one vectorised pass for larger sets."""
+    if np is None or len(latitudes) < VECTORIZE_MIN_VEHICLES:
+        return [haversine_meters(lat, lon, point_lat, point_lon) for point_lat, point_lon in zip(latitudes, longitudes)]
+
+    lat_rad = math.radians(lat)
+    points_lat_rad = np.radians(np.asarray(latitudes, dtype=float))
+    a = (
+        np.sin((points_lat_rad - lat_rad) / 2) ** 2
+        + math.cos(lat_rad)
+        * np.cos(points_lat_rad)
+        * np.sin(np.radians(np.asarray(longitudes, dtype=float) - lon) / 2) ** 2
+    )
+    return (2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(a))).tolist()
+
+
+def nearest(
+    lat: float, lon: float, latitudes: Sequence[float], longitudes: Sequence[float], count: int
+) -> list[tuple[float, int]]:
+    """Return the (distance, index) pairs of the count points closest to the origin, closest first."""
+    distances = distances_meters(lat, lon, latitudes, longitudes)
+    # Selecting with a heap is O(n log count) instead of sorting every point.
+    return heapq.nsmallest(count, zip(distances, range(len(distances))))
@@ -0,0 +1,93 @@
+from contextlib import contextmanager
+from typing import Any, Iterator
+from uuid import uuid4
+
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_create_clientsession
+
+from custom_components.ha_m_car_api.client import AsyncMApi
+from custom_components.ha_m_car_api.const import DATA_CLIENT_REGISTRY, DOMAIN
+from custom_components.ha_m_car_api.executor import async_get_executor
+from custom_components.ha_m_car_api.resilience import async_get_circuit_breaker
+from custom_components.ha_m_car_api.scheduler import async_get_request_scheduler
+
+
+class ClientRegistry:
+    """Keeps one long-lived client per device key, shared by the entries and service calls using the key.
+
+    Every client has a session of its own, and with it its own cookies, on top of the pooled keep-alive connections
+    of Home Assistant. The hello handshake happens once per device key instead of once per entry or call.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self._clients: dict[str, AsyncMApi] = {}
+        self._users: dict[str, set[str]] = {}
+        # Service calls without a device key share one instead of announcing a new device on every call.
+        self.service_device_key = str(uuid4())
+
+    @property
+    def statistics(self) -> dict[str, Any]:
+        return {
+            "clients": len(self._clients),
+            "users": sum(len(users) for users in self._users.values()),
+        }
+
+    @callback
+    def async_get(self, device_key: str, user: str | None = None) -> AsyncMApi:
+        """Return the client of the device key, the user keeps it open until it is released again."""
+        if (client := self._clients.get(device_key)) is None:
+            client = self._clients[device_key] = AsyncMApi(
+                async_create_clientsession(self.hass, auto_cleanup=False),
+                device_key,
+                circuit_breaker=async_get_circuit_breaker(self.hass),
+                scheduler=async_get_request_scheduler(self.hass),
+                executor=async_get_executor(self.hass),
+            )
+        if user is not None:
+            self._users.setdefault(device_key, set()).add(user)
+        return client
+
+    @callback
+    def async_release(self, device_key: str, user: str) -> None:
+        """Close the client of the device key once its last user released it."""
+        users = self._users.get(device_key)
+        if users is None:
+            return
+        users.discard(user)
+        if users:
+            return
+        del self._users[device_key]
+        # The client of the shared service device key is kept for the next call.
+        if device_key != self.service_device_key and (client := self._clients.pop(device_key, None)) is not None:
+            client.session.detach()
+
+    @contextmanager
+    def async_hold(self, device_key: str) -> Iterator[AsyncMApi]:
+        """Hold the client of the device key for the duration of a service call.
+
+        The client is closed afterwards unless an entry uses the same device key, so calls with ever new device keys
+        do not leave a client behind each.
+        """
+        user = str(uuid4())
+        try:
+            yield self.async_get(device_key, user)
+        finally:
+            self.async_release(device_key, user)
+
+    @callback
+    def async_close(self, _: Event | None = None) -> None:
+        for client in self._clients.values():
+            client.session.detach()
+        self._clients.clear()
+        self._users.clear()
+
+
+@callback
+def async_get_client_registry(hass: HomeAssistant) -> ClientRegistry:
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_CLIENT_REGISTRY not in domain_data:
+        registry = domain_data[DATA_CLIENT_REGISTRY] = ClientRegistry(hass)
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, registry.async_close)
+    return domain_data[DATA_CLIENT_REGISTRY]
@@ -0,0 +1,92 @@
+import random
+import time
+from datetime import timedelta
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+
+from custom_components.ha_m_car_api.const import (
+    DATA_CIRCUIT_BREAKER,
+    DEFAULT_BACKOFF_BASE_SECONDS,
+    DEFAULT_BACKOFF_MAX_SECONDS,
+    DEFAULT_CIRCUIT_FAILURE_THRESHOLD,
+    DEFAULT_CIRCUIT_RESET_SECONDS,
+    DOMAIN,
+)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(HomeAssistantError):
+    """Raised instead of calling the upstream API while it is considered down."""
+
+
+def backoff_delay(
+    failures: int,
+    base: float = DEFAULT_BACKOFF_BASE_SECONDS,
+    maximum: float = DEFAULT_BACKOFF_MAX_SECONDS,
+) -> timedelta:
+    """Return the delay before retrying after the given number of consecutive failures.
+
+    Half of the exponential delay is fixed, the other half random, so areas failing together spread their retries.
+    """
+    delay = min(base * 2 ** max(failures - 1, 0), maximum)
+    return timedelta(seconds=delay / 2 + random.uniform(0, delay / 2))
+
+
+class CircuitBreaker:
+    """Stops all callers of the upstream API from retrying at once during an outage.
+
+    After failure_threshold consecutive failures the circuit opens and calls fail fast. Once reset_timeout seconds
+    passed a single trial call is let through, its result closes or opens the circuit again.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = DEFAULT_CIRCUIT_RESET_SECONDS,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = 0.0
+
+    @property
+    def statistics(self) -> dict[str, Any]:
+        return {"state": self.state, "failures": self.failures, "opened": self.opened}
+
+    def before_call(self) -> None:
+        if self.state == STATE_CLOSED:
+            return
+        now = time.monotonic()
+        # A trial which never reported back, e.g. because it got cancelled, is replaced after the same timeout.
+        if now - self._opened_at >= self.reset_timeout:
+            self.state = STATE_HALF_OPEN
+            self._opened_at = now
+            return
+        raise CircuitOpenError("The M API is unavailable, skipping the call until it recovered.")
+
+    def record_success(self) -> None:
+        self.state = STATE_CLOSED
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == STATE_HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != STATE_OPEN:
+                self.opened += 1
+            self.state = STATE_OPEN
+            self._opened_at = time.monotonic()
+
+
+@callback
+def async_get_circuit_breaker(hass: HomeAssistant) -> CircuitBreaker:
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_CIRCUIT_BREAKER not in domain_data:
+        domain_data[DATA_CIRCUIT_BREAKER] = CircuitBreaker()
+    return domain_data[DATA_CIRCUIT_BREAKER]
@@ -1,38 +1,199 @@
-from typing import Any
+import base64
+import binascii
+import heapq
+import json
+import math
+import re
+from typing import Any, Callable, NamedTuple, Sequence
 
 from m_car_api.objects import Vehicle
 
+from custom_components.ha_m_car_api.const import (
+    ATTRIBUTE_PROFILE_COUNTS,
+    ATTRIBUTE_PROFILE_FULL,
+    ATTRIBUTE_PROFILE_NEAREST,
+    DEFAULT_CONF_NEAREST_COUNT,
+    DEFAULT_CONF_VEHICLE_FIELDS,
+    SORT_BY_DISTANCE,
+)
+from custom_components.ha_m_car_api.ranking import distances_meters, nearest
+from custom_components.ha_m_car_api.snapshot import VehicleSnapshot
 
-def format_attrs(vehicles: list[Vehicle]) -> dict[str, Any]:
-    attrs: dict[str, Any] = {
-        "num_electric_cars": len([vehicle for vehicle in vehicles if vehicle.electric]),
-        "num_gas_cars": len([vehicle for vehicle in vehicles if not vehicle.electric]),
-        "number_car_s": 0,
-        "number_car_s_electric": 0,
-        "number_car_s_gas": 0,
-        "number_car_m": 0,
-        "number_car_m_electric": 0,
-        "number_car_m_gas": 0,
-        "number_car_l": 0,
-        "number_car_l_electric": 0,
-        "number_car_l_gas": 0,
-        "number_car_x": 0,
-        "number_car_x_electric": 0,
-        "number_car_x_gas": 0,
-        "number_car_p": 0,
-        "number_car_p_electric": 0,
-        "number_car_p_gas": 0,
-    }
-
-    for vehicle in vehicles:
-        car_key = f"number_car_{vehicle.size.lower()}"
-        attrs[car_key] += 1
-        if vehicle.electric:
-            car_key += "_electric"
-            attrs[car_key] += 1
-        else:
-            car_key += "_gas"
-            attrs[car_key] += 1
+# Text fields starting with a number, like "50%" or "200 km", which are sorted by that number.
+NUMERIC_TEXT_FIELDS = {"fuel_percent", "remaining_range"}
+LEADING_NUMBER = re.compile(r"\s*(-?\d+(?:[.,]\d+)?)")
+
+# (value is missing, value, vehicle ID), the position of a vehicle in the sort order.
+SortKey = tuple[bool, Any, int]
+
+
+class SearchResult(NamedTuple):
+    """The vehicles of a search and their counts."""
+
+    snapshot: VehicleSnapshot
+    attrs: dict[str, Any]
 
-    attrs["vehicles"] = [vehicle.dict() for vehicle in vehicles]
+
+class ResponseShape(NamedTuple):
+    """The fields, order and page of the vehicles a service response lists, the default lists all of them in full."""
+
+    fields: Sequence[str] | None = None
+    sort_by: str | None = None
+    limit: int | None = None
+    cursor: str | None = None
+
+
+def format_attrs(
+    snapshot: VehicleSnapshot,
+    profile: str = ATTRIBUTE_PROFILE_FULL,
+    nearest_count: int = DEFAULT_CONF_NEAREST_COUNT,
+    fields: Sequence[str] = DEFAULT_CONF_VEHICLE_FIELDS,
+    origin: tuple[float, float] | None = None,
+) -> dict[str, Any]:
+    attrs: dict[str, Any] = snapshot.counts()
+    if profile == ATTRIBUTE_PROFILE_FULL:
+        attrs["vehicles"] = snapshot.as_dicts()
+        if origin is not None:
+            _add_distances(attrs["vehicles"], distances_meters(*origin, snapshot.latitudes, snapshot.longitudes))
+    elif profile == ATTRIBUTE_PROFILE_NEAREST:
+        attrs["vehicles"] = nearest_vehicle_attrs(snapshot, nearest_count, fields, origin)
+    elif profile != ATTRIBUTE_PROFILE_COUNTS:
+        raise ValueError(f"Unknown attribute profile {profile}")
     return attrs
+
+
+def nearest_vehicle_attrs(
+    snapshot: VehicleSnapshot, count: int, fields: Sequence[str], origin: tuple[float, float] | None
+) -> list[dict[str, Any]]:
+    """Return the requested fields of the count vehicles closest to the origin."""
+    if origin is None:
+        return snapshot.as_dicts(fields, range(min(count, len(snapshot))))
+
+    ranked = nearest(*origin, snapshot.latitudes, snapshot.longitudes, count)
+    return [
+        {**vehicle_attrs, "distance": round(distance)}
+        for vehicle_attrs, (distance, _) in zip(snapshot.as_dicts(fields, [index for _, index in ranked]), ranked)
+    ]
+
+
+def merge_search_results(
+    results: Sequence[SearchResult],
+    shape: ResponseShape = ResponseShape(),
+    origins: Sequence[tuple[float, float]] = (),
+) -> dict[str, Any]:
+    """Combine the results into one, listing vehicles found by several searches once.
+
+    Distances are measured to the closest of the origins.
+    """
+    merged = VehicleSnapshot.merge([result.snapshot for result in results])
+    return {**merged.counts(), **shape_vehicles(merged, shape, origins)}
+
+
+def shape_vehicles(
+    snapshot: VehicleSnapshot, shape: ResponseShape = ResponseShape(), origins: Sequence[tuple[float, float]] = ()
+) -> dict[str, Any]:
+    """Return the vehicles entry of a service response, with the next cursor if it is paginated.
+
+    Only the vehicles of the page are serialised, and only with the requested fields. With a limit the page is
+    selected with a heap instead of sorting all vehicles. The cursor holds the sort key of the last vehicle of a
+    page, so the next page continues after it even if the vehicles changed in between.
+    """
+    if shape == ResponseShape():
+        vehicles = snapshot.as_dicts()
+        if origins:
+            _add_distances(vehicles, _distances(snapshot, origins))
+        return {"vehicles": vehicles}
+
+    descending = shape.sort_by is not None and shape.sort_by.startswith("-")
+    sort_by = shape.sort_by.lstrip("-") if shape.sort_by is not None else None
+    with_distance = sort_by == SORT_BY_DISTANCE or (shape.fields is not None and SORT_BY_DISTANCE in shape.fields)
+    distances = _distances(snapshot, origins) if with_distance else None
+
+    indices: Sequence[int] = range(len(snapshot))
+    next_cursor = None
+    if sort_by is not None or shape.limit is not None or shape.cursor is not None:
+        sort_key = _sort_key(snapshot, sort_by, distances, descending)
+        if shape.cursor is not None:
+            cursor = _decode_cursor(shape.cursor)
+            try:
+                indices = [
+                    index for index in indices if (sort_key(index) < cursor if descending else sort_key(index) > cursor)
+                ]
+            except TypeError as exc:
+                raise ValueError(f"The cursor {shape.cursor} is not one of a search sorted by {sort_by}") from exc
+        if shape.limit is None:
+            indices = sorted(indices, key=sort_key, reverse=descending)
+        else:
+            select = heapq.nlargest if descending else heapq.nsmallest
+            # One more than the limit tells if there is a next page.
+            page = select(shape.limit + 1, indices, key=sort_key)
+            indices = page[: shape.limit]
+            if indices and len(page) > shape.limit:
+                next_cursor = _encode_cursor(sort_key(indices[-1]))
+
+    fields = [field for field in shape.fields if field != SORT_BY_DISTANCE] if shape.fields is not None else None
+    vehicles = snapshot.as_dicts(fields, indices)
+    if distances is not None and shape.fields is not None and SORT_BY_DISTANCE in shape.fields:
+        _add_distances(vehicles, [distances[index] for index in indices])
+
+    response: dict[str, Any] = {"vehicles": vehicles}
+    if shape.limit is not None:
+        response["next_cursor"] = next_cursor
+    return response
+
+
+def _add_distances(vehicles: list[dict[str, Any]], distances: Sequence[float]) -> None:
+    for vehicle_attrs, distance in zip(vehicles, distances):
+        vehicle_attrs[SORT_BY_DISTANCE] = round(distance)
+
+
+def _distances(snapshot: VehicleSnapshot, origins: Sequence[tuple[float, float]]) -> list[float]:
+    if not origins:
+        raise ValueError("Distances need the location of the search")
+    distances = [math.inf] * len(snapshot)
+    for latitude, longitude in origins:
+        distances = [
+            min(distance, origin_distance)
+            for distance, origin_distance in zip(
+                distances, distances_meters(latitude, longitude, snapshot.latitudes, snapshot.longitudes)
+            )
+        ]
+    return distances
+
+
+def _sort_value(vehicle: Vehicle, field: str) -> Any:
+    value = getattr(vehicle, field)
+    if field in NUMERIC_TEXT_FIELDS:
+        match = LEADING_NUMBER.match(value or "")
+        return float(match.group(1).replace(",", ".")) if match else None
+    return value
+
+
+def _sort_key(
+    snapshot: VehicleSnapshot, sort_by: str | None, distances: Sequence[float] | None, descending: bool
+) -> Callable[[int], SortKey]:
+    """Return the sort key of the vehicle at an index, vehicles without a value come last in both directions."""
+    if sort_by is None:
+        values: Sequence[Any] = [None] * len(snapshot)
+    elif sort_by == SORT_BY_DISTANCE and distances is not None:
+        values = distances
+    else:
+        values = [_sort_value(vehicle, sort_by) for vehicle in snapshot.vehicles]
+
+    def sort_key(index: int) -> SortKey:
+        value = values[index]
+        return ((value is not None) if descending else (value is None)), value, snapshot.ids[index]
+
+    return sort_key
+
+
+def _encode_cursor(key: SortKey) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> SortKey:
+    try:
+        missing, value, vehicle_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, TypeError, ValueError) as exc:
+        raise ValueError(f"Invalid cursor {cursor}") from exc
+    return missing, value, vehicle_id
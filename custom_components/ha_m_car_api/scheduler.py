@@ -0,0 +1,109 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+
+from custom_components.ha_m_car_api.const import (
+    DATA_REQUEST_SCHEDULER,
+    DEFAULT_RATE_LIMIT_BURST,
+    DEFAULT_RATE_LIMIT_PER_MINUTE,
+    DOMAIN,
+)
+
+# Lower values are served first.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+
+class RequestScheduler:
+    """Token bucket every upstream call has to pass, handing out tokens by priority.
+
+    Tokens refill at rate per second up to burst. Calls find a token right away while nobody waits, otherwise they
+    queue and are woken in order of priority and arrival as tokens become available.
+    """
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_RATE_LIMIT_PER_MINUTE / 60,
+        burst: int = DEFAULT_RATE_LIMIT_BURST,
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.granted = 0
+        self.delayed = 0
+        self.wait_seconds = 0.0
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._sequence = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+
+    @property
+    def statistics(self) -> dict[str, Any]:
+        self._refill()
+        return {
+            "tokens": round(self._tokens, 2),
+            "queued": sum(not future.done() for _, _, future in self._waiters),
+            "granted": self.granted,
+            "delayed": self.delayed,
+            "wait_seconds": round(self.wait_seconds, 3),
+        }
+
+    async def acquire(self, priority: int = PRIORITY_BACKGROUND) -> None:
+        """Wait until a token is available for a call of the given priority."""
+        self._refill()
+        if not self._waiters and self._tokens >= 1:
+            self._tokens -= 1
+            self.granted += 1
+            return
+
+        started = time.monotonic()
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self._schedule()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The token was handed out while the caller got cancelled, pass it on.
+                self._tokens = min(self._tokens + 1, self.burst)
+                self._schedule()
+            raise
+        self.delayed += 1
+        self.wait_seconds += time.monotonic() - started
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self._tokens + (now - self._updated) * self.rate, self.burst)
+        self._updated = now
+
+    def _schedule(self) -> None:
+        if self._timer is not None or not self._waiters:
+            return
+        delay = max((1 - self._tokens) / self.rate, 0)
+        self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+    def _dispatch(self) -> None:
+        self._timer = None
+        self._refill()
+        while self._waiters and self._tokens >= 1:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self._tokens -= 1
+            self.granted += 1
+            future.set_result(None)
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+        self._schedule()
+
+
+@callback
+def async_get_request_scheduler(hass: HomeAssistant) -> RequestScheduler:
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_REQUEST_SCHEDULER not in domain_data:
+        domain_data[DATA_REQUEST_SCHEDULER] = RequestScheduler()
+    return domain_data[DATA_REQUEST_SCHEDULER]
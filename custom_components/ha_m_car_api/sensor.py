@@ -1,33 +1,79 @@
 import logging
-from datetime import timedelta
-from functools import partial
+from dataclasses import dataclass
+from datetime import datetime, timedelta
 from typing import Any, Callable, Dict, Optional
 
-import requests
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.entity import Entity
+from homeassistant.components.sensor import SensorDeviceClass, SensorEntity, SensorEntityDescription, SensorStateClass
+from homeassistant.const import PERCENTAGE, EntityCategory, UnitOfInformation, UnitOfTime
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.typing import ConfigType
-from m_car_api import MApi
-from m_car_api.api import VehicleQuery
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dt_util
+from homeassistant.util import slugify
 
+from custom_components.ha_m_car_api.aggregates import (
+    COUNT_ATTRIBUTES,
+    TOTAL_COUNT_KEY,
+    HourOfWeekAggregates,
+    HourSummary,
+)
 from custom_components.ha_m_car_api.const import (
+    CONF_ADAPTIVE_SCAN_INTERVAL,
+    CONF_ATTRIBUTE_PROFILE,
     CONF_DEVICE_KEY,
     CONF_DISTANCE_METERS,
     CONF_ELECTRIC_ONLY,
     CONF_GAS_ONLY,
     CONF_LOCATION,
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_MIN_SCAN_INTERVAL,
+    CONF_MOVEMENT_DISTANCE_METERS,
+    CONF_MOVEMENT_REFRESH,
+    CONF_NEAREST_COUNT,
+    CONF_POLYGON,
     CONF_SCAN_INTERVAL,
+    CONF_SEARCH_AREA,
+    CONF_STALE_MAX_AGE,
+    CONF_STATIONARY_SCAN_INTERVAL,
     CONF_TYPE_LIMIT,
+    CONF_VEHICLE_FIELDS,
+    DEFAULT_CONF_ADAPTIVE_SCAN_INTERVAL,
+    DEFAULT_CONF_ATTRIBUTE_PROFILE,
     DEFAULT_CONF_DISTANCE_METERS,
     DEFAULT_CONF_ELECTRIC_ONLY,
     DEFAULT_CONF_GAS_ONLY,
+    DEFAULT_CONF_MAX_SCAN_INTERVAL,
+    DEFAULT_CONF_MIN_SCAN_INTERVAL,
+    DEFAULT_CONF_MOVEMENT_DISTANCE_METERS,
+    DEFAULT_CONF_MOVEMENT_REFRESH,
+    DEFAULT_CONF_NEAREST_COUNT,
+    DEFAULT_CONF_POLYGON,
     DEFAULT_CONF_SCAN_INTERVAL,
+    DEFAULT_CONF_SEARCH_AREA,
+    DEFAULT_CONF_STALE_MAX_AGE,
+    DEFAULT_CONF_STATIONARY_SCAN_INTERVAL,
+    DEFAULT_CONF_VEHICLE_FIELDS,
     DOMAIN,
+    EVENT_VEHICLES_CHANGED,
+    SEARCH_AREA_BOX,
+    SEARCH_AREA_CIRCLE,
+    SEARCH_AREA_POLYGON,
+    SEARCH_AREA_ZONE,
+)
+from custom_components.ha_m_car_api.coordinator import (
+    RefreshPolicy,
+    VehicleAreaCoordinator,
+    VehicleFilter,
+    async_get_coordinator,
 )
+from custom_components.ha_m_car_api.diff import Positions, diff_vehicles
+from custom_components.ha_m_car_api.registry import async_get_client_registry
 from custom_components.ha_m_car_api.response import format_attrs
+from custom_components.ha_m_car_api.shapes import Polygon, parse_polygon
+from custom_components.ha_m_car_api.storage import async_get_aggregate_store, async_get_snapshot_store
+from custom_components.ha_m_car_api.telemetry import Telemetry
 
 _LOGGER = logging.getLogger(__name__)
-SCAN_INTERVAL = timedelta(minutes=DEFAULT_CONF_SCAN_INTERVAL)
 
 
 async def async_setup_entry(
@@ -45,30 +91,119 @@ async def async_setup_entry(
     if device_key is None:
         _LOGGER.error("Could not get device key from configuration for M Car API initialization")
     else:
-        m_api = MApi(device_key)
+        registry = async_get_client_registry(hass)
+        m_api = registry.async_get(device_key, entry.entry_id)
+        # Release the key acquired here, the options flow may have changed the one of the entry until it is unloaded.
+        entry.async_on_unload(lambda: registry.async_release(device_key, entry.entry_id))
+        snapshot_store = async_get_snapshot_store(hass)
+        await snapshot_store.async_load()
+        # Entries tracking the same location share one coordinator which fetches the superset of their filters.
+        coordinator = async_get_coordinator(hass, m_api, config[CONF_LOCATION], snapshot_store)
+
+        sensor = CarApiSensor(hass, coordinator, config, entry.entry_id)
+        entry.async_on_unload(
+            coordinator.async_add_filter(entry.entry_id, sensor.vehicle_filter, refresh_policy_of(config), m_api)
+        )
+        if coordinator.data is None:
+            # Serve the snapshot of the last run until the first refresh finished. Restored once the filter keeps the
+            # coordinator around, another entry of the location may have refreshed it while the snapshot was validated.
+            snapshot = await snapshot_store.async_restore(config[CONF_LOCATION])
+            if snapshot is not None and coordinator.data is None:
+                coordinator.data = snapshot
+        entities: list[SensorEntity] = [sensor]
+        # The telemetry belongs to the shared area, only the first entry tracking the location adds its sensors.
+        # Once that entry is unloaded, another entry of the location adds them again.
+        coordinator.telemetry_adders[entry.entry_id] = async_add_entities
+        if coordinator.telemetry_entry_id is None:
+            coordinator.telemetry_entry_id = entry.entry_id
+            entities.extend(TelemetrySensor(coordinator, description) for description in TELEMETRY_SENSORS)
+
+        @callback
+        def release_telemetry() -> None:
+            coordinator.telemetry_adders.pop(entry.entry_id, None)
+            if coordinator.telemetry_entry_id != entry.entry_id:
+                return
+            coordinator.telemetry_entry_id = None
+            for entry_id, add_entities in coordinator.telemetry_adders.items():
+                coordinator.telemetry_entry_id = entry_id
+                add_entities([TelemetrySensor(coordinator, description) for description in TELEMETRY_SENSORS])
+                break
 
-        sensor = CarApiSensor(hass, m_api, config)
-        async_add_entities([sensor], update_before_add=True)
+        entry.async_on_unload(release_telemetry)
+        async_add_entities(entities)
+        # Keep the first fetch out of the startup, the sensor shows the restored snapshot until it finished.
+        entry.async_create_background_task(
+            hass,
+            coordinator.async_ensure_covered(sensor.vehicle_filter),
+            f"{DOMAIN} first refresh of {config[CONF_LOCATION]}",
+        )
 
 
-class CarApiSensor(Entity):
+def refresh_policy_of(config: dict[str, Any]) -> RefreshPolicy:
+    movement_distance_meters = None
+    if config.get(CONF_MOVEMENT_REFRESH, DEFAULT_CONF_MOVEMENT_REFRESH):
+        movement_distance_meters = config.get(CONF_MOVEMENT_DISTANCE_METERS, DEFAULT_CONF_MOVEMENT_DISTANCE_METERS)
+    return RefreshPolicy(
+        scan_interval=timedelta(minutes=config.get(CONF_SCAN_INTERVAL, DEFAULT_CONF_SCAN_INTERVAL)),
+        movement_distance_meters=movement_distance_meters,
+        stationary_scan_interval=timedelta(
+            minutes=config.get(CONF_STATIONARY_SCAN_INTERVAL, DEFAULT_CONF_STATIONARY_SCAN_INTERVAL)
+        ),
+        adaptive=bool(config.get(CONF_ADAPTIVE_SCAN_INTERVAL, DEFAULT_CONF_ADAPTIVE_SCAN_INTERVAL)),
+        min_scan_interval=timedelta(minutes=config.get(CONF_MIN_SCAN_INTERVAL, DEFAULT_CONF_MIN_SCAN_INTERVAL)),
+        max_scan_interval=timedelta(minutes=config.get(CONF_MAX_SCAN_INTERVAL, DEFAULT_CONF_MAX_SCAN_INTERVAL)),
+    )
+
+
+class CarApiSensor(CoordinatorEntity[VehicleAreaCoordinator], SensorEntity):
+    # The vehicle list changes on every poll and would bloat the recorder database.
+    _unrecorded_attributes = frozenset({"vehicles"})
+    # Lets the recorder compile hourly statistics of the number of vehicles.
+    _attr_state_class = SensorStateClass.MEASUREMENT
 
     def __init__(
         self,
         hass: HomeAssistant,
-        m_api: MApi,
+        coordinator: VehicleAreaCoordinator,
         data: dict[str, Any],
+        entry_id: str | None = None,
     ) -> None:
-        super().__init__()
-        self._api = m_api
+        super().__init__(coordinator)
         self._hass = hass
+        # The aggregates are persisted for the config entry, without one they are kept in memory only.
+        self._entry_id = entry_id
+        self._aggregates = HourOfWeekAggregates()
+        self._recorded_at: datetime | None = None
         self._location = data[CONF_LOCATION]
         self._distance_meters = data.get(CONF_DISTANCE_METERS, DEFAULT_CONF_DISTANCE_METERS)
-        self._scan_interval = data.get(CONF_SCAN_INTERVAL, DEFAULT_CONF_SCAN_INTERVAL)
         self._type_limit = data.get(CONF_TYPE_LIMIT, None)
         self._type_limit = sorted(self._type_limit) if self._type_limit else None
         self._electric_only = bool(data.get(CONF_ELECTRIC_ONLY, DEFAULT_CONF_ELECTRIC_ONLY))
         self._gas_only = bool(data.get(CONF_GAS_ONLY, DEFAULT_CONF_GAS_ONLY))
+        self._attribute_profile = data.get(CONF_ATTRIBUTE_PROFILE, DEFAULT_CONF_ATTRIBUTE_PROFILE)
+        self._nearest_count = data.get(CONF_NEAREST_COUNT, DEFAULT_CONF_NEAREST_COUNT)
+        self._vehicle_fields = data.get(CONF_VEHICLE_FIELDS, DEFAULT_CONF_VEHICLE_FIELDS)
+        self._stale_max_age = timedelta(minutes=data.get(CONF_STALE_MAX_AGE, DEFAULT_CONF_STALE_MAX_AGE))
+        self._search_area = data.get(CONF_SEARCH_AREA, DEFAULT_CONF_SEARCH_AREA)
+        self._polygon: Polygon | None = None
+        if self._search_area == SEARCH_AREA_POLYGON:
+            if self._location.startswith("zone."):
+                self._polygon = parse_polygon(data.get(CONF_POLYGON, DEFAULT_CONF_POLYGON))
+            else:
+                # The search box covering the polygon from a moving location would grow without bounds.
+                _LOGGER.warning(
+                    "%s is no zone, searching %s meters around it instead of the polygon",
+                    self._location,
+                    self._distance_meters,
+                )
+        elif self._search_area == SEARCH_AREA_ZONE:
+            zone = hass.states.get(self._location) if self._location.startswith("zone.") else None
+            if zone is not None and zone.attributes.get("radius") is not None:
+                self._distance_meters = round(zone.attributes["radius"])
+            else:
+                _LOGGER.warning(
+                    "%s is no zone with a radius, searching %s meters around it", self._location, self._distance_meters
+                )
 
         default_name = f"Miles cars close to {self._location}"
         if self._type_limit:
@@ -82,15 +217,32 @@ class CarApiSensor(Entity):
         self.attrs: dict[str, Any] = {
             "location": self._location,
             "distance_meters": self._distance_meters,
-            "device_key": self._api.device_key,
+            "device_key": data.get(CONF_DEVICE_KEY),
             "electric_only": self._electric_only,
             "gas_only": self._gas_only,
         }
+        if self._search_area != SEARCH_AREA_BOX:
+            self.attrs["search_area"] = self._search_area
 
         if self._type_limit:
             self.attrs["type_limit"] = self._type_limit
 
         self._available = True
+        self._written_available: bool | None = None
+        self._state: Optional[int] = None
+        self._positions: Positions | None = None
+        self._origin: tuple[float, float] | None = None
+
+    @property
+    def vehicle_filter(self) -> VehicleFilter:
+        return VehicleFilter(
+            distance_meters=self._distance_meters,
+            type_limit=tuple(self._type_limit) if self._type_limit else None,
+            electric_only=self._electric_only,
+            gas_only=self._gas_only,
+            circle=self._search_area in (SEARCH_AREA_CIRCLE, SEARCH_AREA_ZONE),
+            polygon=self._polygon,
+        )
 
     @property
     def name(self) -> str:
@@ -113,63 +265,234 @@ class CarApiSensor(Entity):
 
     @property
     def available(self) -> bool:
-        """Return True if entity is available."""
+        """Return True while the last good snapshot is younger than the staleness window."""
         return self._available
 
     @property
-    def state(self) -> Optional[int]:
+    def native_value(self) -> Optional[int]:
         return self._state
 
     @property
     def extra_state_attributes(self) -> Dict[str, Any]:
         return self.attrs
 
-    @property
-    def _job_parameters(self) -> Dict[str, Any]:
-        location = self._hass.states.get(self._location)
-        latitude = location.attributes.get("latitude")
-        longitude = location.attributes.get("longitude")
-        if latitude is None or longitude is None:
-            _LOGGER.error("Latitude or longitude is missing for sensor %s.", self.name)
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        if self._entry_id is not None:
+            aggregate_store = async_get_aggregate_store(self.hass)
+            await aggregate_store.async_load()
+            self._aggregates = aggregate_store.restore(self._entry_id)
+        self._update_from_snapshot()
+        self._update_age()
+        self._update_usual()
+        self._written_available = self.available
+        # A restored snapshot was already counted before the restart.
+        if self.coordinator.data is not None:
+            self._recorded_at = self.coordinator.data.fetched_at
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        # Skip the state write if neither the nearby vehicles, their age nor the availability changed.
+        changed = self._update_from_snapshot()
+        changed = self._update_age() or changed
+        changed = self._record_counts() or changed
+        if changed or self.available != self._written_available:
+            self._written_available = self.available
+            super()._handle_coordinator_update()
+
+    def _update_age(self) -> bool:
+        """Expose the age of the snapshot while refreshes fail and drop it once it is older than allowed."""
+        snapshot = self.coordinator.data
+        if snapshot is None or snapshot.fetched_at is None:
+            return False
+        if self.coordinator.last_update_success:
+            return self.attrs.pop("age_seconds", None) is not None
+
+        age = dt_util.utcnow() - snapshot.fetched_at
+        self._available = age <= self._stale_max_age
+        self.attrs["age_seconds"] = round(age.total_seconds())
+        return True
+
+    def _record_counts(self) -> bool:
+        """Add the counts of a new snapshot to the aggregates of the hour, returns True if the usual counts changed."""
+        snapshot = self.coordinator.data
+        if (
+            snapshot is None
+            or snapshot.fetched_at is None
+            or snapshot.fetched_at == self._recorded_at
+            or not self.coordinator.last_update_success
+            or self._state is None
+        ):
+            return False
+
+        self._recorded_at = snapshot.fetched_at
+        counts = {TOTAL_COUNT_KEY: self._state, **{key: self.attrs[key] for key in COUNT_ATTRIBUTES}}
+        if (summary := self._aggregates.record(snapshot.fetched_at, counts)) is not None:
+            self._async_add_statistics(summary)
+            if self._entry_id is not None:
+                async_get_aggregate_store(self.hass).async_save(self._entry_id, self._aggregates)
+        return self._update_usual()
+
+    def _update_usual(self) -> bool:
+        """Expose the usual number of vehicles at this hour of the week."""
+        if (usual := self._aggregates.usual(dt_util.utcnow(), TOTAL_COUNT_KEY)) is None:
+            return self.attrs.pop("usual_num_cars", None) is not None
+        minimum, mean, maximum = usual
+        previous = self.attrs.get("usual_num_cars")
+        self.attrs["usual_num_cars"] = {"min": round(minimum), "mean": round(mean, 1), "max": round(maximum)}
+        return self.attrs["usual_num_cars"] != previous
+
+    @callback
+    def _async_add_statistics(self, summary: HourSummary) -> None:
+        """Import the hourly minimum, mean and maximum of the counts by size and fuel type as statistics."""
+        if "recorder" not in self.hass.config.components:
+            return
+        # The recorder is optional, it is only imported once it is set up.
+        from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+        from homeassistant.components.recorder.statistics import async_add_external_statistics
+
+        statistic_id_prefix = f"{DOMAIN}:{slugify(self.unique_id)}"
+        for key, (minimum, mean, maximum) in summary.aggregates.items():
+            if key == TOTAL_COUNT_KEY:
+                # The recorder compiles the statistics of the state itself.
+                continue
+            metadata = StatisticMetaData(
+                has_mean=True,
+                has_sum=False,
+                name=f"{self.name} {key.replace('_', ' ')}",
+                source=DOMAIN,
+                statistic_id=f"{statistic_id_prefix}_{key}",
+                unit_of_measurement=None,
+            )
+            async_add_external_statistics(
+                self.hass, metadata, [StatisticData(start=summary.start, min=minimum, mean=mean, max=maximum)]
+            )
+
+    def _update_from_snapshot(self) -> bool:
+        snapshot = self.coordinator.data
+        if snapshot is None:
             self._available = False
-            return {}
+            return False
 
-        search_parameters = {
-            "lat": latitude,
-            "lon": longitude,
-            "meters": self._distance_meters,
-        }
-        query: VehicleQuery | None = None
+        self._available = True
+        vehicles = snapshot.vehicles_for(self.vehicle_filter)
+        origin = (snapshot.latitude, snapshot.longitude)
+        if self._positions is not None:
+            diff = diff_vehicles(self._positions, vehicles)
+            if not diff and origin == self._origin:
+                return False
+            if diff:
+                self.hass.bus.async_fire(
+                    EVENT_VEHICLES_CHANGED,
+                    {"entity_id": self.entity_id, "location": self._location, **diff.as_event_data()},
+                )
 
-        if self._type_limit:
-            query = VehicleQuery(
-                vehicle_size_filter=tuple(self._type_limit),
+        self._positions = vehicles.positions()
+        self._origin = origin
+        self._state = len(vehicles)
+        self.attrs.update(
+            format_attrs(
+                vehicles,
+                profile=self._attribute_profile,
+                nearest_count=self._nearest_count,
+                fields=self._vehicle_fields,
+                origin=origin,
             )
-            search_parameters["query"] = query
+        )
+        return True
 
-        return search_parameters
 
-    async def async_update(self) -> None:
-        try:
-            # Do something
-            self._available = True
+@dataclass(frozen=True, kw_only=True)
+class TelemetrySensorEntityDescription(SensorEntityDescription):
+    value_fn: Callable[[Telemetry], float | int | datetime | None]
+    attrs_fn: Callable[[Telemetry], dict[str, Any]] | None = None
 
-            search_parameters = self._job_parameters
-            if not search_parameters:
-                return
 
-            vehicles = await self.hass.async_add_executor_job(
-                partial(self._api.vehicles_meters_around_location, **search_parameters)
-            )
-            if self._electric_only:
-                vehicles = [vehicle for vehicle in vehicles if vehicle.electric]
+TELEMETRY_SENSORS = (
+    TelemetrySensorEntityDescription(
+        key="upstream_latency",
+        name="upstream latency",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda telemetry: telemetry.latency_percentile(50),
+        attrs_fn=lambda telemetry: {
+            "p90": telemetry.latency_percentile(90),
+            "p99": telemetry.latency_percentile(99),
+        },
+    ),
+    TelemetrySensorEntityDescription(
+        key="payload_size",
+        name="payload size",
+        device_class=SensorDeviceClass.DATA_SIZE,
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda telemetry: telemetry.last_payload_bytes,
+    ),
+    TelemetrySensorEntityDescription(
+        key="vehicles_parsed",
+        name="vehicles parsed",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda telemetry: telemetry.last_vehicles_parsed,
+    ),
+    TelemetrySensorEntityDescription(
+        key="executor_wait",
+        name="executor wait",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda telemetry: telemetry.executor_wait_percentile(50),
+        attrs_fn=lambda telemetry: {
+            "p90": telemetry.executor_wait_percentile(90),
+            "p99": telemetry.executor_wait_percentile(99),
+        },
+    ),
+    TelemetrySensorEntityDescription(
+        key="cache_hit_rate",
+        name="cache hit rate",
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda telemetry: telemetry.cache_hit_rate,
+    ),
+    TelemetrySensorEntityDescription(
+        key="consecutive_failures",
+        name="consecutive failures",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda telemetry: telemetry.consecutive_failures,
+    ),
+    TelemetrySensorEntityDescription(
+        key="last_success",
+        name="last successful update",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        value_fn=lambda telemetry: telemetry.last_success,
+    ),
+)
 
-            if self._gas_only:
-                vehicles = [vehicle for vehicle in vehicles if not vehicle.electric]
 
-            self._state = len(vehicles)
-            self.attrs.update(format_attrs(vehicles))
+class TelemetrySensor(CoordinatorEntity[VehicleAreaCoordinator], SensorEntity):
+    """Diagnostic sensor exposing the telemetry of a tracked location, disabled by default."""
 
-        except (ValueError, requests.ConnectionError):
-            self._available = False
-            _LOGGER.exception("Error retrieving data from Car API for sensor %s.", self.name)
+    entity_description: TelemetrySensorEntityDescription
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(self, coordinator: VehicleAreaCoordinator, description: TelemetrySensorEntityDescription) -> None:
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._attr_name = f"Miles cars close to {coordinator.location} {description.name}"
+        self._attr_unique_id = f"miles_cars_close_to_{coordinator.location.replace('.', '_')}_{description.key}"
+
+    @property
+    def available(self) -> bool:
+        # Telemetry is most interesting while the upstream API fails.
+        return True
+
+    @property
+    def native_value(self) -> float | int | datetime | None:
+        return self.entity_description.value_fn(self.coordinator.telemetry)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        if self.entity_description.attrs_fn is None:
+            return None
+        return self.entity_description.attrs_fn(self.coordinator.telemetry)
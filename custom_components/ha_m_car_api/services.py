@@ -1,74 +1,198 @@
-from functools import partial
-from typing import Awaitable, Callable
-from uuid import uuid4
+import asyncio
+from typing import Any, Awaitable, Callable
 
 from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse
-from m_car_api import vehicles_meters_around_location
-from m_car_api.api import VehicleQuery
 
+from custom_components.ha_m_car_api.cache import async_get_response_cache, async_get_tile_cache
 from custom_components.ha_m_car_api.const import (
+    CONF_BOUNDING_BOX,
+    CONF_CACHE_MAX_AGE,
+    CONF_CELL_SIZE_METERS,
+    CONF_COORDINATES,
+    CONF_CURSOR,
     CONF_DEVICE_KEY,
     CONF_DISTANCE_METERS,
     CONF_ELECTRIC_ONLY,
+    CONF_FIELDS,
     CONF_GAS_ONLY,
     CONF_LATITUDE,
+    CONF_LIMIT,
     CONF_LOCATION,
+    CONF_LOCATIONS,
     CONF_LONGITUDE,
+    CONF_MAX_CONCURRENCY,
+    CONF_SORT_BY,
     CONF_TYPE_LIMIT,
+    DEFAULT_CONF_CACHE_MAX_AGE,
+    DEFAULT_CONF_CELL_SIZE_METERS,
+    DEFAULT_CONF_MAX_CONCURRENCY,
+    SERVICE_CACHE_COORDINATE_PRECISION,
+    SORT_BY_DISTANCE,
+    VALID_SORT_FIELDS,
+    VALID_VEHICLE_FIELDS,
 )
-from custom_components.ha_m_car_api.response import format_attrs
+from custom_components.ha_m_car_api.grid import Grid
+from custom_components.ha_m_car_api.registry import async_get_client_registry
+from custom_components.ha_m_car_api.response import ResponseShape, SearchResult, merge_search_results, shape_vehicles
+from custom_components.ha_m_car_api.scheduler import PRIORITY_INTERACTIVE
+from custom_components.ha_m_car_api.snapshot import VehicleSnapshot
+from custom_components.ha_m_car_api.telemetry import async_get_telemetry
 
 
-def search_vehicles_service(hass: HomeAssistant) -> Callable[[ServiceCall], Awaitable[None]]:
+def _location_coordinates(hass: HomeAssistant, location: str) -> tuple[float, float]:
+    location_state = hass.states.get(location)
+    if location_state is None:
+        raise ValueError(f"Location {location} not found")
+
+    latitude = location_state.attributes.get("latitude", None)
+    longitude = location_state.attributes.get("longitude", None)
+    if latitude is None or longitude is None:
+        raise ValueError(f"Location {location} does not have latitude and longitude attributes")
+    return latitude, longitude
+
+
+def _coordinate_pair(value: Any) -> tuple[float, float]:
+    if isinstance(value, dict):
+        return float(value[CONF_LATITUDE]), float(value[CONF_LONGITUDE])
+    latitude, longitude = value
+    return float(latitude), float(longitude)
+
+
+def _response_shape(data: dict[str, Any]) -> ResponseShape:
+    fields = data.get(CONF_FIELDS, None)
+    if fields is not None:
+        if isinstance(fields, str):
+            fields = [fields]
+        if unknown := set(fields) - {*VALID_VEHICLE_FIELDS, SORT_BY_DISTANCE}:
+            raise ValueError(f"Unknown fields {', '.join(sorted(unknown))}")
+    sort_by = data.get(CONF_SORT_BY, None)
+    if sort_by is not None and sort_by.lstrip("-") not in VALID_SORT_FIELDS:
+        raise ValueError(f"Vehicles can only be sorted by {', '.join(VALID_SORT_FIELDS)}")
+    limit = data.get(CONF_LIMIT, None)
+    if limit is not None and int(limit) < 0:
+        raise ValueError("The limit can not be negative")
+    return ResponseShape(
+        fields=fields,
+        sort_by=sort_by,
+        limit=int(limit) if limit is not None else None,
+        cursor=data.get(CONF_CURSOR, None),
+    )
+
+
+def search_vehicles_service(hass: HomeAssistant) -> Callable[[ServiceCall], Awaitable[ServiceResponse]]:
 
     async def search_vehicles(call: ServiceCall) -> ServiceResponse:
-        device_key = call.data.get(CONF_DEVICE_KEY, None)
-        if not device_key:
-            device_key = str(uuid4())
+        registry = async_get_client_registry(hass)
+        device_key = call.data.get(CONF_DEVICE_KEY, None) or registry.service_device_key
 
-        latitude = call.data.get(CONF_LATITUDE, None)
-        longitude = call.data.get(CONF_LONGITUDE, None)
+        # Each origin is a (label, latitude, longitude) tuple, the label is the location if one was given.
+        origins: list[tuple[str | None, float, float]] = []
         location = call.data.get(CONF_LOCATION, None)
-
         if location:
-            location_state = hass.states.get(location)
-            if location_state is None:
-                raise ValueError("Location not found")
+            origins.append((location, *_location_coordinates(hass, location)))
+        elif call.data.get(CONF_LATITUDE) is not None and call.data.get(CONF_LONGITUDE) is not None:
+            origins.append((None, call.data[CONF_LATITUDE], call.data[CONF_LONGITUDE]))
 
-            latitude = location_state.attributes.get("latitude", None)
-            longitude = location_state.attributes.get("longitude", None)
-            if latitude is None or longitude is None:
-                raise ValueError("Location does not have latitude and longitude attributes")
+        batch = CONF_LOCATIONS in call.data or CONF_COORDINATES in call.data
+        for batch_location in call.data.get(CONF_LOCATIONS, None) or ():
+            origins.append((batch_location, *_location_coordinates(hass, batch_location)))
+        for coordinates in call.data.get(CONF_COORDINATES, None) or ():
+            origins.append((None, *_coordinate_pair(coordinates)))
 
-        if latitude is None or longitude is None:
+        if not origins:
             raise ValueError("Latitude and longitude or a location is required")
 
         distance_meters = call.data.get(CONF_DISTANCE_METERS, 500)
-        type_limit = call.data.get(CONF_TYPE_LIMIT, None)
-        query: VehicleQuery | None = None
-        if type_limit is not None:
-            query = VehicleQuery(
-                vehicle_size_filter=type_limit,
-            )
+        type_limit = tuple(sorted(call.data.get(CONF_TYPE_LIMIT, None) or ()))
+        fuel_filter: str | None = None
+        if call.data.get(CONF_GAS_ONLY, False):
+            fuel_filter = CONF_GAS_ONLY
+        elif call.data.get(CONF_ELECTRIC_ONLY, False):
+            fuel_filter = CONF_ELECTRIC_ONLY
+        max_age = call.data.get(CONF_CACHE_MAX_AGE, DEFAULT_CONF_CACHE_MAX_AGE)
+        shape = _response_shape(call.data)
 
-        vehicles = await hass.async_add_executor_job(
-            partial(
-                vehicles_meters_around_location,
-                device_key=device_key,
-                lat=latitude,
-                lon=longitude,
-                meters=distance_meters,
-                query=query,
-            )
-        )
+        # Held for the whole call, the origins of a batch share the client and its hello handshake.
+        with registry.async_hold(device_key) as client:
+
+            async def search(latitude: float, longitude: float) -> SearchResult:
+                latitude = round(latitude, SERVICE_CACHE_COORDINATE_PRECISION)
+                longitude = round(longitude, SERVICE_CACHE_COORDINATE_PRECISION)
 
-        gas_only = call.data.get(CONF_GAS_ONLY, False)
-        electric_only = call.data.get(CONF_ELECTRIC_ONLY, False)
-        if gas_only:
-            vehicles = [vehicle for vehicle in vehicles if not vehicle.electric]
-        elif electric_only:
-            vehicles = [vehicle for vehicle in vehicles if vehicle.electric]
+                async def fetch() -> SearchResult:
+                    vehicles = await async_get_tile_cache(hass).async_vehicles_around(
+                        client,
+                        lat=latitude,
+                        lon=longitude,
+                        meters=distance_meters,
+                        sizes=type_limit,
+                        electric=None if fuel_filter is None else fuel_filter == CONF_ELECTRIC_ONLY,
+                        telemetry=async_get_telemetry(hass),
+                        # Someone waits for the response, go ahead of the background refreshes.
+                        priority=PRIORITY_INTERACTIVE,
+                        max_age=max_age,
+                    )
+                    # The vehicles are only serialised per call, with the fields and the page it asked for.
+                    snapshot = VehicleSnapshot.from_vehicles(vehicles)
+                    return SearchResult(snapshot, snapshot.counts())
 
-        return format_attrs(vehicles)
+                cache_key = (latitude, longitude, distance_meters, type_limit, fuel_filter)
+                return await async_get_response_cache(hass).async_get(cache_key, fetch, max_age=max_age)
+
+            if not batch:
+                _, latitude, longitude = origins[0]
+                result = await search(latitude, longitude)
+                return {**result.attrs, **shape_vehicles(result.snapshot, shape, [(latitude, longitude)])}
+
+            semaphore = asyncio.Semaphore(max(call.data.get(CONF_MAX_CONCURRENCY, DEFAULT_CONF_MAX_CONCURRENCY), 1))
+
+            async def bounded_search(latitude: float, longitude: float) -> SearchResult:
+                async with semaphore:
+                    return await search(latitude, longitude)
+
+            results = await asyncio.gather(*(bounded_search(latitude, longitude) for _, latitude, longitude in origins))
+            return {
+                "results": [
+                    {
+                        CONF_LOCATION: label,
+                        CONF_LATITUDE: latitude,
+                        CONF_LONGITUDE: longitude,
+                        **result.attrs,
+                        **shape_vehicles(result.snapshot, shape, [(latitude, longitude)]),
+                    }
+                    for (label, latitude, longitude), result in zip(origins, results)
+                ],
+                "merged": merge_search_results(
+                    results, shape, [(latitude, longitude) for _, latitude, longitude in origins]
+                ),
+            }
 
     return search_vehicles
+
+
+def vehicle_grid_service(hass: HomeAssistant) -> Callable[[ServiceCall], Awaitable[ServiceResponse]]:
+
+    async def vehicle_grid(call: ServiceCall) -> ServiceResponse:
+        if not call.data.get(CONF_BOUNDING_BOX):
+            raise ValueError("A bounding box [south, west, north, east] is required")
+        south, west, north, east = (float(value) for value in call.data[CONF_BOUNDING_BOX])
+        grid = Grid.covering(
+            south, west, north, east, call.data.get(CONF_CELL_SIZE_METERS, DEFAULT_CONF_CELL_SIZE_METERS)
+        )
+
+        registry = async_get_client_registry(hass)
+        device_key = call.data.get(CONF_DEVICE_KEY, None) or registry.service_device_key
+        # The tiles covering the box are fetched in a single upstream call, unless they are all fresh already.
+        with registry.async_hold(device_key) as client:
+            vehicles = await async_get_tile_cache(hass).async_vehicles_in_box(
+                client,
+                lat=(south + north) / 2,
+                lon=(west + east) / 2,
+                lat_delta=north - south,
+                lon_delta=east - west,
+                telemetry=async_get_telemetry(hass),
+                priority=PRIORITY_INTERACTIVE,
+            )
+        return grid.counts(VehicleSnapshot.from_vehicles(vehicles))
+
+    return vehicle_grid
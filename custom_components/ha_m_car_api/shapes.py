@@ -0,0 +1,88 @@
+import math
+from typing import Sequence
+
+from custom_components.ha_m_car_api.const import VECTORIZE_MIN_VEHICLES
+from custom_components.ha_m_car_api.geo import EARTH_RADIUS_METERS, bounding_box_deltas, np
+from custom_components.ha_m_car_api.ranking import distances_meters
+
+# Points as (latitude, longitude), the last one connects back to the first.
+Polygon = tuple[tuple[float, float], ...]
+
+
+def parse_polygon(value: str) -> Polygon:
+    """Parse "lat,lon; lat,lon; ..." into a polygon of at least three points."""
+    points = []
+    for point in value.split(";"):
+        if not point.strip():
+            continue
+        latitude, longitude = (float(part) for part in point.split(","))
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValueError(f"{point.strip()} is not a coordinate")
+        points.append((latitude, longitude))
+    if len(points) < 3:
+        raise ValueError("A polygon needs at least three points")
+    return tuple(points)
+
+
+def covering_radius_meters(lat: float, lon: float, points: Sequence[tuple[float, float]]) -> int:
+    """Return the radius whose search box around the location contains all points.
+
+    The upstream API searches a box which spans the same degrees in latitude and longitude, so it is narrower than
+    the radius from east to west.
+    """
+    lat_delta, lon_delta = bounding_box_deltas(lat, lon, 1000)
+    return math.ceil(
+        max(
+            max(abs(point_lat - lat) / lat_delta, abs(point_lon - lon) / lon_delta) * 2000
+            for point_lat, point_lon in points
+        )
+    )
+
+
+def circle_extremes(lat: float, lon: float, radius_meters: float) -> tuple[tuple[float, float], tuple[float, float]]:
+    """Return the northern and eastern most points of the circle around the location."""
+    angle = radius_meters / EARTH_RADIUS_METERS
+    return (lat + math.degrees(angle), lon), (lat, lon + math.degrees(angle / math.cos(math.radians(lat))))
+
+
+def within_radius(
+    lat: float, lon: float, radius_meters: float, latitudes: Sequence[float], longitudes: Sequence[float]
+) -> list[int]:
+    """Return the indices of the points in the circle around the location."""
+    return [
+        index
+        for index, distance in enumerate(distances_meters(lat, lon, latitudes, longitudes))
+        if distance <= radius_meters
+    ]
+
+
+def within_polygon(polygon: Polygon, latitudes: Sequence[float], longitudes: Sequence[float]) -> list[int]:
+    """Return the indices of the points inside the polygon.
+
+    Casts a ray from every point and counts the edges it crosses, an odd count is inside. Larger sets are tested
+    one edge at a time against all points at once.
+    """
+    edges = [(start, end) for start, end in zip(polygon, polygon[1:] + polygon[:1]) if start[0] != end[0]]
+    if np is None or len(latitudes) < VECTORIZE_MIN_VEHICLES:
+        return [
+            index
+            for index, (latitude, longitude) in enumerate(zip(latitudes, longitudes))
+            if _crossings(edges, latitude, longitude) % 2
+        ]
+
+    point_lats = np.asarray(latitudes, dtype=float)
+    point_lons = np.asarray(longitudes, dtype=float)
+    inside = np.zeros(len(point_lats), dtype=bool)
+    for (lat1, lon1), (lat2, lon2) in edges:
+        spans = (lat1 > point_lats) != (lat2 > point_lats)
+        inside ^= spans & (point_lons < lon1 + (point_lats - lat1) * (lon2 - lon1) / (lat2 - lat1))
+    return np.flatnonzero(inside).tolist()
+
+
+def _crossings(edges: list[tuple[tuple[float, float], tuple[float, float]]], latitude: float, longitude: float) -> int:
+    return sum(
+        1
+        for (lat1, lon1), (lat2, lon2) in edges
+        if (lat1 > latitude) != (lat2 > latitude)
+        and longitude < lon1 + (latitude - lat1) * (lon2 - lon1) / (lat2 - lat1)
+    )
@@ -0,0 +1,139 @@
+from typing import Any, Collection, Iterable, Sequence
+
+from m_car_api.objects import Vehicle
+
+from custom_components.ha_m_car_api.const import UPSTREAM_DISTANCE_FIELDS, VALID_CAR_TYPES
+
+COUNT_KEYS = {
+    (size, electric): (f"number_car_{size.lower()}", f"number_car_{size.lower()}_{'electric' if electric else 'gas'}")
+    for size in VALID_CAR_TYPES
+    for electric in (True, False)
+}
+
+
+class VehicleSnapshot:
+    """Column oriented view on a vehicle search result.
+
+    The fields needed for filtering, counting and diffing are read once from the pydantic models into parallel
+    lists. The models themselves are only touched again when they get serialised for an attribute or response.
+    """
+
+    __slots__ = ("vehicles", "ids", "latitudes", "longitudes", "sizes", "electric")
+
+    def __init__(
+        self,
+        vehicles: list[Vehicle],
+        ids: list[int],
+        latitudes: list[float],
+        longitudes: list[float],
+        sizes: list[str],
+        electric: list[bool],
+    ) -> None:
+        self.vehicles = vehicles
+        self.ids = ids
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+        self.sizes = sizes
+        self.electric = electric
+
+    @classmethod
+    def from_vehicles(cls, vehicles: Iterable[Vehicle]) -> "VehicleSnapshot":
+        snapshot = cls([], [], [], [], [], [])
+        for vehicle in vehicles:
+            snapshot.vehicles.append(vehicle)
+            snapshot.ids.append(vehicle.id)
+            snapshot.latitudes.append(vehicle.latitude)
+            snapshot.longitudes.append(vehicle.longitude)
+            snapshot.sizes.append(vehicle.size)
+            snapshot.electric.append(vehicle.electric)
+        return snapshot
+
+    @classmethod
+    def merge(cls, snapshots: Iterable["VehicleSnapshot"]) -> "VehicleSnapshot":
+        """Concatenate the snapshots, keeping the first occurrence of every vehicle ID."""
+        merged = cls([], [], [], [], [], [])
+        seen: set[int] = set()
+        for snapshot in snapshots:
+            for index, vehicle_id in enumerate(snapshot.ids):
+                if vehicle_id in seen:
+                    continue
+                seen.add(vehicle_id)
+                merged.vehicles.append(snapshot.vehicles[index])
+                merged.ids.append(vehicle_id)
+                merged.latitudes.append(snapshot.latitudes[index])
+                merged.longitudes.append(snapshot.longitudes[index])
+                merged.sizes.append(snapshot.sizes[index])
+                merged.electric.append(snapshot.electric[index])
+        return merged
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def select(self, indices: Sequence[int]) -> "VehicleSnapshot":
+        return VehicleSnapshot(
+            [self.vehicles[index] for index in indices],
+            [self.ids[index] for index in indices],
+            [self.latitudes[index] for index in indices],
+            [self.longitudes[index] for index in indices],
+            [self.sizes[index] for index in indices],
+            [self.electric[index] for index in indices],
+        )
+
+    def where(
+        self,
+        sizes: Collection[str] | None = None,
+        electric: bool | None = None,
+        box: tuple[float, float, float, float] | None = None,
+    ) -> "VehicleSnapshot":
+        """Return the vehicles matching the sizes, the fuel type and the (lat, lon, lat_delta, lon_delta) box."""
+        if not sizes and electric is None and box is None:
+            return self
+
+        size_set = set(sizes) if sizes else None
+        if box is not None:
+            lat, lon, lat_delta, lon_delta = box
+            half_lat_delta, half_lon_delta = lat_delta / 2, lon_delta / 2
+
+        indices = []
+        for index, (size, is_electric, latitude, longitude) in enumerate(
+            zip(self.sizes, self.electric, self.latitudes, self.longitudes)
+        ):
+            if size_set is not None and size not in size_set:
+                continue
+            if electric is not None and is_electric != electric:
+                continue
+            if box is not None and (abs(latitude - lat) > half_lat_delta or abs(longitude - lon) > half_lon_delta):
+                continue
+            indices.append(index)
+
+        if len(indices) == len(self):
+            return self
+        return self.select(indices)
+
+    def counts(self) -> dict[str, int]:
+        counts = {"num_electric_cars": 0, "num_gas_cars": 0}
+        for size_key, fuel_key in COUNT_KEYS.values():
+            counts[size_key] = 0
+            counts[fuel_key] = 0
+
+        for key in zip(self.sizes, self.electric):
+            size_key, fuel_key = COUNT_KEYS[key]
+            counts[size_key] += 1
+            counts[fuel_key] += 1
+        counts["num_electric_cars"] = sum(self.electric)
+        counts["num_gas_cars"] = len(self) - counts["num_electric_cars"]
+        return counts
+
+    def positions(self) -> dict[int, tuple[float, float]]:
+        return dict(zip(self.ids, zip(self.latitudes, self.longitudes)))
+
+    def as_dicts(
+        self, fields: Collection[str] | None = None, indices: Iterable[int] | None = None
+    ) -> list[dict[str, Any]]:
+        """Serialise the vehicles without their upstream distances, limited to the given fields and indices if passed."""
+        include = set(fields) if fields is not None else None
+        vehicles = self.vehicles if indices is None else [self.vehicles[index] for index in indices]
+        return [vehicle.dict(include=include, exclude=UPSTREAM_DISTANCE_FIELDS) for vehicle in vehicles]
+
+
+EMPTY_SNAPSHOT = VehicleSnapshot([], [], [], [], [], [])
@@ -0,0 +1,178 @@
+import asyncio
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+from m_car_api.objects import Vehicle
+
+from custom_components.ha_m_car_api.aggregates import HourOfWeekAggregates
+from custom_components.ha_m_car_api.const import (
+    AGGREGATE_STORAGE_KEY,
+    DATA_AGGREGATE_STORE,
+    DATA_SNAPSHOT_STORE,
+    DOMAIN,
+    STORAGE_KEY,
+    STORAGE_SAVE_DELAY,
+    STORAGE_VERSION,
+)
+from custom_components.ha_m_car_api.coordinator import AreaSnapshot
+from custom_components.ha_m_car_api.executor import async_get_executor
+from custom_components.ha_m_car_api.snapshot import VehicleSnapshot
+
+
+def _payload_keys() -> dict[str, str]:
+    """Map the attributes of a vehicle to the keys of the upstream payload they were validated from.
+
+    Computed attributes are left out, they are derived from the others again when the payload is validated.
+    """
+    if hasattr(Vehicle, "model_fields"):
+        return {name: field.alias for name, field in Vehicle.model_fields.items() if field.alias}
+    return {name: field.alias for name, field in Vehicle.__fields__.items() if field.has_alias}
+
+
+PAYLOAD_KEYS = _payload_keys()
+
+
+def _vehicle_payload(vehicle: Vehicle) -> dict[str, Any]:
+    # vehicle.dict() drops the excluded source fields the computed prices are built from.
+    return {key: getattr(vehicle, name) for name, key in PAYLOAD_KEYS.items()}
+
+
+def _serialize(snapshot: AreaSnapshot) -> dict[str, Any]:
+    return {
+        "latitude": snapshot.latitude,
+        "longitude": snapshot.longitude,
+        "distance_meters": snapshot.distance_meters,
+        "type_limit": snapshot.type_limit,
+        "electric": snapshot.electric,
+        "fetched_at": snapshot.fetched_at.isoformat() if snapshot.fetched_at else None,
+        "vehicles": [_vehicle_payload(vehicle) for vehicle in snapshot.vehicles.vehicles],
+    }
+
+
+def _deserialize(data: dict[str, Any]) -> AreaSnapshot:
+    # Validated again, so that the computed fields are there whichever pydantic version is installed.
+    vehicles = [Vehicle(**vehicle) for vehicle in data["vehicles"]]
+    return AreaSnapshot(
+        data["latitude"],
+        data["longitude"],
+        data["distance_meters"],
+        tuple(data["type_limit"]) if data["type_limit"] else None,
+        data["electric"],
+        VehicleSnapshot.from_vehicles(vehicles),
+        dt_util.parse_datetime(data["fetched_at"]) if data["fetched_at"] else None,
+    )
+
+
+class SnapshotStore:
+    """Persists the last snapshot of every area so sensors have a state right after a restart.
+
+    Writes are delayed and coalesced, the snapshots are only serialised when they are written.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self._hass = hass
+        self._store: Store[dict[str, dict[str, Any]]] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._stored: dict[str, dict[str, Any]] = {}
+        self._snapshots: dict[str, AreaSnapshot] = {}
+        self._load_lock = asyncio.Lock()
+        self._loaded = False
+
+    async def async_load(self) -> None:
+        async with self._load_lock:
+            if not self._loaded:
+                self._stored = await self._store.async_load() or {}
+                self._loaded = True
+
+    async def async_restore(self, location: str) -> AreaSnapshot | None:
+        # A snapshot waiting for the delayed write is newer than the stored one, e.g. when an entry is reloaded.
+        if (snapshot := self._snapshots.get(location)) is not None:
+            return snapshot
+        if (data := self._stored.get(location)) is None:
+            return None
+        try:
+            # Validating thousands of vehicles takes a while, keep it off the event loop like a fetched payload.
+            return await async_get_executor(self._hass).async_run(_deserialize, data)
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    @callback
+    def async_save(self, location: str, snapshot: AreaSnapshot) -> None:
+        self._snapshots[location] = snapshot
+        self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+    @callback
+    def async_remove(self, location: str) -> None:
+        self._snapshots.pop(location, None)
+        if self._stored.pop(location, None) is not None:
+            self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict[str, dict[str, Any]]:
+        for location, snapshot in self._snapshots.items():
+            self._stored[location] = _serialize(snapshot)
+        self._snapshots.clear()
+        return self._stored
+
+
+@callback
+def async_get_snapshot_store(hass: HomeAssistant) -> SnapshotStore:
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_SNAPSHOT_STORE not in domain_data:
+        domain_data[DATA_SNAPSHOT_STORE] = SnapshotStore(hass)
+    return domain_data[DATA_SNAPSHOT_STORE]
+
+
+class AggregateStore:
+    """Persists the hour of the week aggregates of the sensors keyed by their config entry, like the snapshots."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self._store: Store[dict[str, dict[str, Any]]] = Store(hass, STORAGE_VERSION, AGGREGATE_STORAGE_KEY)
+        self._stored: dict[str, dict[str, Any]] = {}
+        self._aggregates: dict[str, HourOfWeekAggregates] = {}
+        self._load_lock = asyncio.Lock()
+        self._loaded = False
+
+    async def async_load(self) -> None:
+        async with self._load_lock:
+            if not self._loaded:
+                self._stored = await self._store.async_load() or {}
+                self._loaded = True
+
+    def restore(self, entry_id: str) -> HourOfWeekAggregates:
+        # The hours folded in since the last write are lost otherwise once the reloaded sensor saves again.
+        if (aggregates := self._aggregates.get(entry_id)) is not None:
+            return aggregates
+        if (data := self._stored.get(entry_id)) is not None:
+            try:
+                return HourOfWeekAggregates.from_dict(data)
+            except (KeyError, TypeError, ValueError):
+                pass
+        return HourOfWeekAggregates()
+
+    @callback
+    def async_save(self, entry_id: str, aggregates: HourOfWeekAggregates) -> None:
+        self._aggregates[entry_id] = aggregates
+        self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+    @callback
+    def async_remove(self, entry_id: str) -> None:
+        self._aggregates.pop(entry_id, None)
+        if self._stored.pop(entry_id, None) is not None:
+            self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict[str, dict[str, Any]]:
+        for entry_id, aggregates in self._aggregates.items():
+            self._stored[entry_id] = aggregates.as_dict()
+        self._aggregates.clear()
+        return self._stored
+
+
+@callback
+def async_get_aggregate_store(hass: HomeAssistant) -> AggregateStore:
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_AGGREGATE_STORE not in domain_data:
+        domain_data[DATA_AGGREGATE_STORE] = AggregateStore(hass)
+    return domain_data[DATA_AGGREGATE_STORE]
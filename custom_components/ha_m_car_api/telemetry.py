@@ -0,0 +1,134 @@
+import math
+from collections import deque
+from datetime import datetime
+from typing import Any, Sequence
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+
+from custom_components.ha_m_car_api.const import DATA_TELEMETRY, DEFAULT_TELEMETRY_SAMPLES, DOMAIN
+
+
+def percentile(values: Sequence[float], percent: float) -> float | None:
+    """Return the nearest-rank percentile of the values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+
+def _milliseconds(seconds: float | None) -> float | None:
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+class Telemetry:
+    """Performance counters of the upstream calls and refreshes of one area or the whole integration.
+
+    Everything recorded is forwarded to the parent, so the integration-wide telemetry sums up all areas.
+    """
+
+    def __init__(self, parent: "Telemetry | None" = None, samples: int = DEFAULT_TELEMETRY_SAMPLES) -> None:
+        self.parent = parent
+        self.latencies: deque[float] = deque(maxlen=samples)
+        self.executor_waits: deque[float] = deque(maxlen=samples)
+        self.payload_bytes: deque[int] = deque(maxlen=samples)
+        self.vehicles_parsed: deque[int] = deque(maxlen=samples)
+        self.requests = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_success: datetime | None = None
+        self.last_failure: datetime | None = None
+        self.last_error: str | None = None
+
+    def record_request(self, latency: float, payload_bytes: int, vehicles: int, executor_wait: float) -> None:
+        self.requests += 1
+        self.latencies.append(latency)
+        self.payload_bytes.append(payload_bytes)
+        self.vehicles_parsed.append(vehicles)
+        self.executor_waits.append(executor_wait)
+        if self.parent is not None:
+            self.parent.record_request(latency, payload_bytes, vehicles, executor_wait)
+
+    def record_cache(self, hit: bool) -> None:
+        if hit:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+        if self.parent is not None:
+            self.parent.record_cache(hit)
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self.last_success = dt_util.utcnow()
+        if self.parent is not None:
+            self.parent.record_success()
+
+    def record_failure(self, error: Exception) -> None:
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_failure = dt_util.utcnow()
+        self.last_error = str(error)
+        if self.parent is not None:
+            self.parent.record_failure(error)
+
+    def latency_percentile(self, percent: float) -> float | None:
+        return _milliseconds(percentile(self.latencies, percent))
+
+    def executor_wait_percentile(self, percent: float) -> float | None:
+        return _milliseconds(percentile(self.executor_waits, percent))
+
+    @property
+    def last_payload_bytes(self) -> int | None:
+        return self.payload_bytes[-1] if self.payload_bytes else None
+
+    @property
+    def last_vehicles_parsed(self) -> int | None:
+        return self.vehicles_parsed[-1] if self.vehicles_parsed else None
+
+    @property
+    def cache_hit_rate(self) -> float | None:
+        lookups = self.cache_hits + self.cache_misses
+        return round(100 * self.cache_hits / lookups, 1) if lookups else None
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "upstream_latency_ms": {
+                "p50": self.latency_percentile(50),
+                "p90": self.latency_percentile(90),
+                "p99": self.latency_percentile(99),
+            },
+            "executor_wait_ms": {
+                "p50": self.executor_wait_percentile(50),
+                "p90": self.executor_wait_percentile(90),
+                "p99": self.executor_wait_percentile(99),
+            },
+            "payload_bytes": {
+                "last": self.last_payload_bytes,
+                "max": max(self.payload_bytes, default=None),
+            },
+            "vehicles_parsed": {
+                "last": self.last_vehicles_parsed,
+                "max": max(self.vehicles_parsed, default=None),
+            },
+            "cache": {
+                "hits": self.cache_hits,
+                "misses": self.cache_misses,
+                "hit_rate": self.cache_hit_rate,
+            },
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "last_success": self.last_success.isoformat() if self.last_success else None,
+            "last_failure": self.last_failure.isoformat() if self.last_failure else None,
+            "last_error": self.last_error,
+        }
+
+
+@callback
+def async_get_telemetry(hass: HomeAssistant) -> Telemetry:
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_TELEMETRY not in domain_data:
+        domain_data[DATA_TELEMETRY] = Telemetry()
+    return domain_data[DATA_TELEMETRY]
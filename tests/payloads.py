@@ -0,0 +1,124 @@
+"""Payloads in the format of the M API vehicle search endpoint and vehicles and snapshots built from them."""
+
+import random
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Iterable
+
+from custom_components.ha_m_car_api.const import VALID_CAR_TYPES, VECTORIZE_MIN_VEHICLES
+from custom_components.ha_m_car_api.coordinator import AreaSnapshot
+from custom_components.ha_m_car_api.snapshot import VehicleSnapshot
+
+
+def vehicle_payload(
+    vehicle_id: int,
+    latitude: float = 52.52,
+    longitude: float = 13.405,
+    size: str = "M",
+    electric: bool = False,
+) -> dict[str, Any]:
+    return {
+        "idVehicle": vehicle_id,
+        "idCity": "BER",
+        "LicensePlate": f"B-MI {vehicle_id}",
+        "VehicleType": "VW Polo",
+        "VehicleColor": "white",
+        "VehicleSize": size,
+        "isElectric": electric,
+        "Latitude": latitude,
+        "Longitude": longitude,
+        "DistanceFromUserPosition": 0.0,
+        "DistanceFromMiddlePosition": 0.0,
+        "idVehicleStatus": "V",
+        "GSMCoverage": 5,
+        "SatelliteNumber": 9,
+        "RentalPrice_row1": "0.89",
+        "RentalPrice_row1unit": "€/km",
+        "RentalPrice_discounted": None,
+        "RentalPrice_row2": "",
+        "RentalPrice_discountSource": None,
+        "ParkingPrice": "0.29",
+        "ParkingPrice_discounted": None,
+        "ParkingPrice_unit": "€/min",
+        "UnlockFee": "1",
+        "UnlockFee_discounted": None,
+        "UnlockFee_unit": "€",
+        "FuelPct": "50%",
+        "FuelLevelIcon": 3,
+        "RemainingRange": "200 km",
+        "EVPlugged": False,
+        "FVDPrice": "",
+        "URLVehicleImage": "",
+        "RookieDelayTxt": "",
+        "nDaysRookieDelay": 0,
+        "PremiumRestrictedTxt": "",
+        "CityToCityOptions": None,
+        "JSONVehicleDamages": None,
+        "JSONVehicleBanner": None,
+    }
+
+
+def search_payload(vehicles: list[dict[str, Any]]) -> dict[str, Any]:
+    return {
+        "Result": "OK",
+        "ResponseText": None,
+        "Data": {
+            "response": {
+                "Result": "OK",
+                "ResponseText": None,
+                "idVehicleBooked": None,
+                "idRide": None,
+                "idVehicleInRide": None,
+                "NearestIdCity": "BER",
+                "LivePayment": False,
+                "TopUpRequired": False,
+                "userAppVersion": "4.31",
+                "nFilterElements": 0,
+                "UserInOpsMode": False,
+                "SpecialAirportRate": None,
+                "SpecialAirportRate_E": None,
+                "SpecialAirportRate_2": None,
+                "SpecialAirportRate_E_2": None,
+                "UsesPPC": False,
+                "CurrentSubscription": None,
+                "JSONCityAreas": "[]",
+                "CityAreasTimestamp": "2020-01-03 00:00:00",
+                "AdditionalInfo": "",
+            },
+            "vehicles": vehicles,
+        },
+    }
+
+
+def vehicle_stub(
+    vehicle_id: int, latitude: float = 52.52, longitude: float = 13.405, size: str = "M", electric: bool = False
+) -> SimpleNamespace:
+    """Return the fields of a vehicle a snapshot reads, for tests which never serialise the vehicles."""
+    return SimpleNamespace(id=vehicle_id, size=size, electric=electric, latitude=latitude, longitude=longitude)
+
+
+def random_vehicles(
+    south: float,
+    west: float,
+    north: float,
+    east: float,
+    count: int = VECTORIZE_MIN_VEHICLES * 4,
+    seed: int = 1,
+) -> list[SimpleNamespace]:
+    """Return vehicles of random sizes and fuel types spread over the box, by default enough to be vectorised."""
+    generator = random.Random(seed)
+    return [
+        vehicle_stub(
+            vehicle_id,
+            south + generator.random() * (north - south),
+            west + generator.random() * (east - west),
+            generator.choice(VALID_CAR_TYPES),
+            generator.random() < 0.3,
+        )
+        for vehicle_id in range(count)
+    ]
+
+
+def area_snapshot(vehicles: Iterable[Any], fetched_at: datetime | None = None) -> AreaSnapshot:
+    """Return the snapshot of a search 5 km around (52.52, 13.405)."""
+    return AreaSnapshot(52.52, 13.405, 5000, None, None, VehicleSnapshot.from_vehicles(vehicles), fetched_at)
@@ -0,0 +1,47 @@
+"""Test the churn based scan interval."""
+
+from datetime import datetime, timedelta, timezone
+
+from custom_components.ha_m_car_api.adaptive import ChurnTracker
+
+MINIMUM = timedelta(minutes=1)
+MAXIMUM = timedelta(minutes=30)
+DEFAULT = timedelta(minutes=2)
+
+
+def test_interval_defaults_without_measurements() -> None:
+    tracker = ChurnTracker()
+    at = datetime(2026, 1, 5, 8, tzinfo=timezone.utc)
+    tracker.record(at, [1, 2, 3])
+
+    assert tracker.interval(at, DEFAULT, MINIMUM, MAXIMUM) == DEFAULT
+    assert tracker.interval(at, timedelta(minutes=60), MINIMUM, MAXIMUM) == MAXIMUM
+
+
+def test_interval_follows_churn_of_the_hour() -> None:
+    tracker = ChurnTracker(smoothing=1)
+    start = datetime(2026, 1, 5, 8, tzinfo=timezone.utc)
+    tracker.record(start, [1, 2, 3])
+    # Two vehicles left and one arrived within 10 minutes.
+    tracker.record(start + timedelta(minutes=10), [1, 4])
+
+    assert tracker.interval(start, DEFAULT, MINIMUM, MAXIMUM) == timedelta(minutes=10 / 3)
+    # Nothing was measured for the evening yet.
+    assert tracker.interval(start + timedelta(hours=10), DEFAULT, MINIMUM, MAXIMUM) == DEFAULT
+
+    tracker.record(start + timedelta(minutes=20), [1, 4])
+    assert tracker.interval(start, DEFAULT, MINIMUM, MAXIMUM) == MAXIMUM
+
+    tracker.record(start + timedelta(minutes=21), list(range(100, 200)))
+    assert tracker.interval(start, DEFAULT, MINIMUM, MAXIMUM) == MINIMUM
+
+
+def test_churn_is_smoothed() -> None:
+    tracker = ChurnTracker(smoothing=0.5)
+    start = datetime(2026, 1, 5, 8, tzinfo=timezone.utc)
+    tracker.record(start, [1])
+    tracker.record(start + timedelta(minutes=1), [2])
+    tracker.record(start + timedelta(minutes=2), [2])
+
+    assert tracker.statistics["churn_per_minute_by_hour"].count(None) == 23
+    assert tracker.interval(start, DEFAULT, MINIMUM, MAXIMUM) == timedelta(minutes=1)
@@ -0,0 +1,46 @@
+"""Test the hour of the week aggregates of the vehicle counts."""
+
+from datetime import datetime, timedelta, timezone
+
+from custom_components.ha_m_car_api.aggregates import HOURS_PER_WEEK, HourOfWeekAggregates, hour_of_week
+
+# A Monday.
+START = datetime(2026, 1, 5, 8, tzinfo=timezone.utc)
+
+
+def test_hour_is_summarised_once_it_is_over() -> None:
+    aggregates = HourOfWeekAggregates()
+
+    assert aggregates.record(START, {"num_cars": 4, "number_car_s": 1}) is None
+    assert aggregates.record(START + timedelta(minutes=20), {"num_cars": 2, "number_car_s": 0}) is None
+    assert aggregates.record(START + timedelta(minutes=40), {"num_cars": 6, "number_car_s": 2}) is None
+    summary = aggregates.record(START + timedelta(hours=1, minutes=5), {"num_cars": 3, "number_car_s": 1})
+
+    assert summary is not None
+    assert summary.start == START
+    assert summary.aggregates == {"num_cars": (2, 4, 6), "number_car_s": (0, 1, 2)}
+    assert aggregates.usual(START + timedelta(minutes=30), "num_cars") == (2, 4, 6)
+    assert aggregates.usual(START + timedelta(hours=1), "num_cars") is None
+
+
+def test_same_hour_of_the_following_weeks_is_averaged() -> None:
+    aggregates = HourOfWeekAggregates(smoothing=0.5)
+    aggregates.record(START, {"num_cars": 4})
+    next_week = START + timedelta(weeks=1)
+    aggregates.record(next_week, {"num_cars": 8})
+    aggregates.record(next_week + timedelta(hours=1), {"num_cars": 0})
+
+    assert hour_of_week(START) == hour_of_week(next_week)
+    assert aggregates.usual(START, "num_cars") == (6, 6, 6)
+
+
+def test_profile_round_trips() -> None:
+    aggregates = HourOfWeekAggregates()
+    aggregates.record(START, {"num_cars": 1})
+    aggregates.record(START + timedelta(minutes=30), {"num_cars": 2})
+    aggregates.record(START + timedelta(hours=1), {"num_cars": 3})
+
+    restored = HourOfWeekAggregates.from_dict(aggregates.as_dict())
+    assert restored.usual(START, "num_cars") == (1, 1.5, 2)
+    assert sum(bool(usual) for usual in restored.profile) == 1
+    assert len(restored.profile) == HOURS_PER_WEEK
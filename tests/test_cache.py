@@ -0,0 +1,120 @@
+"""Test the geo-tiled vehicle cache and the service response cache."""
+
+import asyncio
+
+from m_car_api.api import VehicleQuery
+from m_car_api.objects import Vehicle
+
+from custom_components.ha_m_car_api.cache import ResponseCache, VehicleTileCache
+from custom_components.ha_m_car_api.scheduler import PRIORITY_BACKGROUND
+from custom_components.ha_m_car_api.telemetry import Telemetry
+from tests.payloads import vehicle_payload
+
+
+class FakeMApi:
+    def __init__(self, vehicles: list[Vehicle]) -> None:
+        self._vehicles = vehicles
+        self.calls: list[tuple[float, float, float, float]] = []
+
+    async def vehicles(
+        self,
+        lat: float,
+        lon: float,
+        latitude_delta: float,
+        longitude_delta: float,
+        query: VehicleQuery | None = None,
+        telemetry: Telemetry | None = None,
+        electric: bool | None = None,
+        priority: int = PRIORITY_BACKGROUND,
+    ) -> list[Vehicle]:
+        self.calls.append((lat, lon, latitude_delta, longitude_delta))
+        sizes = query.vehicle_size_filter if query is not None else None
+        return [
+            vehicle
+            for vehicle in self._vehicles
+            if abs(vehicle.latitude - lat) <= latitude_delta / 2
+            and abs(vehicle.longitude - lon) <= longitude_delta / 2
+            and (not sizes or vehicle.size in sizes)
+            and (electric is None or vehicle.electric == electric)
+        ]
+
+
+async def test_overlapping_queries_are_answered_from_cache() -> None:
+    """Test a second query inside fresh tiles does not hit the API."""
+    near = Vehicle(**vehicle_payload(1, latitude=52.5201, longitude=13.4051))
+    far = Vehicle(**vehicle_payload(2, latitude=52.5301, longitude=13.4051))
+    m_api = FakeMApi([near, far])
+    cache = VehicleTileCache(tile_size=0.01, ttl=60)
+
+    assert await cache.async_vehicles_around(m_api, 52.52, 13.405, 500) == [near]
+    assert await cache.async_vehicles_around(m_api, 52.5202, 13.4052, 300) == [near]
+    assert len(m_api.calls) == 1
+
+
+async def test_box_queries_share_the_tiles() -> None:
+    """Test a box spanning several tiles is fetched in one call and answers radius queries inside it."""
+    near = Vehicle(**vehicle_payload(1, latitude=52.5201, longitude=13.4051))
+    far = Vehicle(**vehicle_payload(2, latitude=52.5401, longitude=13.4351))
+    m_api = FakeMApi([near, far])
+    cache = VehicleTileCache(tile_size=0.01, ttl=60)
+
+    assert await cache.async_vehicles_in_box(m_api, 52.53, 13.42, 0.04, 0.04) == [near, far]
+    assert await cache.async_vehicles_around(m_api, 52.52, 13.405, 500) == [near]
+    assert len(m_api.calls) == 1
+
+
+async def test_filtered_queries_reuse_unfiltered_tiles() -> None:
+    """Test filtered queries are answered from unfiltered tiles, but fetch with the filter pushed down otherwise."""
+    small = Vehicle(**vehicle_payload(1, latitude=52.5201, longitude=13.4051, size="S", electric=True))
+    medium = Vehicle(**vehicle_payload(2, latitude=52.5202, longitude=13.4051, size="M"))
+    m_api = FakeMApi([small, medium])
+    cache = VehicleTileCache(tile_size=0.01, ttl=60)
+
+    assert await cache.async_vehicles_around(m_api, 52.52, 13.405, 500, sizes=("S",)) == [small]
+    assert await cache.async_vehicles_around(m_api, 52.52, 13.405, 500, sizes=("S",), electric=True) == [small]
+    assert len(m_api.calls) == 2
+
+    assert await cache.async_vehicles_around(m_api, 52.52, 13.405, 500) == [small, medium]
+    assert await cache.async_vehicles_around(m_api, 52.52, 13.405, 500, electric=False) == [medium]
+    assert len(m_api.calls) == 3
+
+
+async def test_stale_tiles_are_fetched_again() -> None:
+    """Test tiles older than the TTL trigger a new upstream call."""
+    m_api = FakeMApi([])
+    cache = VehicleTileCache(tile_size=0.01, ttl=0)
+
+    await cache.async_vehicles_around(m_api, 52.52, 13.405, 500)
+    await cache.async_vehicles_around(m_api, 52.52, 13.405, 500)
+    assert len(m_api.calls) == 2
+
+
+async def test_least_recently_used_tiles_are_evicted() -> None:
+    """Test the cache never holds more than the configured number of tiles."""
+    cache = VehicleTileCache(tile_size=0.01, ttl=60, max_tiles=4)
+
+    await cache.async_vehicles_around(FakeMApi([]), 52.52, 13.405, 500)
+    await cache.async_vehicles_around(FakeMApi([]), 48.13, 11.58, 500)
+    assert len(cache) <= 4
+
+
+async def test_response_cache_shares_concurrent_fetches() -> None:
+    """Test identical concurrent lookups trigger a single fetch and later ones are served from the cache."""
+    cache: ResponseCache[int] = ResponseCache(max_entries=2)
+    release = asyncio.Event()
+    calls = 0
+
+    async def fetch() -> int:
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return calls
+
+    pending = asyncio.gather(*(cache.async_get("key", fetch, max_age=30) for _ in range(3)))
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await pending == [1, 1, 1]
+    assert await cache.async_get("key", fetch, max_age=30) == 1
+    assert await cache.async_get("key", fetch, max_age=0) == 2
+    assert cache.statistics == {"entries": 1, "hits": 1, "misses": 2, "coalesced": 2}
@@ -0,0 +1,52 @@
+"""Test the aiohttp based M API client."""
+
+from urllib.parse import urljoin
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from m_car_api.api import VehicleQuery
+from m_car_api.const import DEFAULT_ROOT_URL, U_HEL_URL_PATH, V_URL_PATH
+from pytest_homeassistant_custom_component.test_util.aiohttp import AiohttpClientMocker
+
+from custom_components.ha_m_car_api.client import AsyncMApi
+from custom_components.ha_m_car_api.telemetry import Telemetry
+from tests.payloads import search_payload, vehicle_payload
+
+
+async def test_vehicles_meters_around_location(hass: HomeAssistant, aioclient_mock: AiohttpClientMocker) -> None:
+    """Test the client says hello once and drops empty query parameters."""
+    aioclient_mock.get(urljoin(DEFAULT_ROOT_URL, U_HEL_URL_PATH), json={"Result": "ok"})
+    aioclient_mock.get(urljoin(DEFAULT_ROOT_URL, V_URL_PATH), json=search_payload([vehicle_payload(1)]))
+    m_api = AsyncMApi(async_get_clientsession(hass), "device-key")
+
+    await m_api.vehicles_meters_around_location(52.52, 13.405, 500, VehicleQuery(vehicle_size_filter=("S",)))
+    telemetry = Telemetry()
+    vehicles = await m_api.vehicles_meters_around_location(52.52, 13.405, 500, telemetry=telemetry)
+
+    assert [vehicle.license_plate for vehicle in vehicles] == ["B-MI 1"]
+    assert telemetry.requests == 1
+    assert telemetry.last_vehicles_parsed == 1
+
+    assert aioclient_mock.call_count == 3
+    _, url, _, _ = aioclient_mock.mock_calls[-1]
+    assert url.query["deviceKey"] == "device-key"
+    assert "VehicleSizeFilter" not in url.query
+
+
+async def test_vehicles_are_filtered_before_validation(
+    hass: HomeAssistant, aioclient_mock: AiohttpClientMocker
+) -> None:
+    """Test vehicles of other sizes or fuel types are dropped from the payload before they are validated."""
+    invalid = {"VehicleSize": "S", "isElectric": False}
+    payload = search_payload([vehicle_payload(1, size="S", electric=True), vehicle_payload(2, size="M"), invalid])
+    aioclient_mock.get(urljoin(DEFAULT_ROOT_URL, U_HEL_URL_PATH), json={"Result": "ok"})
+    aioclient_mock.get(urljoin(DEFAULT_ROOT_URL, V_URL_PATH), json=payload)
+    m_api = AsyncMApi(async_get_clientsession(hass), "device-key")
+
+    vehicles = await m_api.vehicles_meters_around_location(
+        52.52, 13.405, 500, VehicleQuery(vehicle_size_filter=("S", "M")), electric=True
+    )
+
+    assert [vehicle.id for vehicle in vehicles] == [1]
+    _, url, _, _ = aioclient_mock.mock_calls[-1]
+    assert url.query["VehicleSizeFilter"] == "S,M"
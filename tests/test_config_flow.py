@@ -0,0 +1,56 @@
+"""Test the flows configuring the vehicles close to a location."""
+
+from datetime import timedelta
+from unittest.mock import patch
+
+from homeassistant.core import HomeAssistant
+from homeassistant.data_entry_flow import FlowResultType
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.ha_m_car_api.client import AsyncMApi
+from custom_components.ha_m_car_api.const import (
+    CONF_DEVICE_KEY,
+    CONF_ELECTRIC_ONLY,
+    CONF_GAS_ONLY,
+    CONF_LOCATION,
+    CONF_SCAN_INTERVAL,
+    CONF_TYPE_LIMIT,
+    DATA_COORDINATORS,
+    DOMAIN,
+)
+
+
+async def test_options_change_the_scan_interval(hass: HomeAssistant) -> None:
+    """Test the scan interval submitted in the options is the one the coordinator polls at."""
+    hass.states.async_set("person.me", "home", {"latitude": 52.52, "longitude": 13.405})
+    data = {
+        CONF_LOCATION: "person.me",
+        CONF_DEVICE_KEY: "device-key",
+        CONF_SCAN_INTERVAL: 5,
+        CONF_TYPE_LIMIT: [],
+        CONF_ELECTRIC_ONLY: False,
+        CONF_GAS_ONLY: False,
+    }
+    entry = MockConfigEntry(domain=DOMAIN, data=data)
+    entry.add_to_hass(hass)
+    with patch.object(AsyncMApi, "vehicles", return_value=[]):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        result = await hass.config_entries.options.async_init(entry.entry_id)
+        assert result["type"] is FlowResultType.FORM
+        # Submit the current options with only the scan interval changed.
+        user_input = {marker.schema: marker.default() for marker in result["data_schema"].schema}
+        result = await hass.config_entries.options.async_configure(
+            result["flow_id"], {**user_input, CONF_SCAN_INTERVAL: 2}
+        )
+        assert result["type"] is FlowResultType.CREATE_ENTRY
+        await hass.async_block_till_done()
+
+        assert entry.options[CONF_SCAN_INTERVAL] == 2
+        coordinator = hass.data[DOMAIN][DATA_COORDINATORS]["person.me"]
+        assert coordinator.scan_interval == timedelta(minutes=2)
+        assert timedelta(minutes=2) <= coordinator.update_interval < timedelta(minutes=3)
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
@@ -0,0 +1,193 @@
+"""Test the shared area coordinator helpers."""
+
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from custom_components.ha_m_car_api.client import AsyncMApi
+from custom_components.ha_m_car_api.const import DATA_COORDINATORS, DOMAIN, REFRESH_STAGGER_SECONDS
+from custom_components.ha_m_car_api.coordinator import (
+    SCAN_INTERVAL,
+    AreaSnapshot,
+    RefreshPolicy,
+    VehicleAreaCoordinator,
+    VehicleFilter,
+    superset_of,
+)
+from custom_components.ha_m_car_api.snapshot import EMPTY_SNAPSHOT, VehicleSnapshot
+
+
+def _vehicle(
+    vehicle_id: int, size: str, electric: bool, latitude: float = 52.52, longitude: float = 13.405
+) -> SimpleNamespace:
+    return SimpleNamespace(id=vehicle_id, size=size, electric=electric, latitude=latitude, longitude=longitude)
+
+
+def test_superset_of_uses_largest_radius_and_union_of_sizes() -> None:
+    filters = [
+        VehicleFilter(distance_meters=500, type_limit=("S",)),
+        VehicleFilter(distance_meters=1000, type_limit=("M", "S"), electric_only=True),
+    ]
+    assert superset_of(filters) == (1000, ("M", "S"), None)
+
+
+def test_superset_of_drops_size_filter_if_any_entry_is_unlimited() -> None:
+    filters = [
+        VehicleFilter(distance_meters=500, type_limit=("S",)),
+        VehicleFilter(distance_meters=200),
+    ]
+    assert superset_of(filters) == (500, None, None)
+
+
+def test_superset_of_pushes_down_a_shared_fuel_type() -> None:
+    electric = VehicleFilter(distance_meters=500, electric_only=True)
+    assert superset_of([electric, electric._replace(distance_meters=800)]) == (800, None, True)
+    assert superset_of([electric, VehicleFilter(distance_meters=500, gas_only=True)]) == (500, None, None)
+
+
+def test_vehicles_for_derives_sensor_state_from_superset() -> None:
+    far_away = _vehicle(4, "S", True, latitude=52.6)
+    vehicles = [_vehicle(1, "S", True), _vehicle(2, "S", False), _vehicle(3, "M", True), far_away]
+    snapshot = AreaSnapshot(52.52, 13.405, 20000, None, None, VehicleSnapshot.from_vehicles(vehicles))
+
+    assert snapshot.vehicles_for(VehicleFilter(distance_meters=20000)).vehicles == vehicles
+    assert snapshot.vehicles_for(VehicleFilter(distance_meters=500, type_limit=("S",), electric_only=True)).ids == [1]
+    assert snapshot.vehicles_for(VehicleFilter(distance_meters=500, gas_only=True)).ids == [2]
+    assert len(snapshot.vehicles_for(VehicleFilter(distance_meters=500, electric_only=True, gas_only=True))) == 0
+
+
+def test_covers() -> None:
+    snapshot = AreaSnapshot(52.52, 13.405, 1000, ("M", "S"), None, VehicleSnapshot.from_vehicles([]))
+
+    assert snapshot.covers(VehicleFilter(distance_meters=500, type_limit=("S",)))
+    assert not snapshot.covers(VehicleFilter(distance_meters=500))
+    assert not snapshot.covers(VehicleFilter(distance_meters=1500, type_limit=("S",)))
+
+
+def test_covers_checks_fuel_type() -> None:
+    snapshot = AreaSnapshot(52.52, 13.405, 1000, None, False, VehicleSnapshot.from_vehicles([]))
+
+    assert snapshot.covers(VehicleFilter(distance_meters=500, gas_only=True))
+    assert not snapshot.covers(VehicleFilter(distance_meters=500))
+    assert not snapshot.covers(VehicleFilter(distance_meters=500, electric_only=True))
+
+
+def test_vehicles_for_clips_to_circle_and_polygon() -> None:
+    # North, in the corner of the box and east of the location.
+    vehicles = [
+        _vehicle(1, "S", True, latitude=52.524),
+        _vehicle(2, "S", True, 52.524, 13.409),
+        _vehicle(3, "S", True, 52.52, 13.409),
+    ]
+    snapshot = AreaSnapshot(52.52, 13.405, 1000, None, None, VehicleSnapshot.from_vehicles(vehicles))
+
+    assert snapshot.vehicles_for(VehicleFilter(distance_meters=500)).ids == [1, 2, 3]
+    assert snapshot.vehicles_for(VehicleFilter(distance_meters=500, circle=True)).ids == [1, 3]
+    triangle = ((52.519, 13.404), (52.521, 13.41), (52.519, 13.41))
+    assert snapshot.vehicles_for(VehicleFilter(distance_meters=0, polygon=triangle)).ids == [3]
+
+
+def test_polygon_widens_the_superset() -> None:
+    polygon = ((52.52, 13.40), (52.53, 13.40), (52.53, 13.41))
+    polygon_filter = VehicleFilter(distance_meters=0, polygon=polygon)
+    distance_meters, _, _ = superset_of([VehicleFilter(distance_meters=500), polygon_filter.around(52.52, 13.405)])
+
+    assert 1000 < distance_meters < 1200
+    snapshot = AreaSnapshot(52.52, 13.405, distance_meters, None, None, EMPTY_SNAPSHOT)
+    assert snapshot.covers(polygon_filter)
+    assert not snapshot._replace(distance_meters=500).covers(polygon_filter)
+
+
+async def test_movement_requests_refresh(hass: HomeAssistant) -> None:
+    """Test a location moving further than the threshold requests a refresh and stationary polling is slow."""
+    hass.data[DOMAIN] = {DATA_COORDINATORS: {}}
+    hass.states.async_set("person.me", "home", {"latitude": 52.52, "longitude": 13.405})
+    coordinator = VehicleAreaCoordinator(hass, AsyncMApi(None, "device-key"), "person.me")
+    policy = RefreshPolicy(movement_distance_meters=100, stationary_scan_interval=timedelta(minutes=15))
+    remove_filter = coordinator.async_add_filter("entry", VehicleFilter(distance_meters=500), policy)
+    coordinator.data = AreaSnapshot(52.52, 13.405, 500, None, None, EMPTY_SNAPSHOT)
+
+    assert coordinator.update_interval == timedelta(minutes=15)
+    with patch.object(coordinator, "async_request_refresh") as request_refresh:
+        hass.states.async_set("person.me", "home", {"latitude": 52.5205, "longitude": 13.405})
+        await hass.async_block_till_done()
+        assert not request_refresh.called
+
+        hass.states.async_set("person.me", "not_home", {"latitude": 52.522, "longitude": 13.405})
+        await hass.async_block_till_done()
+        assert request_refresh.called
+
+    remove_filter()
+    assert coordinator.update_interval == SCAN_INTERVAL
+
+
+async def test_scan_interval_is_the_shortest_entry_interval(hass: HomeAssistant) -> None:
+    """Test the coordinator polls at the shortest configured interval of the entries sharing it."""
+    hass.data[DOMAIN] = {DATA_COORDINATORS: {}}
+    coordinator = VehicleAreaCoordinator(hass, AsyncMApi(None, "device-key"), "zone.home")
+    remove_slow = coordinator.async_add_filter(
+        "slow", VehicleFilter(distance_meters=500), RefreshPolicy(scan_interval=timedelta(minutes=10))
+    )
+    assert coordinator.update_interval == timedelta(minutes=10)
+
+    remove_fast = coordinator.async_add_filter(
+        "fast", VehicleFilter(distance_meters=200), RefreshPolicy(scan_interval=timedelta(minutes=5))
+    )
+    assert coordinator.update_interval == timedelta(minutes=5)
+
+    remove_fast()
+    assert coordinator.update_interval == timedelta(minutes=10)
+    remove_slow()
+
+
+async def test_adaptive_scan_interval_stays_within_bounds(hass: HomeAssistant) -> None:
+    """Test the adaptive interval follows the churn of the area within the configured bounds."""
+    hass.data[DOMAIN] = {DATA_COORDINATORS: {}}
+    coordinator = VehicleAreaCoordinator(hass, AsyncMApi(None, "device-key"), "zone.home")
+    policy = RefreshPolicy(
+        adaptive=True, min_scan_interval=timedelta(minutes=1), max_scan_interval=timedelta(minutes=20)
+    )
+    remove_filter = coordinator.async_add_filter("entry", VehicleFilter(distance_meters=500), policy)
+    assert coordinator.scan_interval == SCAN_INTERVAL
+
+    now = dt_util.utcnow().replace(minute=30)
+    coordinator.churn.record(now - timedelta(minutes=10), [1, 2])
+    coordinator.churn.record(now, [1, 2])
+    with patch("homeassistant.util.dt.utcnow", return_value=now):
+        assert coordinator.scan_interval == timedelta(minutes=20)
+
+        coordinator.churn.record(now + timedelta(minutes=1), list(range(3, 50)))
+        assert coordinator.scan_interval == timedelta(minutes=1)
+    remove_filter()
+
+
+async def test_client_of_a_remaining_entry_takes_over(hass: HomeAssistant) -> None:
+    """Test the coordinator stops using the client of an entry once the entry is gone."""
+    hass.data[DOMAIN] = {DATA_COORDINATORS: {}}
+    first, second = AsyncMApi(None, "first-key"), AsyncMApi(None, "second-key")
+    coordinator = VehicleAreaCoordinator(hass, first, "zone.home")
+    remove_first = coordinator.async_add_filter("first", VehicleFilter(distance_meters=500), m_api=first)
+    remove_second = coordinator.async_add_filter("second", VehicleFilter(distance_meters=500), m_api=second)
+
+    remove_first()
+    assert coordinator._api is second
+    remove_second()
+
+
+async def test_refresh_after_the_first_fetch_is_staggered(hass: HomeAssistant) -> None:
+    """Test the refresh following the first fetch of an area is delayed once to spread areas set up together."""
+    hass.data[DOMAIN] = {DATA_COORDINATORS: {}}
+    coordinator = VehicleAreaCoordinator(hass, AsyncMApi(None, "device-key"), "zone.home")
+    coordinator.async_add_filter("entry", VehicleFilter(distance_meters=500))
+    snapshot = AreaSnapshot(52.52, 13.405, 500, None, None, EMPTY_SNAPSHOT, dt_util.utcnow())
+
+    with patch.object(coordinator, "_async_fetch_area", return_value=snapshot):
+        await coordinator.async_refresh()
+        stagger = coordinator.update_interval - SCAN_INTERVAL
+        assert timedelta(0) <= stagger <= timedelta(seconds=REFRESH_STAGGER_SECONDS)
+
+        await coordinator.async_refresh()
+        assert coordinator.update_interval == SCAN_INTERVAL
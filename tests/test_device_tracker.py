@@ -0,0 +1,49 @@
+"""Test the trackers of the vehicles closest to the location."""
+
+from unittest.mock import patch
+
+from homeassistant.core import HomeAssistant
+from m_car_api.objects import Vehicle
+
+from custom_components.ha_m_car_api.client import AsyncMApi
+from custom_components.ha_m_car_api.const import DATA_COORDINATORS, DOMAIN
+from custom_components.ha_m_car_api.coordinator import AreaSnapshot, VehicleAreaCoordinator, VehicleFilter
+from custom_components.ha_m_car_api.device_tracker import NearestVehicleRanking, NearestVehicleTracker
+from tests.payloads import area_snapshot, vehicle_payload
+
+
+def _snapshot(*positions: tuple[int, float]) -> AreaSnapshot:
+    return area_snapshot(
+        Vehicle(**vehicle_payload(vehicle_id, latitude=latitude)) for vehicle_id, latitude in positions
+    )
+
+
+def _update(coordinator: VehicleAreaCoordinator, trackers: list[NearestVehicleTracker], snapshot: AreaSnapshot) -> None:
+    coordinator.data = snapshot
+    for tracker in trackers:
+        tracker._handle_coordinator_update()
+
+
+async def test_trackers_follow_the_ranking(hass: HomeAssistant) -> None:
+    """Test the trackers show the closest vehicles and only write their state when their vehicle changed."""
+    hass.data[DOMAIN] = {DATA_COORDINATORS: {}}
+    coordinator = VehicleAreaCoordinator(hass, AsyncMApi(None, "device-key"), "zone.home")
+    coordinator.async_add_filter("entry", VehicleFilter(distance_meters=5000))
+    coordinator.data = _snapshot((1, 52.53), (2, 52.521), (3, 52.54))
+    ranking = NearestVehicleRanking(coordinator, "entry", 2, ["license_plate", "latitude"])
+    first, second = (NearestVehicleTracker(coordinator, ranking, rank, "entry", "zone.home") for rank in range(2))
+
+    assert (first.latitude, second.latitude) == (52.521, 52.53)
+    assert (first.entity_registry_enabled_default, second.entity_registry_enabled_default) == (True, False)
+    assert first.extra_state_attributes == {"license_plate": "B-MI 2", "vehicle_id": 2, "distance": 111}
+
+    with patch.object(NearestVehicleTracker, "async_write_ha_state") as write_state:
+        _update(coordinator, [first, second], _snapshot((1, 52.53), (2, 52.521), (3, 52.54), (4, 52.6)))
+        assert not write_state.called
+
+        _update(coordinator, [first, second], _snapshot((1, 52.53), (3, 52.522)))
+        assert write_state.call_count == 1
+        assert (first.latitude, second.latitude) == (52.522, 52.53)
+
+        _update(coordinator, [first, second], _snapshot())
+        assert not first.available
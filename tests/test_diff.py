@@ -0,0 +1,30 @@
+"""Test the incremental vehicle diff."""
+
+from m_car_api.objects import Vehicle
+
+from custom_components.ha_m_car_api.diff import diff_vehicles
+from custom_components.ha_m_car_api.snapshot import VehicleSnapshot
+from tests.payloads import vehicle_payload
+
+
+def test_diff_vehicles() -> None:
+    parked = Vehicle(**vehicle_payload(1, latitude=52.52))
+    moved = Vehicle(**vehicle_payload(2, latitude=52.52))
+    removed = Vehicle(**vehicle_payload(3, latitude=52.52))
+    previous = VehicleSnapshot.from_vehicles([parked, moved, removed]).positions()
+
+    jittered = Vehicle(**vehicle_payload(1, latitude=52.52001))
+    moved_away = Vehicle(**vehicle_payload(2, latitude=52.53))
+    added = Vehicle(**vehicle_payload(4, latitude=52.52))
+    diff = diff_vehicles(previous, VehicleSnapshot.from_vehicles([jittered, moved_away, added]))
+
+    assert diff.added == [added]
+    assert diff.removed == [3]
+    assert diff.moved == [moved_away]
+    assert diff.as_event_data()["moved"][0]["license_plate"] == "B-MI 2"
+
+
+def test_diff_without_changes_is_falsy() -> None:
+    snapshot = VehicleSnapshot.from_vehicles([Vehicle(**vehicle_payload(1))])
+
+    assert not diff_vehicles(snapshot.positions(), snapshot)
@@ -0,0 +1,72 @@
+"""Test the thread pool of the integration."""
+
+import asyncio
+import threading
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.ha_m_car_api.const import DOMAIN
+from custom_components.ha_m_car_api.executor import BlockingExecutor
+
+
+async def test_jobs_run_on_own_threads(hass: HomeAssistant) -> None:
+    """Test jobs run on the threads of the integration and are counted."""
+    executor = BlockingExecutor(workers=1, queue_size=1)
+
+    assert await executor.async_run(lambda: threading.current_thread().name) == "ha_m_car_api_0"
+    assert executor.statistics["completed"] == 1
+    executor.async_shutdown()
+
+
+async def test_queue_is_bounded(hass: HomeAssistant) -> None:
+    """Test callers are held back once every worker is busy and the queue is full."""
+    executor = BlockingExecutor(workers=1, queue_size=1)
+    release = threading.Event()
+    jobs = [asyncio.create_task(executor.async_run(release.wait)) for _ in range(3)]
+    for _ in range(100):
+        if executor.statistics["running"] == 1:
+            break
+        await asyncio.sleep(0.01)
+
+    assert executor.queue_depth == 1
+    assert executor.pending == 2
+    assert executor.saturated == 1
+
+    release.set()
+    await asyncio.gather(*jobs)
+    assert executor.statistics["completed"] == 3
+    assert executor.statistics["peak_queue_depth"] == 1
+    executor.async_shutdown()
+
+
+async def test_pool_restarts_after_shutdown(hass: HomeAssistant) -> None:
+    """Test a job after the shutdown starts the pool again."""
+    executor = BlockingExecutor(workers=1)
+    assert await executor.async_run(sum, [1, 2]) == 3
+    executor.async_shutdown()
+
+    assert await executor.async_run(sum, [3, 4]) == 7
+    executor.async_shutdown()
+
+
+async def test_shutdown_completes_submitted_jobs(hass: HomeAssistant) -> None:
+    """Test jobs submitted or waiting for a slot during a shutdown still run on the threads of the integration."""
+    executor = BlockingExecutor(workers=1, queue_size=1)
+    release = threading.Event()
+
+    def job() -> str:
+        release.wait()
+        return threading.current_thread().name
+
+    jobs = [asyncio.create_task(executor.async_run(job)) for _ in range(3)]
+    for _ in range(100):
+        if executor.statistics["running"] == 1:
+            break
+        await asyncio.sleep(0.01)
+    assert executor.pending == 2
+
+    executor.async_shutdown()
+    release.set()
+    names = await asyncio.gather(*jobs)
+    assert all(name.startswith(DOMAIN) for name in names)
+    executor.async_shutdown()
@@ -0,0 +1,62 @@
+"""Test counting vehicles on a grid."""
+
+import pytest
+
+from custom_components.ha_m_car_api.const import MAX_GRID_CELLS
+from custom_components.ha_m_car_api.grid import Grid
+from custom_components.ha_m_car_api.snapshot import VehicleSnapshot
+from tests.payloads import random_vehicles, vehicle_stub
+
+
+def test_grid_covers_the_box_with_cells_of_the_size() -> None:
+    grid = Grid.covering(52.50, 13.36, 52.54, 13.44, 1000)
+
+    # About 4.4 km from south to north and 5.4 km from west to east.
+    assert (grid.rows, grid.columns) == (5, 6)
+    assert grid.cell_lat_delta == pytest.approx(0.009, rel=0.01)
+    assert grid.cell_lon_delta == pytest.approx(0.009 / 0.609, rel=0.01)
+
+    for south, west, north, east, cell_size in ((52.54, 13.36, 52.50, 13.44, 1000), (52.50, 13.36, 52.54, 13.44, 0)):
+        with pytest.raises(ValueError):
+            Grid.covering(south, west, north, east, cell_size)
+    with pytest.raises(ValueError, match=str(MAX_GRID_CELLS)):
+        Grid.covering(52.0, 13.0, 53.0, 14.0, 100)
+
+
+def test_counts_by_cell_size_and_fuel_type() -> None:
+    grid = Grid.covering(52.50, 13.36, 52.52, 13.38, 1000)
+    snapshot = VehicleSnapshot.from_vehicles(
+        [
+            vehicle_stub(1, 52.501, 13.361, "S", True),
+            vehicle_stub(2, 52.502, 13.362, "M", False),
+            vehicle_stub(3, 52.519, 13.379, "S", False),
+            vehicle_stub(4, 52.49, 13.361, "S", True),
+        ]
+    )
+
+    counts = grid.counts(snapshot)
+    cells = len(grid)
+    last = cells - 1
+    assert (grid.rows, grid.columns) == (3, 2)
+    assert counts["total"] == [2] + [0] * (cells - 2) + [1]
+    assert counts["electric"] == [1] + [0] * last
+    assert counts["gas"] == [1] + [0] * (cells - 2) + [1]
+    assert counts["sizes"]["S"] == [1] + [0] * (cells - 2) + [1]
+    assert counts["sizes"]["M"] == [1] + [0] * last
+    assert counts["sizes"]["P"] == [0] * cells
+
+
+def test_vectorised_counts_match_loop() -> None:
+    grid = Grid.covering(52.50, 13.36, 52.54, 13.44, 500)
+    vehicles = random_vehicles(52.49, 13.35, 52.55, 13.45)
+
+    vectorised = grid.counts(VehicleSnapshot.from_vehicles(vehicles))
+    total, electric = [0] * len(grid), [0] * len(grid)
+    for vehicle in vehicles:
+        counts = grid.counts(VehicleSnapshot.from_vehicles([vehicle]))
+        total = [cell + count for cell, count in zip(total, counts["total"])]
+        electric = [cell + count for cell, count in zip(electric, counts["electric"])]
+    assert vectorised["total"] == total
+    assert vectorised["electric"] == electric
+    assert [sum(cells) for cells in zip(*vectorised["sizes"].values())] == total
+    assert 0 < sum(total) < len(vehicles)
@@ -0,0 +1,34 @@
+"""Test ranking the vehicles by distance."""
+
+import pytest
+
+from custom_components.ha_m_car_api.const import VECTORIZE_MIN_VEHICLES
+from custom_components.ha_m_car_api.geo import haversine_meters
+from custom_components.ha_m_car_api.ranking import distances_meters, nearest
+from custom_components.ha_m_car_api.snapshot import VehicleSnapshot
+from tests.payloads import random_vehicles
+
+
+def _points(count: int) -> tuple[list[float], list[float]]:
+    snapshot = VehicleSnapshot.from_vehicles(random_vehicles(52.5, 13.35, 52.6, 13.45, count))
+    return snapshot.latitudes, snapshot.longitudes
+
+
+@pytest.mark.parametrize("count", [3, VECTORIZE_MIN_VEHICLES * 4])
+def test_distances_match_haversine(count: int) -> None:
+    latitudes, longitudes = _points(count)
+
+    distances = distances_meters(52.52, 13.405, latitudes, longitudes)
+    assert distances == pytest.approx(
+        [haversine_meters(52.52, 13.405, latitude, longitude) for latitude, longitude in zip(latitudes, longitudes)]
+    )
+
+
+@pytest.mark.parametrize("count", [3, VECTORIZE_MIN_VEHICLES * 4])
+def test_nearest_returns_closest_first(count: int) -> None:
+    latitudes, longitudes = _points(count)
+    distances = distances_meters(52.52, 13.405, latitudes, longitudes)
+
+    ranked = nearest(52.52, 13.405, latitudes, longitudes, 5)
+    assert [index for _, index in ranked] == sorted(range(count), key=distances.__getitem__)[:5]
+    assert [distance for distance, _ in ranked] == sorted(distance for distance, _ in ranked)
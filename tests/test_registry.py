@@ -0,0 +1,48 @@
+"""Test the client registry shared by the entries and the service."""
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.ha_m_car_api.registry import async_get_client_registry
+
+
+async def test_clients_are_shared_per_device_key(hass: HomeAssistant) -> None:
+    """Test users of a device key share one client which is closed after the last one released it."""
+    registry = async_get_client_registry(hass)
+    first = registry.async_get("device-key", "entry-1")
+    assert registry.async_get("device-key", "entry-2") is first
+    assert registry.async_get("other-device-key", "entry-3") is not first
+
+    registry.async_release("device-key", "entry-1")
+    assert not first.session.closed
+    assert registry.async_get("device-key") is first
+
+    registry.async_release("device-key", "entry-2")
+    assert first.session.closed
+    assert registry.async_get("device-key") is not first
+    registry.async_close()
+
+
+async def test_service_device_key_is_stable(hass: HomeAssistant) -> None:
+    """Test calls without a device key reuse the same one."""
+    registry = async_get_client_registry(hass)
+    assert async_get_client_registry(hass).service_device_key == registry.service_device_key
+    assert registry.async_get(registry.service_device_key) is registry.async_get(registry.service_device_key)
+    registry.async_close()
+
+
+async def test_service_calls_hold_clients_while_they_run(hass: HomeAssistant) -> None:
+    """Test clients held by a call are closed afterwards unless an entry or the service device key uses them."""
+    registry = async_get_client_registry(hass)
+    entry_client = registry.async_get("entry-device-key", "entry")
+
+    with registry.async_hold("entry-device-key") as client:
+        assert client is entry_client
+    with registry.async_hold("call-device-key") as client:
+        assert registry.statistics == {"clients": 2, "users": 2}
+    assert client.session.closed
+    with registry.async_hold(registry.service_device_key) as client:
+        pass
+    assert not client.session.closed
+    assert not entry_client.session.closed
+    assert registry.statistics == {"clients": 2, "users": 1}
+    registry.async_close()
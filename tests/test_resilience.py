@@ -0,0 +1,50 @@
+"""Test the retry backoff and the circuit breaker."""
+
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+
+from custom_components.ha_m_car_api.resilience import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    backoff_delay,
+)
+
+
+def test_backoff_delay_grows_exponentially_with_jitter() -> None:
+    for failures, delay in ((1, 30), (2, 60), (3, 120)):
+        assert timedelta(seconds=delay / 2) <= backoff_delay(failures) <= timedelta(seconds=delay)
+    assert backoff_delay(20) <= timedelta(minutes=30)
+
+
+def test_circuit_opens_after_threshold_and_lets_one_trial_through() -> None:
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    with patch("custom_components.ha_m_car_api.resilience.time.monotonic", return_value=1000):
+        breaker.before_call()
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.state == STATE_OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+    with patch("custom_components.ha_m_car_api.resilience.time.monotonic", return_value=1061):
+        breaker.before_call()
+        assert breaker.state == STATE_HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_success()
+
+    assert breaker.state == STATE_CLOSED
+    assert breaker.statistics == {"state": STATE_CLOSED, "failures": 0, "opened": 1}
+
+
+def test_failed_trial_opens_the_circuit_again() -> None:
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=0)
+    breaker.state = STATE_OPEN
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN
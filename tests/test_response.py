@@ -0,0 +1,121 @@
+"""Test the formatting of sensor and service attributes."""
+
+import pytest
+from m_car_api.objects import Vehicle
+
+from custom_components.ha_m_car_api.const import (
+    ATTRIBUTE_PROFILE_COUNTS,
+    ATTRIBUTE_PROFILE_FULL,
+    ATTRIBUTE_PROFILE_NEAREST,
+    UPSTREAM_DISTANCE_FIELDS,
+)
+from custom_components.ha_m_car_api.response import (
+    ResponseShape,
+    SearchResult,
+    format_attrs,
+    merge_search_results,
+    shape_vehicles,
+)
+from custom_components.ha_m_car_api.snapshot import VehicleSnapshot
+from tests.payloads import vehicle_payload
+
+VEHICLES = [
+    Vehicle(**vehicle_payload(1, latitude=52.53, size="S", electric=True)),
+    Vehicle(**vehicle_payload(2, latitude=52.521, size="M")),
+    Vehicle(**vehicle_payload(3, latitude=52.5201, size="M")),
+]
+SNAPSHOT = VehicleSnapshot.from_vehicles(VEHICLES)
+
+
+def test_counts() -> None:
+    attrs = format_attrs(SNAPSHOT, profile=ATTRIBUTE_PROFILE_COUNTS)
+
+    assert "vehicles" not in attrs
+    assert attrs["num_electric_cars"] == 1
+    assert attrs["num_gas_cars"] == 2
+    assert attrs["number_car_s_electric"] == 1
+    assert attrs["number_car_m_gas"] == 2
+    assert attrs["number_car_p"] == 0
+
+
+def test_full() -> None:
+    attrs = format_attrs(SNAPSHOT, profile=ATTRIBUTE_PROFILE_FULL)
+
+    assert attrs["vehicles"] == [vehicle.dict(exclude=UPSTREAM_DISTANCE_FIELDS) for vehicle in VEHICLES]
+
+
+def test_distances_are_measured_from_the_origin() -> None:
+    # Cached vehicles carry the upstream distances to the center of whichever search fetched them.
+    vehicles = [vehicle.copy(update={"distance_from_user_position": 1234.0}) for vehicle in VEHICLES]
+    snapshot = VehicleSnapshot.from_vehicles(vehicles)
+
+    attrs = format_attrs(snapshot, profile=ATTRIBUTE_PROFILE_FULL, origin=(52.52, 13.405))
+    response = shape_vehicles(snapshot, origins=[(52.52, 13.405)])
+    for vehicles_attrs in (attrs["vehicles"], response["vehicles"]):
+        assert [vehicle["distance"] for vehicle in vehicles_attrs] == [1112, 111, 11]
+        assert not UPSTREAM_DISTANCE_FIELDS & set(vehicles_attrs[0])
+
+
+def test_nearest() -> None:
+    attrs = format_attrs(
+        SNAPSHOT,
+        profile=ATTRIBUTE_PROFILE_NEAREST,
+        nearest_count=2,
+        fields=["license_plate"],
+        origin=(52.52, 13.405),
+    )
+
+    assert attrs["vehicles"] == [
+        {"license_plate": "B-MI 3", "distance": 11},
+        {"license_plate": "B-MI 2", "distance": 111},
+    ]
+
+
+def test_merge_search_results_lists_shared_vehicles_once() -> None:
+    first = SNAPSHOT.select([0, 1])
+    second = SNAPSHOT.select([1, 2])
+    results = [SearchResult(snapshot, snapshot.counts()) for snapshot in (first, second)]
+
+    merged = merge_search_results(results)
+
+    assert [vehicle["id"] for vehicle in merged["vehicles"]] == [1, 2, 3]
+    assert merged["num_gas_cars"] == 2
+    assert merged["number_car_s"] == 1
+
+
+def test_shape_vehicles_defaults_to_every_field_of_every_vehicle() -> None:
+    assert shape_vehicles(SNAPSHOT) == {
+        "vehicles": [vehicle.dict(exclude=UPSTREAM_DISTANCE_FIELDS) for vehicle in VEHICLES]
+    }
+
+
+def test_shape_vehicles_pages_through_the_nearest() -> None:
+    origin = [(52.52, 13.405)]
+    shape = ResponseShape(fields=["license_plate", "distance"], sort_by="distance", limit=2)
+
+    first_page = shape_vehicles(SNAPSHOT, shape, origin)
+    assert first_page["vehicles"] == [
+        {"license_plate": "B-MI 3", "distance": 11},
+        {"license_plate": "B-MI 2", "distance": 111},
+    ]
+    second_page = shape_vehicles(SNAPSHOT, shape._replace(cursor=first_page["next_cursor"]), origin)
+    assert second_page == {"vehicles": [{"license_plate": "B-MI 1", "distance": 1112}], "next_cursor": None}
+
+
+def test_shape_vehicles_sorts_numeric_text_descending() -> None:
+    vehicles = [vehicle.copy(update={"fuel_percent": fuel}) for vehicle, fuel in zip(VEHICLES, ["9%", "", "80%"])]
+    snapshot = VehicleSnapshot.from_vehicles(vehicles)
+    shape = ResponseShape(fields=["id"], sort_by="-fuel_percent", limit=1)
+
+    pages = []
+    while shape.cursor is not None or not pages:
+        page = shape_vehicles(snapshot, shape)
+        pages.extend(page["vehicles"])
+        shape = shape._replace(cursor=page["next_cursor"])
+    # The vehicle without a fuel level comes last.
+    assert pages == [{"id": 3}, {"id": 1}, {"id": 2}]
+
+    # Only the counts are needed.
+    assert shape_vehicles(snapshot, ResponseShape(limit=0)) == {"vehicles": [], "next_cursor": None}
+    with pytest.raises(ValueError):
+        shape_vehicles(snapshot, ResponseShape(sort_by="fuel_percent", cursor="not a cursor"))
@@ -0,0 +1,62 @@
+"""Test the rate limited request scheduler."""
+
+import asyncio
+from unittest.mock import patch
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.ha_m_car_api.scheduler import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, RequestScheduler
+
+
+async def test_burst_passes_without_waiting(hass: HomeAssistant) -> None:
+    """Test calls within the burst get a token right away."""
+    scheduler = RequestScheduler(rate=1, burst=3)
+
+    for _ in range(3):
+        await asyncio.wait_for(scheduler.acquire(), 0.1)
+    assert scheduler.statistics["granted"] == 3
+    assert scheduler.statistics["delayed"] == 0
+
+
+async def test_interactive_calls_go_first(hass: HomeAssistant) -> None:
+    """Test queued interactive calls are served before background calls queued earlier."""
+    scheduler = RequestScheduler(rate=50, burst=1)
+    await scheduler.acquire()
+    order = []
+
+    async def call(name: str, priority: int) -> None:
+        await scheduler.acquire(priority)
+        order.append(name)
+
+    tasks = [
+        asyncio.create_task(call("background 1", PRIORITY_BACKGROUND)),
+        asyncio.create_task(call("background 2", PRIORITY_BACKGROUND)),
+        asyncio.create_task(call("service", PRIORITY_INTERACTIVE)),
+    ]
+    await asyncio.gather(*tasks)
+
+    assert order == ["service", "background 1", "background 2"]
+    assert scheduler.statistics["delayed"] == 3
+
+
+async def test_cancelled_waiter_does_not_take_a_token(hass: HomeAssistant) -> None:
+    """Test a waiter cancelled while queued leaves the token to the next one."""
+    scheduler = RequestScheduler(rate=50, burst=1)
+    await scheduler.acquire()
+    cancelled = asyncio.create_task(scheduler.acquire(PRIORITY_INTERACTIVE))
+    waiting = asyncio.create_task(scheduler.acquire())
+    await asyncio.sleep(0)
+    cancelled.cancel()
+
+    await asyncio.wait_for(waiting, 1)
+    assert scheduler.statistics["granted"] == 2
+
+
+def test_tokens_refill_up_to_the_burst() -> None:
+    with patch("custom_components.ha_m_car_api.scheduler.time.monotonic", return_value=100.0):
+        scheduler = RequestScheduler(rate=0.5, burst=2)
+        scheduler._tokens = 0
+    with patch("custom_components.ha_m_car_api.scheduler.time.monotonic", return_value=102.0):
+        assert scheduler.statistics["tokens"] == 1
+    with patch("custom_components.ha_m_car_api.scheduler.time.monotonic", return_value=200.0):
+        assert scheduler.statistics["tokens"] == 2
@@ -0,0 +1,118 @@
+"""Test the sensor of the vehicles close to a location."""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from freezegun.api import FrozenDateTimeFactory
+from homeassistant.const import EntityCategory
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from m_car_api.objects import Vehicle
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.ha_m_car_api.client import AsyncMApi
+from custom_components.ha_m_car_api.const import (
+    CONF_DEVICE_KEY,
+    CONF_LOCATION,
+    CONF_POLYGON,
+    CONF_SEARCH_AREA,
+    CONF_TYPE_LIMIT,
+    DATA_COORDINATORS,
+    DOMAIN,
+    SEARCH_AREA_POLYGON,
+)
+from custom_components.ha_m_car_api.coordinator import AreaSnapshot, VehicleAreaCoordinator
+from custom_components.ha_m_car_api.sensor import TELEMETRY_SENSORS, CarApiSensor
+from tests.payloads import area_snapshot, vehicle_payload
+
+# A Monday.
+START = datetime(2026, 1, 5, 8, tzinfo=timezone.utc)
+
+
+def _snapshot(fetched_at: datetime, *sizes: str) -> AreaSnapshot:
+    return area_snapshot(
+        [Vehicle(**vehicle_payload(vehicle_id, size=size)) for vehicle_id, size in enumerate(sizes)], fetched_at
+    )
+
+
+def _update(freezer: FrozenDateTimeFactory, sensor: CarApiSensor, fetched_at: datetime, *sizes: str) -> None:
+    freezer.move_to(fetched_at)
+    sensor.coordinator.data = _snapshot(fetched_at, *sizes)
+    sensor._handle_coordinator_update()
+
+
+async def test_hourly_counts_are_imported_as_statistics(hass: HomeAssistant, freezer: FrozenDateTimeFactory) -> None:
+    """Test the counts of an hour are imported once it is over and become the usual counts a week later."""
+    hass.data[DOMAIN] = {DATA_COORDINATORS: {}}
+    hass.config.components.add("recorder")
+    coordinator = VehicleAreaCoordinator(hass, AsyncMApi(None, "device-key"), "zone.home")
+    sensor = CarApiSensor(hass, coordinator, {CONF_LOCATION: "zone.home"})
+    sensor.hass = hass
+    sensor.entity_id = "sensor.miles_cars_close_to_zone_home"
+
+    with (
+        patch.object(CarApiSensor, "async_write_ha_state"),
+        patch("homeassistant.components.recorder.statistics.async_add_external_statistics") as add_statistics,
+    ):
+        _update(freezer, sensor, START + timedelta(minutes=10), "M", "M")
+        _update(freezer, sensor, START + timedelta(minutes=40), "M", "M", "M", "S")
+        assert not add_statistics.called
+        assert "usual_num_cars" not in sensor.extra_state_attributes
+
+        _update(freezer, sensor, START + timedelta(hours=1, minutes=5), "S")
+        imported = {
+            metadata["statistic_id"]: [(data["start"], data["min"], data["mean"], data["max"]) for data in statistics]
+            for _, metadata, statistics in (call.args for call in add_statistics.call_args_list)
+        }
+        prefix = f"{DOMAIN}:miles_cars_close_to_zone_home"
+        assert imported[f"{prefix}_number_car_m"] == [(START, 2, 2.5, 3)]
+        assert imported[f"{prefix}_number_car_s_gas"] == [(START, 0, 0.5, 1)]
+        assert imported[f"{prefix}_num_gas_cars"] == [(START, 2, 3, 4)]
+        # The recorder compiles the statistics of the state itself.
+        assert f"{prefix}_num_cars" not in imported
+
+        _update(freezer, sensor, START + timedelta(weeks=1, minutes=10), "M")
+        assert sensor.extra_state_attributes["usual_num_cars"] == {"min": 2, "mean": 3.0, "max": 4}
+
+
+async def test_polygon_is_only_searched_around_zones(hass: HomeAssistant) -> None:
+    """Test a polygon tracked from a moving location falls back to the box around it."""
+    hass.data[DOMAIN] = {DATA_COORDINATORS: {}}
+    data = {CONF_SEARCH_AREA: SEARCH_AREA_POLYGON, CONF_POLYGON: "52.51,13.39; 52.53,13.39; 52.53,13.42"}
+
+    for location, polygon in (("zone.home", ((52.51, 13.39), (52.53, 13.39), (52.53, 13.42))), ("person.me", None)):
+        coordinator = VehicleAreaCoordinator(hass, AsyncMApi(None, "device-key"), location)
+        sensor = CarApiSensor(hass, coordinator, {CONF_LOCATION: location, **data})
+        assert sensor.vehicle_filter.polygon == polygon
+
+
+async def test_telemetry_sensors_are_added_once_per_location(hass: HomeAssistant) -> None:
+    """Test entries tracking the same location share one set of telemetry sensors, kept until the last is unloaded."""
+    hass.states.async_set("person.me", "home", {"latitude": 52.52, "longitude": 13.405})
+    entries = [
+        MockConfigEntry(domain=DOMAIN, data={CONF_LOCATION: "person.me", CONF_DEVICE_KEY: "device-key", **data})
+        for data in ({}, {CONF_TYPE_LIMIT: ["S"]})
+    ]
+    with patch.object(AsyncMApi, "vehicles", return_value=[]):
+        for entry in entries:
+            entry.add_to_hass(hass)
+            assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        registry = er.async_get(hass)
+        telemetry = {
+            entity.entity_id: entity.unique_id
+            for entity in registry.entities.values()
+            if entity.entity_category is EntityCategory.DIAGNOSTIC
+        }
+        assert len(telemetry) == len(TELEMETRY_SENSORS)
+        assert "miles_cars_close_to_person_me_upstream_latency" in telemetry.values()
+        assert {registry.async_get(entity_id).config_entry_id for entity_id in telemetry} == {entries[0].entry_id}
+
+        # The entry which added the sensors is unloaded first, the other one adds them again.
+        assert await hass.config_entries.async_unload(entries[0].entry_id)
+        await hass.async_block_till_done()
+        assert {registry.async_get(entity_id).config_entry_id for entity_id in telemetry} == {entries[1].entry_id}
+
+        assert await hass.config_entries.async_unload(entries[1].entry_id)
+        await hass.async_block_till_done()
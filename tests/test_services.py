@@ -0,0 +1,166 @@
+"""Test the services searching vehicles."""
+
+import asyncio
+from typing import Any, AsyncGenerator
+from unittest.mock import patch
+
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.setup import async_setup_component
+from m_car_api.objects import Vehicle
+
+from custom_components.ha_m_car_api.client import AsyncMApi
+from custom_components.ha_m_car_api.const import DOMAIN
+from tests.payloads import vehicle_payload
+
+HOME = (52.52, 13.405)
+HAMBURG = (53.55, 10.0)
+MUNICH = (48.137, 11.575)
+FLEET = [
+    Vehicle(**vehicle_payload(1, *HOME)),
+    Vehicle(**vehicle_payload(2, HOME[0] + 0.001, HOME[1], size="S", electric=True)),
+    Vehicle(**vehicle_payload(3, *HAMBURG)),
+    Vehicle(**vehicle_payload(4, *MUNICH, size="L")),
+]
+
+
+class FakeApi:
+    """Serves the vehicles of the fleet in the searched box and tracks the concurrent searches."""
+
+    def __init__(self) -> None:
+        self.calls: list[tuple[float, float]] = []
+        self.running = 0
+        self.max_running = 0
+
+    async def vehicles(
+        self, lat: float, lon: float, latitude_delta: float, longitude_delta: float, **kwargs: Any
+    ) -> list[Vehicle]:
+        self.calls.append((lat, lon))
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0)
+        self.running -= 1
+        return [
+            vehicle
+            for vehicle in FLEET
+            if abs(vehicle.latitude - lat) <= latitude_delta / 2 and abs(vehicle.longitude - lon) <= longitude_delta / 2
+        ]
+
+
+async def _search(hass: HomeAssistant, **data: Any) -> dict[str, Any]:
+    return await hass.services.async_call(DOMAIN, "search_vehicles", data, blocking=True, return_response=True)
+
+
+@pytest.fixture
+async def fake_api(hass: HomeAssistant) -> AsyncGenerator[FakeApi, None]:
+    assert await async_setup_component(hass, DOMAIN, {})
+    hass.states.async_set("zone.home", "0", {"latitude": HOME[0], "longitude": HOME[1], "radius": 100})
+    fake = FakeApi()
+    # Bound to the fake, the clients of the registry search its fleet.
+    with patch.object(AsyncMApi, "vehicles", fake.vehicles):
+        yield fake
+
+
+async def test_search_around_a_location(hass: HomeAssistant, fake_api: FakeApi) -> None:
+    """Test a search counts the vehicles around the location and serves repeated calls from the cache."""
+    response = await _search(hass, location="zone.home")
+
+    assert [vehicle["id"] for vehicle in response["vehicles"]] == [1, 2]
+    assert (response["num_electric_cars"], response["num_gas_cars"]) == (1, 1)
+    assert (response["number_car_s_electric"], response["number_car_m_gas"]) == (1, 1)
+
+    assert await _search(hass, latitude=HOME[0], longitude=HOME[1]) == response
+    assert len(fake_api.calls) == 1
+
+    # Neither the response nor the tiles of the first search are reused.
+    assert await _search(hass, location="zone.home", cache_max_age=0) == response
+    assert len(fake_api.calls) == 2
+
+
+async def test_batch_search(hass: HomeAssistant, fake_api: FakeApi) -> None:
+    """Test a batch searches every origin once, at most max_concurrency at a time, and merges their vehicles."""
+    response = await _search(
+        hass,
+        locations=["zone.home"],
+        coordinates=[
+            list(HAMBURG),
+            {"latitude": MUNICH[0], "longitude": MUNICH[1]},
+            [HAMBURG[0] + 0.00001, HAMBURG[1]],
+        ],
+        max_concurrency=2,
+    )
+
+    assert [(result["location"], result["latitude"]) for result in response["results"]] == [
+        ("zone.home", HOME[0]),
+        (None, HAMBURG[0]),
+        (None, MUNICH[0]),
+        (None, HAMBURG[0] + 0.00001),
+    ]
+    assert [[vehicle["id"] for vehicle in result["vehicles"]] for result in response["results"]] == [
+        [1, 2],
+        [3],
+        [4],
+        [3],
+    ]
+    # The origins rounding to the same coordinates share one search.
+    assert len(fake_api.calls) == 3
+    assert fake_api.max_running == 2
+    assert [vehicle["id"] for vehicle in response["merged"]["vehicles"]] == [1, 2, 3, 4]
+    assert (response["merged"]["num_electric_cars"], response["merged"]["num_gas_cars"]) == (1, 3)
+
+
+async def test_search_errors(hass: HomeAssistant, fake_api: FakeApi) -> None:
+    """Test calls without a usable origin are rejected before searching."""
+    hass.states.async_set("person.nobody", "away")
+
+    with pytest.raises(ValueError, match="is required"):
+        await _search(hass)
+    with pytest.raises(ValueError, match="zone.unknown not found"):
+        await _search(hass, location="zone.unknown")
+    with pytest.raises(ValueError, match="latitude and longitude"):
+        await _search(hass, locations=["zone.home", "person.nobody"])
+    assert not fake_api.calls
+
+
+async def test_vehicle_grid(hass: HomeAssistant, fake_api: FakeApi) -> None:
+    """Test the grid counts the vehicles of the box per cell with a single upstream search."""
+    response = await hass.services.async_call(
+        DOMAIN,
+        "vehicle_grid",
+        {"bounding_box": [52.51, 13.39, 52.53, 13.42], "cell_size_meters": 1000},
+        blocking=True,
+        return_response=True,
+    )
+
+    assert (response["rows"], response["columns"]) == (3, 3)
+    assert sum(response["total"]) == 2
+    assert sum(response["electric"]) == sum(response["sizes"]["S"]) == 1
+    assert response["total"].index(2) == response["sizes"]["M"].index(1)
+    assert len(fake_api.calls) == 1
+
+    for data in ({}, {"bounding_box": [52.0, 13.0, 53.0, 14.0], "cell_size_meters": 100}):
+        with pytest.raises(ValueError):
+            await hass.services.async_call(DOMAIN, "vehicle_grid", data, blocking=True, return_response=True)
+    assert len(fake_api.calls) == 1
+
+
+async def test_search_response_is_shaped(hass: HomeAssistant, fake_api: FakeApi) -> None:
+    """Test the fields, order and pages of the vehicles are applied to the results and the merged result."""
+    data = {"location": "zone.home", "fields": ["id", "distance"], "sort_by": "-distance", "limit": 1}
+    first = await _search(hass, **data)
+    second = await _search(hass, **data, cursor=first["next_cursor"])
+
+    assert first["vehicles"] == [{"id": 2, "distance": 111}]
+    assert second["vehicles"] == [{"id": 1, "distance": 0}]
+    assert second["next_cursor"] is None
+    # The counts cover all vehicles, not only the page.
+    assert first["num_gas_cars"] + first["num_electric_cars"] == 2
+
+    batch = await _search(hass, coordinates=[list(HOME), list(MUNICH)], fields=["id"], sort_by="id", limit=2)
+    assert [result["vehicles"] for result in batch["results"]] == [[{"id": 1}, {"id": 2}], [{"id": 4}]]
+    assert batch["merged"]["vehicles"] == [{"id": 1}, {"id": 2}]
+    assert batch["merged"]["next_cursor"] is not None
+
+    for invalid in ({"fields": ["owner"]}, {"sort_by": "owner"}, {"limit": -1}, {"sort_by": "id", "cursor": "x"}):
+        with pytest.raises(ValueError):
+            await _search(hass, location="zone.home", **invalid)
@@ -0,0 +1,57 @@
+"""Test the search area shapes."""
+
+import pytest
+
+from custom_components.ha_m_car_api.geo import bounding_box_deltas
+from custom_components.ha_m_car_api.shapes import (
+    circle_extremes,
+    covering_radius_meters,
+    parse_polygon,
+    within_polygon,
+    within_radius,
+)
+from custom_components.ha_m_car_api.snapshot import VehicleSnapshot
+from tests.payloads import random_vehicles, vehicle_stub
+
+# An L shaped area around (52.52, 13.405).
+POLYGON = ((52.51, 13.39), (52.53, 13.39), (52.53, 13.40), (52.52, 13.40), (52.52, 13.42), (52.51, 13.42))
+
+
+def test_parse_polygon() -> None:
+    assert parse_polygon("52.51, 13.39; 52.53,13.39;52.53,13.40;") == ((52.51, 13.39), (52.53, 13.39), (52.53, 13.40))
+
+    for invalid in ("", "52.51,13.39; 52.53,13.39", "52.51; 52.53,13.39; 52.53,13.40", "91,0; 0,0; 0,1"):
+        with pytest.raises(ValueError):
+            parse_polygon(invalid)
+
+
+def test_within_polygon() -> None:
+    latitudes = [52.515, 52.525, 52.525, 52.515, 52.54]
+    longitudes = [13.395, 13.395, 13.41, 13.41, 13.395]
+
+    assert within_polygon(POLYGON, latitudes, longitudes) == [0, 1, 3]
+
+
+def test_within_polygon_vectorised_matches_loop() -> None:
+    snapshot = VehicleSnapshot.from_vehicles(random_vehicles(52.5, 13.38, 52.54, 13.43))
+    latitudes, longitudes = snapshot.latitudes, snapshot.longitudes
+
+    expected = [
+        index for index in range(len(snapshot)) if within_polygon(POLYGON, [latitudes[index]], [longitudes[index]])
+    ]
+    assert within_polygon(POLYGON, latitudes, longitudes) == expected
+    assert 0 < len(expected) < len(snapshot)
+
+
+def test_within_radius() -> None:
+    # Roughly 111 and 222 meters north of the location.
+    assert within_radius(52.52, 13.405, 150, [52.521, 52.522], [13.405, 13.405]) == [0]
+
+
+def test_covering_radius_contains_the_points_in_the_search_box() -> None:
+    for points in (POLYGON, circle_extremes(52.52, 13.405, 500)):
+        radius = covering_radius_meters(52.52, 13.405, points)
+        lat_delta, lon_delta = bounding_box_deltas(52.52, 13.405, radius)
+        snapshot = VehicleSnapshot.from_vehicles(vehicle_stub(index, *point) for index, point in enumerate(points))
+        assert len(snapshot.where(box=(52.52, 13.405, lat_delta, lon_delta))) == len(points)
+        assert len(snapshot.where(box=(52.52, 13.405, lat_delta * 0.99, lon_delta * 0.99))) < len(points)
@@ -0,0 +1,108 @@
+"""Test persisting the area snapshots between restarts."""
+
+from datetime import timedelta
+from typing import Any
+
+from homeassistant.const import EVENT_HOMEASSISTANT_FINAL_WRITE
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from m_car_api.objects import Vehicle
+
+from custom_components.ha_m_car_api.aggregates import HourOfWeekAggregates
+from custom_components.ha_m_car_api.const import AGGREGATE_STORAGE_KEY, STORAGE_KEY
+from custom_components.ha_m_car_api.coordinator import AreaSnapshot
+from custom_components.ha_m_car_api.executor import async_get_executor
+from custom_components.ha_m_car_api.response import format_attrs
+from custom_components.ha_m_car_api.snapshot import VehicleSnapshot
+from custom_components.ha_m_car_api.storage import AggregateStore, SnapshotStore
+from tests.payloads import vehicle_payload
+
+
+async def test_snapshots_are_restored(hass: HomeAssistant, hass_storage: dict[str, Any]) -> None:
+    """Test a saved snapshot is restored with the same vehicles by a new store."""
+    vehicles = VehicleSnapshot.from_vehicles([Vehicle(**vehicle_payload(1)), Vehicle(**vehicle_payload(2, size="S"))])
+    fetched_at = dt_util.utcnow()
+    store = SnapshotStore(hass)
+    await store.async_load()
+    store.async_save("zone.home", AreaSnapshot(52.52, 13.405, 500, ("M", "S"), None, vehicles, fetched_at))
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_FINAL_WRITE)
+    await hass.async_block_till_done()
+
+    assert "zone.home" in hass_storage[STORAGE_KEY]["data"]
+
+    restored_store = SnapshotStore(hass)
+    await restored_store.async_load()
+    restored = await restored_store.async_restore("zone.home")
+
+    # Validated in the thread pool of the integration.
+    assert async_get_executor(hass).completed == 1
+    assert restored is not None
+    assert restored.type_limit == ("M", "S")
+    assert restored.fetched_at == fetched_at
+    assert restored.vehicles.ids == [1, 2]
+    assert restored.vehicles.as_dicts() == vehicles.as_dicts()
+    assert await restored_store.async_restore("zone.work") is None
+
+
+async def test_pending_snapshot_is_restored(hass: HomeAssistant, hass_storage: dict[str, Any]) -> None:
+    """Test a snapshot which was not written yet is restored instead of the older stored one."""
+    store = SnapshotStore(hass)
+    await store.async_load()
+    older = AreaSnapshot(52.52, 13.405, 500, None, None, VehicleSnapshot.from_vehicles([]), dt_util.utcnow())
+    store.async_save("zone.home", older)
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_FINAL_WRITE)
+    await hass.async_block_till_done()
+
+    newer = older._replace(vehicles=VehicleSnapshot.from_vehicles([Vehicle(**vehicle_payload(1))]))
+    store.async_save("zone.home", newer)
+    assert await store.async_restore("zone.home") is newer
+
+
+async def test_restored_vehicles_format_like_fetched_ones(hass: HomeAssistant, hass_storage: dict[str, Any]) -> None:
+    """Test restored vehicles still have the fields their computed prices are built from."""
+    vehicles = VehicleSnapshot.from_vehicles([Vehicle(**vehicle_payload(1)), Vehicle(**vehicle_payload(2, size="S"))])
+    store = SnapshotStore(hass)
+    await store.async_load()
+    store.async_save("zone.home", AreaSnapshot(52.52, 13.405, 500, None, None, vehicles, dt_util.utcnow()))
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_FINAL_WRITE)
+    await hass.async_block_till_done()
+    # Written before the vehicles were stored as payloads.
+    hass_storage[STORAGE_KEY]["data"]["zone.work"] = {
+        **hass_storage[STORAGE_KEY]["data"]["zone.home"],
+        "vehicles": vehicles.as_dicts(),
+    }
+
+    restored_store = SnapshotStore(hass)
+    await restored_store.async_load()
+    restored = await restored_store.async_restore("zone.home")
+
+    assert restored is not None
+    assert format_attrs(restored.vehicles) == format_attrs(vehicles)
+    assert await restored_store.async_restore("zone.work") is None
+
+
+async def test_aggregates_are_restored(hass: HomeAssistant, hass_storage: dict[str, Any]) -> None:
+    """Test the hour of the week aggregates of an entry are restored and dropped with the entry."""
+    now = dt_util.utcnow()
+    aggregates = HourOfWeekAggregates()
+    aggregates.record(now, {"num_cars": 3})
+    aggregates.record(now + timedelta(hours=1), {"num_cars": 5})
+    store = AggregateStore(hass)
+    await store.async_load()
+    store.async_save("entry", aggregates)
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_FINAL_WRITE)
+    await hass.async_block_till_done()
+
+    restored_store = AggregateStore(hass)
+    await restored_store.async_load()
+    assert restored_store.restore("entry").usual(now, "num_cars") == (3, 3, 3)
+    assert restored_store.restore("other").usual(now, "num_cars") is None
+
+    newer = HourOfWeekAggregates()
+    restored_store.async_save("entry", newer)
+    assert restored_store.restore("entry") is newer
+
+    restored_store.async_remove("entry")
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_FINAL_WRITE)
+    await hass.async_block_till_done()
+    assert hass_storage[AGGREGATE_STORAGE_KEY]["data"] == {}
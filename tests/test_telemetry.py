@@ -0,0 +1,43 @@
+"""Test the upstream telemetry counters."""
+
+from custom_components.ha_m_car_api.telemetry import Telemetry, percentile
+
+
+def test_percentile_uses_nearest_rank() -> None:
+    values = [float(value) for value in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([3.0], 90) == 3.0
+    assert percentile([], 50) is None
+
+
+def test_records_are_forwarded_to_parent() -> None:
+    integration = Telemetry()
+    area = Telemetry(parent=integration)
+
+    area.record_request(latency=0.2, payload_bytes=2048, vehicles=12, executor_wait=0.001)
+    area.record_cache(hit=True)
+    area.record_cache(hit=False)
+    area.record_failure(ValueError("upstream down"))
+    area.record_failure(ValueError("upstream down"))
+
+    for telemetry in (area, integration):
+        assert telemetry.latency_percentile(50) == 200.0
+        assert telemetry.last_payload_bytes == 2048
+        assert telemetry.last_vehicles_parsed == 12
+        assert telemetry.cache_hit_rate == 50.0
+        assert telemetry.consecutive_failures == 2
+        assert telemetry.last_error == "upstream down"
+
+    area.record_success()
+    assert integration.consecutive_failures == 0
+    assert integration.as_dict()["last_success"] is not None
+
+
+def test_samples_are_bounded() -> None:
+    telemetry = Telemetry(samples=3)
+    for latency in (10.0, 1.0, 1.0, 1.0):
+        telemetry.record_request(latency=latency, payload_bytes=1, vehicles=1, executor_wait=0)
+
+    assert telemetry.requests == 4
+    assert telemetry.latency_percentile(99) == 1000.0